@@ -1,17 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 import uuid
 from datetime import datetime
 import logging
 
-from app.db.session import get_db
+from app.db.session import SessionLocal, get_db
 from app.core.auth import get_current_user
 from app.models.user import User
 from app.models.analysis import Analysis, AnalysisType, AnalysisStatus
 from app.models.dataset import Dataset
-from app.services.analysis import AnalysisService
+from app.services.cache import analysis_cache_key, async_cache_service
+from app.services.codec import expand_results
+from app.services.job_queue import JobQueue
 from app.schemas.analysis import (
+    AnalysisBatchCreate,
     AnalysisCreate,
     AnalysisResponse,
     AnalysisResult,
@@ -20,75 +23,71 @@ from app.schemas.analysis import (
 )
 
 router = APIRouter()
-analysis_service = AnalysisService()
 logger = logging.getLogger(__name__)
+job_queue = JobQueue(SessionLocal)
 
 
-async def run_analysis_task(
-    analysis_id: str, db: Session, analysis_service: AnalysisService
-):
-    """Background task to run analysis."""
-    try:
-        # Get analysis from database
-        analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
-        if not analysis:
-            return
-
-        # Update status to processing
-        analysis.status = AnalysisStatus.PROCESSING
-        db.commit()
-
-        # Get dataset
-        dataset = db.query(Dataset).filter(Dataset.id == analysis.dataset_id).first()
-        if not dataset:
-            raise ValueError("Dataset not found")
-
-        # Load dataset
-        df = await analysis_service.load_dataset(dataset.file_path)
-
-        # Run analysis
-        results = await analysis_service.run_analysis(
-            df, analysis.type.value, analysis.config
-        )
-
-        # Update analysis with results
-        analysis.results = results
-        analysis.status = AnalysisStatus.COMPLETED
-        db.commit()
-
-    except Exception as e:
-        # Update analysis with error
-        analysis.status = AnalysisStatus.FAILED
-        analysis.error = str(e)
-        db.commit()
+def _results(results: Optional[Dict[str, Any]], legacy: bool):
+    """Results as stored, or with matrices expanded to the nested dicts of
+    earlier releases when the client asks for the legacy shape."""
+    return expand_results(results) if legacy and results else results
 
 
-@router.post("", response_model=AnalysisResponse)
-async def create_analysis(
-    request: AnalysisCreate,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
-    """Create a new analysis."""
+async def _enqueue_analysis(
+    db: Session,
+    current_user: User,
+    dataset_id: int,
+    analysis_type: AnalysisType,
+    config: Dict[str, Any],
+    legacy: bool = False,
+) -> AnalysisResponse:
+    """Queue an analysis of one of the user's datasets."""
     try:
         # Verify dataset exists and belongs to user
         dataset = (
             db.query(Dataset)
-            .filter(
-                Dataset.id == request.dataset_id, Dataset.user_id == current_user.id
-            )
+            .filter(Dataset.id == dataset_id, Dataset.user_id == current_user.id)
             .first()
         )
 
         if not dataset:
             raise HTTPException(status_code=404, detail="Dataset not found")
 
-        # Create analysis record
+        # The same analysis of the same contents is answered from the cache
+        # without queueing a job
+        cache_key = analysis_cache_key(dataset, analysis_type.value, config)
+        results = await async_cache_service.get(cache_key) if cache_key else None
+
+        # An identical job already in flight is followed rather than repeated
+        leader_id = (
+            job_queue.find_in_flight(cache_key)
+            if cache_key and results is None
+            else None
+        )
+
+        if results is None and leader_id is None:
+            # Backpressure: refuse new work while the user's or the global
+            # queue is full
+            retry_after = job_queue.admission(
+                current_user.id, current_user.subscription_tier.value
+            )
+            if retry_after is not None:
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many queued analyses",
+                    headers={"Retry-After": str(retry_after)},
+                )
+
+        # A pending row is the queued job; a worker picks it up
         analysis = Analysis(
-            type=request.analysis_type,
-            status=AnalysisStatus.PENDING,
-            parameters=request.config,
+            type=analysis_type,
+            status=(
+                AnalysisStatus.PENDING if results is None else AnalysisStatus.COMPLETED
+            ),
+            parameters=config,
+            results=results,
+            cache_key=cache_key,
+            leader_id=leader_id,
             dataset_id=dataset.id,
             user_id=current_user.id,
         )
@@ -97,27 +96,70 @@ async def create_analysis(
         db.commit()
         db.refresh(analysis)
 
-        # Start analysis in background
-        background_tasks.add_task(analysis_service.run_analysis_task, analysis.id, db)
-
         return AnalysisResponse(
             id=analysis.id,
             type=analysis.type,
             status=analysis.status,
             dataset_id=analysis.dataset_id,
             config=analysis.parameters,
+            results=_results(analysis.results, legacy),
             created_at=analysis.created_at.isoformat(),
             updated_at=analysis.updated_at.isoformat() if analysis.updated_at else None,
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error creating analysis: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("", response_model=AnalysisResponse)
+async def create_analysis(
+    request: AnalysisCreate,
+    legacy: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Create a new analysis."""
+    return await _enqueue_analysis(
+        db,
+        current_user,
+        request.dataset_id,
+        request.analysis_type,
+        request.config,
+        legacy,
+    )
+
+
+@router.post("/batch", response_model=AnalysisResponse)
+async def create_batch_analysis(
+    request: AnalysisBatchCreate,
+    legacy: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Create one job computing several analyses of a dataset.
+
+    The dataset is loaded once for the whole batch, and the results list
+    each analysis with its own status.
+    """
+    if any(item.analysis_type == AnalysisType.BATCH for item in request.analyses):
+        raise HTTPException(status_code=422, detail="Batches cannot be nested")
+    return await _enqueue_analysis(
+        db,
+        current_user,
+        request.dataset_id,
+        AnalysisType.BATCH,
+        {"analyses": [item.model_dump(mode="json") for item in request.analyses]},
+        legacy,
+    )
+
+
 @router.get("/{analysis_id}", response_model=AnalysisResponse)
 async def get_analysis(
     analysis_id: int,
+    legacy: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -137,7 +179,7 @@ async def get_analysis(
         status=analysis.status,
         dataset_id=analysis.dataset_id,
         config=analysis.parameters,
-        results=analysis.results,
+        results=_results(analysis.results, legacy),
         error=analysis.error_message,
         created_at=analysis.created_at.isoformat(),
         updated_at=analysis.updated_at.isoformat() if analysis.updated_at else None,
@@ -147,6 +189,7 @@ async def get_analysis(
 @router.get("/analysis/{analysis_id}/results", response_model=AnalysisResult)
 async def get_analysis_results(
     analysis_id: str,
+    legacy: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -168,7 +211,7 @@ async def get_analysis_results(
             status_code=500, detail=f"Analysis failed: {analysis.error}"
         )
 
-    return analysis.results
+    return _results(analysis.results, legacy)
 
 
 @router.get("/analysis", response_model=List[AnalysisResponse])
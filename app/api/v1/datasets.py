@@ -4,12 +4,13 @@ from app.db.session import get_db
 from app.models.user import User
 from app.models.dataset import Dataset
 from app.api.v1.auth import get_current_user
+from app.services.cache import cache_service, dataset_fingerprint
+from app.services.dataset_store import dataset_store
+from app.services.ingest import RowLimitExceeded
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
-import pandas as pd
 import json
 from pydantic import BaseModel
-import os
-import shutil
 import logging
 
 router = APIRouter()
@@ -46,41 +47,29 @@ async def upload_dataset(
             detail="Invalid file format. Only Excel and CSV files are supported.",
         )
 
-    # Read file content
-    if file.filename.endswith(".csv"):
-        df = pd.read_csv(file.file)
-    else:
-        df = pd.read_excel(file.file)
-
     # Check row limit based on subscription
     row_limit = 1000000 if current_user.subscription_tier.value == "premium" else 100000
-    if len(df) > row_limit:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Dataset exceeds the {row_limit} row limit for your subscription tier",
-        )
 
     try:
-        # Get column information
-        column_info = {col: str(dtype) for col, dtype in df.dtypes.items()}
-
-        # TODO: Save file to disk or cloud storage
-        file_path = f"data/datasets/{current_user.id}/{file.filename}"
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-
-        # Save the file
-        with open(file_path, "wb+") as file_object:
-            file.file.seek(0)
-            shutil.copyfileobj(file.file, file_object)
+        # Stream the upload to disk while profiling it; stops at the row
+        # limit. Contents that are already stored are kept once.
+        stored = await run_in_threadpool(
+            dataset_store.store_upload, db, file.file, file.filename, row_limit
+        )
+    except RowLimitExceeded as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
+    try:
         # Add logging
         logger.info(f"Creating dataset record: name={name}, user_id={current_user.id}")
         dataset = Dataset(
             name=name,
             description=description,
-            file_path=file_path,
-            row_count=len(df),
-            column_info=column_info,
+            file_path=stored.file_path,
+            row_count=stored.row_count,
+            column_info=stored.column_info,
+            column_stats=stored.column_stats,
+            content_hash=stored.content_hash,
             user_id=current_user.id,
         )
 
@@ -176,7 +165,10 @@ def delete_dataset(
             status_code=status.HTTP_404_NOT_FOUND, detail="Dataset not found"
         )
 
-    # TODO: Delete file from S3
+    # Cached results belong to the contents, which another dataset may share
+    fingerprint = dataset_fingerprint(dataset)
+    if dataset_store.release(db, dataset) and fingerprint:
+        cache_service.invalidate_fingerprint(fingerprint)
 
     db.delete(dataset)
     db.commit()
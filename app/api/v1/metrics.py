@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from app.db.session import SessionLocal
+from app.services.cache import async_cache_service, cache_service
+from app.services.dataset_cache import dataset_cache
+from app.services.executor import analysis_executor
+from app.services.job_queue import JobQueue
+
+router = APIRouter()
+
+
+@router.get("")
+def get_metrics():
+    return {
+        "success": True,
+        "data": {
+            "dataset_cache": dataset_cache.stats(),
+            "result_cache": async_cache_service.stats(),
+            "worker_result_cache": cache_service.stats(),
+            "analysis_executor": analysis_executor.stats(),
+            "job_queue": JobQueue(SessionLocal).stats(),
+        },
+        "error": None,
+    }
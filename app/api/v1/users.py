@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.db.session import get_db
 from app.models.user import User
 from app.api.v1.auth import get_current_user
@@ -69,6 +70,12 @@ def get_subscription_details(current_user: User = Depends(get_current_user)):
                 "advanced_analysis": current_user.subscription_tier.value == "premium",
                 "advanced_visualizations": current_user.subscription_tier.value
                 == "premium",
+                "max_concurrent_analyses": settings.JOB_USER_MAX_RUNNING.get(
+                    current_user.subscription_tier.value
+                ),
+                "max_queued_analyses": settings.JOB_USER_MAX_PENDING.get(
+                    current_user.subscription_tier.value
+                ),
             },
         },
         "error": None,
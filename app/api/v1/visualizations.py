@@ -5,6 +5,10 @@ from app.models.user import User
 from app.models.dataset import Dataset
 from app.models.visualization import Visualization, VisualizationType
 from app.core.auth import get_current_user
+from app.services.correlation import pairwise_pearson
+from app.services.cache import async_cache_service, dataset_fingerprint
+from app.services.dataset_cache import dataset_cache
+from app.services.dataset_io import unique_columns
 from typing import List, Optional, Dict, Any
 import pandas as pd
 import plotly.express as px
@@ -29,10 +33,34 @@ class VisualizationResponse(BaseModel):
     plot_data: Dict[str, Any]
 
 
-def load_dataset(file_path: str) -> pd.DataFrame:
-    if file_path.endswith(".csv"):
-        return pd.read_csv(file_path)
-    return pd.read_excel(file_path)
+# Plotly Express arguments that name a dataset column
+COLUMN_PARAMETERS = (
+    "color",
+    "symbol",
+    "size",
+    "text",
+    "hover_name",
+    "hover_data",
+    "facet_row",
+    "facet_col",
+    "animation_frame",
+    "line_group",
+    "pattern_shape",
+)
+
+
+def referenced_columns(
+    columns: List[str], parameters: Optional[Dict[str, Any]] = None
+) -> List[str]:
+    """All dataset columns a chart reads: its axes plus column-valued options."""
+    referenced = list(columns)
+    for key in COLUMN_PARAMETERS:
+        value = (parameters or {}).get(key)
+        if isinstance(value, str):
+            referenced.append(value)
+        elif isinstance(value, (list, tuple)):
+            referenced.extend(v for v in value if isinstance(v, str))
+    return unique_columns(referenced)
 
 
 def create_visualization(
@@ -53,14 +81,9 @@ def create_visualization(
         elif viz_type == "box":
             fig = px.box(df, x=columns[0], y=columns[1], **parameters or {})
         elif viz_type == "heatmap":
-            correlation_matrix = df[columns].corr()
-            fig = go.Figure(
-                data=go.Heatmap(
-                    z=correlation_matrix.values,
-                    x=correlation_matrix.columns,
-                    y=correlation_matrix.columns,
-                )
-            )
+            # The chart needs only the coefficients, not their p-values
+            r, _ = pairwise_pearson(df[columns].to_numpy(dtype=float))
+            fig = go.Figure(data=go.Heatmap(z=r, x=columns, y=columns))
         else:
             raise ValueError(f"Unsupported visualization type: {viz_type}")
 
@@ -90,20 +113,29 @@ async def create_visualization_endpoint(
             status_code=status.HTTP_404_NOT_FOUND, detail="Dataset not found"
         )
 
-    try:
-        # Load data
-        df = load_dataset(dataset.file_path)
-
-        # Validate columns
-        if not all(col in df.columns for col in request.columns):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid column names"
-            )
+    # Validate columns
+    columns = referenced_columns(request.columns, request.parameters)
+    if not all(col in dataset.column_info for col in columns):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid column names"
+        )
 
-        # Create visualization
-        plot_data = create_visualization(
-            df, request.type, request.columns, request.parameters
+    try:
+        fingerprint = dataset_fingerprint(dataset)
+        cache_key = fingerprint and async_cache_service.get_visualization_cache_key(
+            fingerprint, request.type, request.columns, request.parameters
         )
+        plot_data = await async_cache_service.get(cache_key) if cache_key else None
+        if plot_data is None:
+            # Load only the columns the chart uses
+            df = dataset_cache.get(dataset.file_path, columns=columns)
+
+            # Create visualization
+            plot_data = create_visualization(
+                df, request.type, request.columns, request.parameters
+            )
+            if cache_key:
+                await async_cache_service.set(cache_key, plot_data)
 
         # Save visualization
         viz = Visualization(
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
@@ -20,6 +20,86 @@ class Settings(BaseSettings):
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
     REDIS_PASSWORD: Optional[str] = None
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = 0.5
+
+    # Result cache: an in-process LRU in front of Redis. Without Redis the
+    # local tier is used alone; an unreachable Redis is retried after the
+    # retry interval.
+    CACHE_REDIS_ENABLED: bool = True
+    CACHE_TTL_SECONDS: int = 3600
+    CACHE_LOCAL_MAX_BYTES: int = 64 * 1024 * 1024
+    CACHE_LOCAL_TTL_SECONDS: int = 300
+    CACHE_REDIS_RETRY_SECONDS: float = 30.0
+    # Connections the API's async Redis client keeps, and how long a request
+    # waits for one when all are busy
+    CACHE_REDIS_MAX_CONNECTIONS: int = 32
+    CACHE_REDIS_POOL_TIMEOUT_SECONDS: float = 1.0
+
+    # Cached and stored results are msgpack, compressed with zstd above the
+    # size threshold. Floats can be stored as float32 at ~7 significant
+    # digits.
+    RESULTS_FLOAT32: bool = False
+    RESULTS_COMPRESS_MIN_BYTES: int = 1024
+    RESULTS_ZSTD_LEVEL: int = 3
+
+    # Uploaded datasets are stored by content hash under this directory
+    DATASET_STORAGE_ROOT: str = "data/datasets"
+
+    # Object storage settings. With the "s3" backend, stored datasets go to
+    # S3_BUCKET (on any S3-compatible service at S3_ENDPOINT_URL) in parts
+    # of S3_MULTIPART_PART_BYTES, and are read in ranged blocks kept in a
+    # local disk cache. STORAGE_CACHE_MAX_BYTES bounds the whole directory,
+    # shared by every process on the host that uses it.
+    STORAGE_BACKEND: str = "local"
+    S3_BUCKET: Optional[str] = None
+    S3_PREFIX: str = "datasets/"
+    S3_ENDPOINT_URL: Optional[str] = None
+    S3_REGION: Optional[str] = None
+    S3_MULTIPART_PART_BYTES: int = 8 * 1024 * 1024
+    STORAGE_READ_BLOCK_BYTES: int = 1024 * 1024
+    STORAGE_CACHE_DIR: str = "data/object_cache"
+    STORAGE_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+
+    # Dataset cache settings
+    DATASET_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+
+    # Analyses whose projected columns exceed this many uncompressed bytes
+    # run over record batches instead of a DataFrame held in memory
+    CHUNKED_ANALYSIS_THRESHOLD_BYTES: int = 256 * 1024 * 1024
+    CHUNKED_BATCH_ROWS: int = 100_000
+
+    # Analyses run off the event loop in a pool of "process" or "thread"
+    # workers
+    ANALYSIS_EXECUTOR: str = "process"
+    ANALYSIS_WORKERS: int = 2
+
+    # Analysis job queue: workers poll for pending analyses, heartbeat the
+    # ones they run, and retry failures other than invalid input with
+    # exponential backoff. Rows whose heartbeat is older than the stale
+    # timeout are handed back to the queue.
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0
+    JOB_HEARTBEAT_INTERVAL_SECONDS: float = 10.0
+    JOB_STALE_AFTER_SECONDS: float = 60.0
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: float = 5.0
+    # Fair scheduling by subscription tier: slot weights, running caps per
+    # tier and per user, and queued jobs admitted per user and overall.
+    # Rejected submissions get a 429 whose Retry-After falls back to
+    # JOB_RETRY_AFTER_SECONDS per job when no run times are known yet.
+    JOB_TIER_WEIGHTS: Dict[str, float] = {"free": 1.0, "premium": 4.0}
+    JOB_TIER_MAX_RUNNING: Dict[str, int] = {"free": 4, "premium": 16}
+    JOB_USER_MAX_RUNNING: Dict[str, int] = {"free": 1, "premium": 4}
+    JOB_USER_MAX_PENDING: Dict[str, int] = {"free": 10, "premium": 100}
+    JOB_MAX_PENDING: int = 1000
+    JOB_RETRY_AFTER_SECONDS: float = 30.0
+    # Run a worker inside the API process (development convenience)
+    RUN_EMBEDDED_WORKER: bool = False
+
+    # Resampling: at most this many resamples or drawn values per block, and
+    # threads running the blocks (0 or 1 runs them in the calling thread)
+    RESAMPLING_BLOCK_SIZE: int = 500
+    RESAMPLING_BLOCK_ELEMENTS: int = 8_000_000
+    RESAMPLING_WORKERS: int = 0
 
     # CORS settings
     BACKEND_CORS_ORIGINS: list = ["http://localhost:3000"]
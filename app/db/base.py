@@ -1,6 +1,6 @@
 from app.db.base_class import Base
 from app.models.user import User
-from app.models.dataset import Dataset
+from app.models.dataset import Dataset, DatasetBlob
 from app.models.analysis import Analysis
 from app.models.report import Report
 from app.models.visualization import Visualization
@@ -6,10 +6,8 @@ from app.db.base import Base
 # Create database engine
 engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, echo=True)
 
-# Drop all tables (in development only)
-Base.metadata.drop_all(bind=engine)
-
-# Create all tables
+# Create missing tables. Existing rows are kept so queued analyses survive
+# a restart; use app.db.init_db to reset a development database.
 Base.metadata.create_all(bind=engine)
 
 # Create session factory
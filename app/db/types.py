@@ -0,0 +1,24 @@
+import json
+from typing import Any, Optional
+from sqlalchemy.types import LargeBinary, TypeDecorator
+from app.services.codec import decode, encode
+
+
+class EncodedResults(TypeDecorator):
+    """JSON-like values stored in the compact binary results encoding.
+
+    Rows written before results were encoded hold JSON, which is still read.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: Any, dialect) -> Optional[bytes]:
+        return None if value is None else encode(value)
+
+    def process_result_value(self, value: Any, dialect) -> Any:
+        if value is None or isinstance(value, (dict, list)):
+            return value
+        if isinstance(value, str):
+            return json.loads(value)
+        return decode(bytes(value))
@@ -1,6 +1,11 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from app.core.config import settings
+from app.services.cache import async_cache_service
+from app.services.executor import analysis_executor
+from app.services.resampling import shutdown_executor as shutdown_resampling
 
 app = FastAPI(
     title="Doctor Stats API",
@@ -36,6 +41,35 @@ async def global_exception_handler(request, exc):
     )
 
 
+embedded_worker_stop = asyncio.Event()
+
+
+@app.on_event("startup")
+async def start_embedded_worker():
+    # Development convenience; production runs ``python -m app.worker``
+    if settings.RUN_EMBEDDED_WORKER:
+        from app.db.session import SessionLocal
+        from app.services.job_queue import JobQueue
+        from app.worker import AnalysisWorker
+
+        worker = AnalysisWorker(
+            JobQueue(SessionLocal), analysis_executor, settings.ANALYSIS_WORKERS
+        )
+        app.state.embedded_worker = asyncio.create_task(
+            worker.run(embedded_worker_stop)
+        )
+
+
+@app.on_event("shutdown")
+async def shutdown_analysis_executor():
+    embedded_worker_stop.set()
+    if getattr(app.state, "embedded_worker", None) is not None:
+        await app.state.embedded_worker
+    analysis_executor.shutdown()
+    shutdown_resampling()
+    await async_cache_service.close()
+
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
@@ -53,6 +87,7 @@ from app.api.v1.analysis import router as analysis_router
 from app.api.v1.datasets import router as datasets_router
 from app.api.v1.visualizations import router as visualizations_router
 from app.api.v1.reports import router as reports_router
+from app.api.v1.metrics import router as metrics_router
 
 # Include routers with prefix
 app.include_router(auth_router, prefix="/api/v1/auth", tags=["Authentication"])
@@ -63,3 +98,4 @@ app.include_router(
     visualizations_router, prefix="/api/v1/visualizations", tags=["Visualizations"]
 )
 app.include_router(reports_router, prefix="/api/v1/reports", tags=["Reports"])
+app.include_router(metrics_router, prefix="/api/v1/metrics", tags=["Metrics"])
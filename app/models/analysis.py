@@ -1,7 +1,17 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Enum
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    DateTime,
+    ForeignKey,
+    JSON,
+    Enum,
+    Index,
+)
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship, foreign
 from app.db.base_class import Base
+from app.db.types import EncodedResults
 import enum
 
 
@@ -11,6 +21,7 @@ class AnalysisType(str, enum.Enum):
     CORRELATION = "correlation"
     CHI_SQUARE = "chi_square"
     REGRESSION = "regression"
+    BATCH = "batch"
 
 
 class AnalysisStatus(str, enum.Enum):
@@ -27,13 +38,38 @@ class Analysis(Base):
     type = Column(Enum(AnalysisType), nullable=False)
     status = Column(Enum(AnalysisStatus), default=AnalysisStatus.PENDING)
     parameters = Column(JSON)
-    results = Column(JSON)
+    results = Column(EncodedResults)
     error_message = Column(String)
     dataset_id = Column(Integer, ForeignKey("dataset.id", ondelete="CASCADE"))
     user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Job queue bookkeeping, see app.services.job_queue
+    attempts = Column(Integer, default=0, nullable=False)
+    available_at = Column(DateTime(timezone=True), index=True)
+    claimed_by = Column(String)
+    heartbeat_at = Column(DateTime(timezone=True))
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    # Identical requests share one computation: a job whose cache key is
+    # already in flight follows that job instead of being run
+    cache_key = Column(String, index=True)
+    leader_id = Column(
+        Integer, ForeignKey("analysis.id", ondelete="SET NULL"), index=True
+    )
+
+    __table_args__ = (
+        # At most one running job per cache key, across all workers
+        Index(
+            "ix_analysis_running_cache_key",
+            cache_key,
+            unique=True,
+            sqlite_where=status == AnalysisStatus.PROCESSING,
+            postgresql_where=status == AnalysisStatus.PROCESSING,
+        ),
+    )
+
     # Relationships
     dataset = relationship("Dataset", back_populates="analyses")
     user = relationship("User", back_populates="analyses")
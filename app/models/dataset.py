@@ -13,6 +13,8 @@ class Dataset(Base):
     description = Column(String)
     row_count = Column(Integer)
     column_info = Column(JSON)
+    column_stats = Column(JSON)  # Per-column statistics gathered at upload
+    content_hash = Column(String, index=True)  # SHA-256 of the uploaded file
     user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -25,3 +27,16 @@ class Dataset(Base):
     visualizations = relationship(
         "Visualization", back_populates="dataset", cascade="all, delete-orphan"
     )
+
+
+class DatasetBlob(Base):
+    """Stored files of one upload's contents, shared by every dataset with
+    that content hash."""
+
+    __tablename__ = "dataset_blob"
+
+    content_hash = Column(String, primary_key=True)
+    source_path = Column(String, nullable=False)  # The uploaded file
+    file_path = Column(String, nullable=False)  # Its Parquet copy
+    ref_count = Column(Integer, nullable=False, default=0)  # Referencing datasets
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Union
 from pydantic import BaseModel, Field
 from enum import Enum
 from datetime import datetime
@@ -11,6 +11,7 @@ class AnalysisType(str, Enum):
     CORRELATION = "correlation"
     CHI_SQUARE = "chi_square"
     REGRESSION = "regression"
+    BATCH = "batch"
 
 
 class AnalysisStatus(str, Enum):
@@ -25,11 +26,52 @@ class BasicAnalysisConfig(BaseModel):
         None,
         description="List of columns to analyze. If not provided, all numeric columns will be analyzed.",
     )
+    exact: bool = Field(
+        False,
+        description="Recompute from the data instead of answering from the upload-time column sketches.",
+    )
+
+
+class ResamplingMethod(str, Enum):
+    BOTH = "both"
+    BOOTSTRAP = "bootstrap"
+    PERMUTATION = "permutation"
+
+
+class ResamplingConfig(BaseModel):
+    method: ResamplingMethod = Field(
+        ResamplingMethod.BOTH,
+        description="Bootstrap confidence intervals, permutation p-values, or both.",
+    )
+    iterations: int = Field(2000, description="Resamples per statistic")
+    confidence_level: float = Field(0.95, description="Bootstrap interval coverage")
+    seed: Optional[int] = Field(
+        None,
+        description="Seed for reproducible resamples. One is drawn and reported if omitted.",
+    )
 
 
 class ComparativeAnalysisConfig(BaseModel):
-    target_column: str = Field(..., description="The column to analyze")
+    target_column: Optional[str] = Field(None, description="The column to analyze")
+    target_columns: Optional[List[str]] = Field(
+        None,
+        description="Several columns to compare across the same groups in one job. Takes precedence over target_column.",
+    )
     group_column: str = Field(..., description="The column to group by")
+    nonparametric: bool = Field(
+        False,
+        description="Also run Mann-Whitney U (two groups) or Kruskal-Wallis (more) for each target column.",
+    )
+    resampling: Optional[ResamplingConfig] = Field(
+        None,
+        description="Add bootstrap confidence intervals and permutation p-values.",
+    )
+
+
+class CorrelationMethod(str, Enum):
+    PEARSON = "pearson"
+    SPEARMAN = "spearman"
+    KENDALL = "kendall"
 
 
 class CorrelationAnalysisConfig(BaseModel):
@@ -37,16 +79,64 @@ class CorrelationAnalysisConfig(BaseModel):
         None,
         description="List of columns to analyze correlations between. If not provided, all numeric columns will be analyzed.",
     )
+    method: CorrelationMethod = Field(
+        CorrelationMethod.PEARSON, description="Correlation coefficient to compute"
+    )
+    resampling: Optional[ResamplingConfig] = Field(
+        None,
+        description="Add bootstrap confidence intervals and permutation p-values.",
+    )
 
 
 class ChiSquareAnalysisConfig(BaseModel):
-    variable1: str = Field(..., description="First categorical variable")
-    variable2: str = Field(..., description="Second categorical variable")
+    variable1: Optional[str] = Field(None, description="First categorical variable")
+    variable2: Optional[str] = Field(None, description="Second categorical variable")
+    variables: Optional[List[str]] = Field(
+        None,
+        description="Test every pair of these categorical variables instead of a single pair.",
+    )
+    max_table_cells: Optional[int] = Field(
+        None,
+        description="With variables, skip pairs whose contingency table would have more cells than this.",
+    )
+    max_levels: Optional[int] = Field(
+        None,
+        description="Keep the most frequent levels of each variable and lump the rest into 'other', so each side has at most this many levels.",
+    )
+    table_offset: int = Field(
+        0, description="First row of the contingency table to return"
+    )
+    table_limit: Optional[int] = Field(
+        None,
+        description="Rows of the contingency table to return. Statistics always use the full table.",
+    )
 
 
 class RegressionAnalysisConfig(BaseModel):
     dependent_variable: str = Field(..., description="The dependent variable (y)")
-    independent_variable: str = Field(..., description="The independent variable (x)")
+    independent_variable: Optional[str] = Field(
+        None, description="The independent variable (x)"
+    )
+    independent_variables: Optional[List[str]] = Field(
+        None,
+        description="Predictors for a multiple regression. Takes precedence over independent_variable.",
+    )
+    categorical_variables: Optional[List[str]] = Field(
+        None,
+        description="Predictors to dummy-code against their first level. Non-numeric predictors are always treated as categorical.",
+    )
+    screening_variables: Optional[List[str]] = Field(
+        None,
+        description="Fit one simple regression per listed predictor instead of a single model.",
+    )
+    fdr_alpha: Optional[float] = Field(
+        None,
+        description="With screening_variables, keep only predictors whose Benjamini-Hochberg q-value is at most this.",
+    )
+    resampling: Optional[ResamplingConfig] = Field(
+        None,
+        description="Add bootstrap confidence intervals and permutation p-values.",
+    )
 
 
 class AnalysisConfig(BaseModel):
@@ -68,6 +158,21 @@ class AnalysisCreate(BaseModel):
         }
 
 
+class AnalysisBatchItem(BaseModel):
+    analysis_type: AnalysisType
+    config: Dict[str, Any] = Field(default_factory=dict)
+
+
+class AnalysisBatchCreate(BaseModel):
+    dataset_id: int
+    analyses: List[AnalysisBatchItem] = Field(
+        ...,
+        min_length=1,
+        max_length=50,
+        description="Analyses of the dataset, computed together in one job.",
+    )
+
+
 class AnalysisResponse(BaseModel):
     id: int
     type: AnalysisType
@@ -115,6 +220,13 @@ class ComparativeStatistics(BaseModel):
     group_statistics: Dict[str, Dict[str, float]]
     statistical_test: StatisticalTest
     pairwise_tests: Optional[Dict[str, PairwiseTest]] = None
+    nonparametric_test: Optional[StatisticalTest] = None
+
+
+class BatchComparativeStatistics(BaseModel):
+    group_column: str
+    groups: List[Any]
+    results: Dict[str, ComparativeStatistics]
 
 
 class SignificantCorrelation(BaseModel):
@@ -124,14 +236,33 @@ class SignificantCorrelation(BaseModel):
     p_value: float
 
 
+class CompactMatrix(BaseModel):
+    """A square matrix: its labels, and its values in row-major order."""
+
+    columns: List[Any]
+    values: List[Optional[float]]
+
+
 class CorrelationAnalysis(BaseModel):
-    correlation_matrix: Dict[str, Dict[str, float]]
-    p_values: Dict[str, Dict[str, float]]
+    # Nested dicts when the legacy shape is requested
+    correlation_matrix: Union[CompactMatrix, Dict[str, Dict[str, float]]]
+    p_values: Union[CompactMatrix, Dict[str, Dict[str, float]]]
     significant_correlations: List[SignificantCorrelation]
+    method: CorrelationMethod = CorrelationMethod.PEARSON
+
+
+class ContingencyTablePage(BaseModel):
+    offset: int
+    limit: int
+    total_rows: int
+    total_columns: int
+    nonzero_cells: int
+    truncated: bool
 
 
 class ChiSquareAnalysis(BaseModel):
     contingency_table: Dict[str, Dict[str, int]]
+    table_page: Optional[ContingencyTablePage] = None
     chi_square_statistic: float
     p_value: float
     degrees_of_freedom: int
@@ -139,9 +270,28 @@ class ChiSquareAnalysis(BaseModel):
     significant: bool
 
 
-class RegressionCoefficients(BaseModel):
-    intercept: float
-    slope: float
+class PairAssociation(BaseModel):
+    variable1: str
+    variable2: str
+    chi_square_statistic: float
+    p_value: float
+    degrees_of_freedom: int
+    cramers_v: float
+    significant: bool
+    sample_size: int
+
+
+class SkippedPair(BaseModel):
+    variable1: str
+    variable2: str
+    reason: str
+
+
+class AssociationMatrix(BaseModel):
+    variables: List[str]
+    cramers_v_matrix: Dict[str, Dict[str, Optional[float]]]
+    pairs: List[PairAssociation]
+    skipped_pairs: List[SkippedPair]
 
 
 class ResidualsSummary(BaseModel):
@@ -152,19 +302,56 @@ class ResidualsSummary(BaseModel):
 
 
 class RegressionAnalysis(BaseModel):
-    coefficients: RegressionCoefficients
-    standard_errors: RegressionCoefficients
-    t_statistics: RegressionCoefficients
-    p_values: RegressionCoefficients
+    # Keyed by "intercept" and "slope", or by term name for multiple predictors
+    coefficients: Dict[str, float]
+    standard_errors: Dict[str, float]
+    t_statistics: Dict[str, float]
+    p_values: Dict[str, float]
     r_squared: float
     adjusted_r_squared: float
+    f_statistic: float
+    f_p_value: float
     sample_size: int
+    reference_levels: Optional[Dict[str, Any]] = None
     residuals_summary: ResidualsSummary
 
 
+class ScreeningFit(BaseModel):
+    variable: str
+    slope: float
+    intercept: float
+    standard_error: float
+    t_statistic: float
+    p_value: float
+    q_value: float
+    r_squared: float
+    sample_size: int
+
+
+class RegressionScreening(BaseModel):
+    dependent_variable: str
+    predictors_screened: int
+    fdr_alpha: Optional[float] = None
+    results: List[ScreeningFit]
+
+
+class BatchItemResult(BaseModel):
+    analysis_type: AnalysisType
+    status: AnalysisStatus
+    results: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+class BatchAnalysisResults(BaseModel):
+    items: List[BatchItemResult]
+    completed: int
+    failed: int
+
+
 class AnalysisResult(BaseModel):
     basic: Optional[BasicStatistics] = None
     comparative: Optional[ComparativeStatistics] = None
     correlation: Optional[CorrelationAnalysis] = None
     chi_square: Optional[ChiSquareAnalysis] = None
     regression: Optional[RegressionAnalysis] = None
+    batch: Optional[BatchAnalysisResults] = None
@@ -3,41 +3,100 @@ import pandas as pd
 import numpy as np
 from scipy import stats
 import logging
-from sqlalchemy.orm import Session
 
-# Models
-from app.models.analysis import Analysis, AnalysisStatus  # Only import from models
-from app.models.dataset import Dataset
+from app.services.chunked import ChunkedAnalysisEngine, should_run_chunked
+from app.services.contingency import (
+    SparseContingency,
+    association_matrix,
+    chi_square_results,
+)
+from app.services.correlation import correlation_matrix, correlation_results
+from app.services.dataset_cache import dataset_cache
+from app.services.dataset_io import load_dataset, numeric_columns, unique_columns
+from app.services.groups import GroupedColumns
+from app.services.intermediates import SharedIntermediates
+from app.services.regression import (
+    DesignMatrix,
+    LeastSquares,
+    UnivariateScreen,
+    coefficient_names,
+    regression_predictors,
+    screening_results,
+)
+from app.services.resampling import (
+    comparative_resampling,
+    correlation_resampling,
+    regression_resampling,
+)
+from app.services.sketches import ColumnSketch
 
 # Schemas for return types
 from app.schemas.analysis import (
     BasicStatistics,
+    BatchComparativeStatistics,
     ComparativeStatistics,
     CorrelationAnalysis,
+    AssociationMatrix,
     ChiSquareAnalysis,
     RegressionAnalysis,
+    RegressionScreening,
 )
 
 logger = logging.getLogger(__name__)
 
+# Analysis types a batch may contain
+BATCH_ITEM_TYPES = ("basic", "comparative", "correlation", "chi_square", "regression")
 
-class AnalysisService:
-    async def load_dataset(self, file_path: str) -> pd.DataFrame:
-        """Load dataset from file path."""
-        try:
-            if file_path.endswith(".csv"):
-                return pd.read_csv(file_path)
-            elif file_path.endswith((".xls", ".xlsx")):
-                return pd.read_excel(file_path)
-            else:
-                raise ValueError("Unsupported file format")
-        except Exception as e:
-            raise ValueError(f"Error loading dataset: {str(e)}")
 
-    async def run_analysis(
-        self, df: pd.DataFrame, analysis_type: str, config: Dict[str, Any]
+class AnalysisService:
+    def load_dataset(
+        self, file_path: str, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """Load dataset from file path, optionally only the given columns."""
+        return load_dataset(file_path, columns=columns)
+
+    def required_columns(
+        self,
+        analysis_type: str,
+        config: Dict[str, Any],
+        column_info: Optional[Dict[str, str]] = None,
+    ) -> Optional[List[str]]:
+        """Columns an analysis reads, so the loader can skip the rest.
+
+        Returns None when the whole dataset is needed.
+        """
+        if analysis_type in ("basic", "correlation"):
+            columns = config.get("columns")
+            if columns:
+                return unique_columns(columns)
+            if column_info:
+                return numeric_columns(column_info)
+            return None
+        if analysis_type == "comparative":
+            targets = config.get("target_columns") or [config["target_column"]]
+            return unique_columns([*targets, config["group_column"]])
+        if analysis_type == "chi_square":
+            if config.get("variables"):
+                return unique_columns(config["variables"])
+            return unique_columns([config["variable1"], config["variable2"]])
+        if analysis_type == "regression":
+            return unique_columns(
+                [config["dependent_variable"], *regression_predictors(config)]
+            )
+        return None
+
+    def run_analysis(
+        self,
+        df: pd.DataFrame,
+        analysis_type: str,
+        config: Dict[str, Any],
+        shared: Optional[SharedIntermediates] = None,
     ) -> Dict[str, Any]:
-        """Run analysis based on type and configuration."""
+        """Run analysis based on type and configuration.
+
+        Analyses run with the same ``shared`` intermediates reuse each
+        other's converted columns, factorized groups and missing masks.
+        """
         analysis_methods = {
             "basic": self._basic_statistics,
             "comparative": self._comparative_analysis,
@@ -49,91 +108,202 @@ class AnalysisService:
         if analysis_type not in analysis_methods:
             raise ValueError(f"Unsupported analysis type: {analysis_type}")
 
-        return await analysis_methods[analysis_type](df, config)
-
-    async def run_analysis_task(self, analysis_id: int, db: Session):
-        """Background task to handle the complete analysis workflow."""
-        try:
-            # Get analysis from database
-            analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
-            if not analysis:
-                logger.error(f"Analysis {analysis_id} not found")
-                return
-
-            # Update status to processing
-            analysis.status = AnalysisStatus.PROCESSING  # Using model's AnalysisStatus
-            db.commit()
-            logger.info(f"Starting analysis {analysis_id}")
-
-            # Get dataset
-            dataset = (
-                db.query(Dataset).filter(Dataset.id == analysis.dataset_id).first()
+        return analysis_methods[analysis_type](
+            df, config, shared or SharedIntermediates(df)
+        )
+
+    def execute(
+        self,
+        dataset_id: int,
+        file_path: str,
+        analysis_type: str,
+        parameters: Dict[str, Any],
+        column_info: Optional[Dict[str, str]] = None,
+        column_stats: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Compute an analysis of the dataset stored at ``file_path``."""
+        if analysis_type == "batch":
+            if not parameters.get("analyses"):
+                raise ValueError("A batch needs a list of analyses")
+            return self.execute_batch(
+                dataset_id, file_path, parameters["analyses"], column_info, column_stats
             )
-            if not dataset:
-                raise ValueError(f"Dataset {analysis.dataset_id} not found")
 
-            # Load dataset
-            df = await self.load_dataset(dataset.file_path)
-            logger.info(f"Dataset loaded: {dataset.file_path}")
+        columns = self.required_columns(analysis_type, parameters, column_info)
+        results = self._execute_without_frame(
+            file_path, analysis_type, parameters, columns, column_info, column_stats
+        )
+        if results is not None:
+            return results
+
+        # Load only the columns the analysis references
+        df = dataset_cache.get(file_path, columns=columns)
+        logger.info(f"Dataset loaded: {file_path}")
+        return self.run_analysis(df, analysis_type, parameters)
+
+    def execute_batch(
+        self,
+        dataset_id: int,
+        file_path: str,
+        items: List[Dict[str, Any]],
+        column_info: Optional[Dict[str, str]] = None,
+        column_stats: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Compute several analyses of one dataset as one job.
+
+        Items answered from the sketches or by the chunked engine run on
+        their own. The rest share one load of the union of their columns
+        and one set of intermediates. A failing item is reported in its
+        place without stopping the others.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        in_memory = []
+        columns: Optional[List[str]] = []
+        for index, item in enumerate(items):
+            analysis_type, config = item["analysis_type"], item.get("config") or {}
+            try:
+                if analysis_type not in BATCH_ITEM_TYPES:
+                    raise ValueError(f"Unsupported analysis type: {analysis_type}")
+                item_columns = self.required_columns(analysis_type, config, column_info)
+                result = self._execute_without_frame(
+                    file_path,
+                    analysis_type,
+                    config,
+                    item_columns,
+                    column_info,
+                    column_stats,
+                )
+            except Exception as e:
+                results[index] = _batch_item(analysis_type, error=e)
+                continue
+            if result is not None:
+                results[index] = _batch_item(analysis_type, result)
+                continue
+            in_memory.append((index, analysis_type, config))
+            if columns is not None and item_columns is not None:
+                columns.extend(item_columns)
+            else:
+                columns = None
+
+        if in_memory:
+            if columns is not None:
+                # Unknown columns fail their own item rather than the load
+                columns = [
+                    column
+                    for column in unique_columns(columns)
+                    if not column_info or column in column_info
+                ]
+            try:
+                df = dataset_cache.get(file_path, columns=columns)
+            except OSError:
+                # A storage failure fails the job, which may then be retried
+                raise
+            except Exception as e:
+                for index, analysis_type, _ in in_memory:
+                    results[index] = _batch_item(analysis_type, error=e)
+                in_memory = []
+            else:
+                logger.info(
+                    f"Dataset loaded for {len(in_memory)} analyses: {file_path}"
+                )
+                shared = SharedIntermediates(df)
+            for index, analysis_type, config in in_memory:
+                try:
+                    result = self.run_analysis(df, analysis_type, config, shared)
+                except Exception as e:
+                    logger.error(f"Batch item {index} ({analysis_type}) failed: {e}")
+                    results[index] = _batch_item(analysis_type, error=e)
+                else:
+                    results[index] = _batch_item(analysis_type, result)
+
+        statuses = [item["status"] for item in results]
+        return {
+            "items": results,
+            "completed": statuses.count("completed"),
+            "failed": statuses.count("failed"),
+        }
 
-            # Run the actual analysis using run_analysis method
-            results = await self.run_analysis(
-                df, analysis.type.value, analysis.parameters
+    def _execute_without_frame(
+        self,
+        file_path: str,
+        analysis_type: str,
+        parameters: Dict[str, Any],
+        columns: Optional[List[str]],
+        column_info: Optional[Dict[str, str]],
+        column_stats: Optional[Dict[str, Any]],
+    ) -> Optional[Dict[str, Any]]:
+        """Results from the upload sketches or from streamed record batches.
+
+        Returns None when the analysis needs the frame in memory.
+        """
+        # Basic statistics come from the upload sketches unless exact
+        # values are requested
+        if analysis_type == "basic" and not parameters.get("exact"):
+            results = self.basic_statistics_from_sketches(
+                column_stats, columns or list(column_info or {})
             )
+            if results is not None:
+                return results
+
+        if should_run_chunked(file_path, analysis_type, parameters, columns):
+            # Too large to hold in memory: stream record batches
+            logger.info(f"Running {analysis_type} analysis in chunked mode")
+            return ChunkedAnalysisEngine(file_path).run(
+                analysis_type, parameters, columns or list(column_info or {})
+            )
+        return None
+
+    def basic_statistics_from_sketches(
+        self, column_stats: Optional[Dict[str, Any]], columns: List[str]
+    ) -> Optional[Dict[str, Any]]:
+        """Answer the ``basic`` analysis from upload-time column sketches.
+
+        Moments, min and max are exact; quartiles come from the KLL sketch.
+        Returns None when the dataset has no sketches for these columns.
+        """
+        if not column_stats or not all(
+            "count" in column_stats.get(col, {}) for col in columns
+        ):
+            return None
+        stats = {
+            column: ColumnSketch.from_dict(column_stats[column]).describe()
+            for column in columns
+            if "kll" in column_stats[column]
+        }
+        return {"descriptive_statistics": stats, "exact": False}
 
-            # Update analysis with results
-            analysis.results = results
-            analysis.status = AnalysisStatus.COMPLETED  # Using model's AnalysisStatus
-            db.commit()
-            logger.info(f"Analysis {analysis_id} completed successfully")
-
-        except Exception as e:
-            logger.error(f"Error in analysis {analysis_id}: {str(e)}", exc_info=True)
-            analysis.status = AnalysisStatus.FAILED  # Using model's AnalysisStatus
-            analysis.error_message = str(e)
-            db.commit()
-            raise e
-
-    async def _basic_statistics(
-        self, df: pd.DataFrame, config: Dict[str, Any]
+    def _basic_statistics(
+        self, df: pd.DataFrame, config: Dict[str, Any], shared: SharedIntermediates
     ) -> Dict[str, Any]:
         """Calculate basic statistics for numeric columns."""
         stats = {}
-        for column in df.select_dtypes(include=[np.number]).columns:
-            column_stats = df[column].describe()
-            stats[column] = {
-                "count": int(column_stats["count"]),
-                "mean": float(column_stats["mean"]),
-                "std": float(column_stats["std"]),
-                "min": float(column_stats["min"]),
-                "max": float(column_stats["max"]),
-                "median": float(df[column].median()),
-                "0.25": float(column_stats["25%"]),
-                "0.75": float(column_stats["75%"]),
-            }
-        return {"descriptive_statistics": stats}
+        # A batch may have loaded more columns than this analysis asked for
+        columns = (
+            unique_columns(config["columns"]) if config.get("columns") else df.columns
+        )
+        for column in df[columns].select_dtypes(include=[np.number]).columns:
+            stats[column] = dict(shared.describe(column))
+        return {"descriptive_statistics": stats, "exact": True}
 
-    async def _comparative_analysis(
-        self, df: pd.DataFrame, config: Dict[str, Any]
+    def _comparative_analysis(
+        self, df: pd.DataFrame, config: Dict[str, Any], shared: SharedIntermediates
     ) -> ComparativeStatistics:
         """Perform comparative analysis between groups."""
+        if config.get("target_columns"):
+            return self._batch_comparative_analysis(df, config, shared)
+
         target_column = config["target_column"]
         group_column = config["group_column"]
 
-        # Group statistics
-        groups = (
-            df.groupby(group_column)[target_column]
-            .agg(["count", "mean", "std", "min", "max", "median"])
-            .round(4)
-        )
-
-        # Statistical tests
-        unique_groups = df[group_column].unique()
-        group_data = [
-            df[df[group_column] == g][target_column].dropna() for g in unique_groups
-        ]
+        # Factorize the groups once; every statistic below reads this partition
+        groups = shared.codes(group_column)
+        partition = shared.partition(group_column, target_column)
+        group_statistics = partition.statistics().round(4)
+        group_data = partition.group_values()
+        labels = groups.labels
 
-        if len(unique_groups) == 2:
+        pairwise_tests = None
+        if len(labels) == 2:
             # T-test for two groups
             stat, pvalue = stats.ttest_ind(*group_data)
             test_name = "Independent t-test"
@@ -143,164 +313,217 @@ class AnalysisService:
             test_name = "One-way ANOVA"
 
             # Post-hoc Tukey test
-            if len(unique_groups) > 2:
-                tukey = stats.tukey_hsd(*group_data)
-                pairwise_tests = {
-                    f"{g1} vs {g2}": {
-                        "statistic": stat,
-                        "pvalue": pvalue,
-                        "significant": pvalue < 0.05,
-                    }
-                    for (g1, g2), stat, pvalue in zip(
-                        [
-                            (g1, g2)
-                            for i, g1 in enumerate(unique_groups)
-                            for g2 in unique_groups[i + 1 :]
-                        ],
-                        tukey.statistic,
-                        tukey.pvalue,
-                    )
+            tukey = stats.tukey_hsd(*group_data)
+            pairwise_tests = {
+                f"{labels[i]} vs {labels[j]}": {
+                    "statistic": float(tukey.statistic[i, j]),
+                    "pvalue": float(tukey.pvalue[i, j]),
+                    "significant": bool(tukey.pvalue[i, j] < 0.05),
                 }
+                for i in range(len(labels))
+                for j in range(i + 1, len(labels))
+            }
 
-        return {
-            "group_statistics": groups.to_dict(),
+        result = {
+            "group_statistics": group_statistics.to_dict(),
             "statistical_test": {
                 "name": test_name,
                 "statistic": float(stat),
                 "p_value": float(pvalue),
                 "significant": float(pvalue) < 0.05,
             },
-            "pairwise_tests": pairwise_tests if len(unique_groups) > 2 else None,
+            "pairwise_tests": pairwise_tests,
         }
+        if config.get("nonparametric"):
+            if len(labels) == 2:
+                rank_name = "Mann-Whitney U"
+                stat, pvalue = stats.mannwhitneyu(*group_data, method="asymptotic")
+            else:
+                rank_name = "Kruskal-Wallis H"
+                stat, pvalue = stats.kruskal(*group_data)
+            result["nonparametric_test"] = {
+                "name": rank_name,
+                "statistic": float(stat),
+                "p_value": float(pvalue),
+                "significant": float(pvalue) < 0.05,
+            }
+        if config.get("resampling"):
+            result["resampling"] = comparative_resampling(
+                partition, config["resampling"]
+            )
+        return result
+
+    def _batch_comparative_analysis(
+        self, df: pd.DataFrame, config: Dict[str, Any], shared: SharedIntermediates
+    ) -> BatchComparativeStatistics:
+        """Compare many target columns across one grouping in a single pass.
+
+        The grouping is factorized once and every test is computed for all
+        targets together. Post-hoc Tukey tests are left to single-target
+        runs.
+        """
+        target_columns = unique_columns(config["target_columns"])
+        group_column = config["group_column"]
 
-    async def _correlation_analysis(
-        self, df: pd.DataFrame, config: Dict[str, Any]
+        groups = shared.codes(group_column)
+        grouped = GroupedColumns(groups, shared.matrix(target_columns))
+        labels = groups.labels
+        statistics = grouped.statistics()
+
+        if len(labels) == 2:
+            test_name, test = "Independent t-test", grouped.t_test()
+            rank_name, rank_test = "Mann-Whitney U", grouped.mann_whitney
+        else:
+            test_name, test = "One-way ANOVA", grouped.anova()
+            rank_name, rank_test = "Kruskal-Wallis H", grouped.kruskal
+        nonparametric = rank_test() if config.get("nonparametric") else None
+
+        results = {}
+        for i, column in enumerate(target_columns):
+            group_statistics = {
+                name: {
+                    label: (
+                        int(values[g, i])
+                        if name == "count"
+                        else round(float(values[g, i]), 4)
+                    )
+                    for g, label in enumerate(labels)
+                }
+                for name, values in statistics.items()
+            }
+            results[column] = {
+                "group_statistics": group_statistics,
+                "statistical_test": self._test_result(test_name, test, i),
+                "pairwise_tests": None,
+            }
+            if nonparametric is not None:
+                results[column]["nonparametric_test"] = self._test_result(
+                    rank_name, nonparametric, i
+                )
+
+        return {"group_column": group_column, "groups": labels, "results": results}
+
+    @staticmethod
+    def _test_result(
+        name: str, test: Dict[str, np.ndarray], index: int
+    ) -> Dict[str, Any]:
+        p_value = float(test["p_value"][index])
+        return {
+            "name": name,
+            "statistic": float(test["statistic"][index]),
+            "p_value": p_value,
+            "significant": p_value < 0.05,
+        }
+
+    def _correlation_analysis(
+        self, df: pd.DataFrame, config: Dict[str, Any], shared: SharedIntermediates
     ) -> CorrelationAnalysis:
         """Perform correlation analysis."""
         columns = config.get("columns", [])
         if not columns:
             columns = df.select_dtypes(include=[np.number]).columns.tolist()
 
-        # Calculate correlation matrix
-        corr_matrix = df[columns].corr().round(4)
-
-        # Calculate p-values
-        p_values = pd.DataFrame(
-            np.zeros_like(corr_matrix), columns=columns, index=columns
-        )
-        for i in range(len(columns)):
-            for j in range(i + 1, len(columns)):
-                stat, p = stats.pearsonr(
-                    df[columns[i]].dropna(), df[columns[j]].dropna()
-                )
-                p_values.iloc[i, j] = p_values.iloc[j, i] = p
-
-        # Identify significant correlations
-        significant_correlations = []
-        for i in range(len(columns)):
-            for j in range(i + 1, len(columns)):
-                if p_values.iloc[i, j] < 0.05:
-                    significant_correlations.append(
-                        {
-                            "variable1": columns[i],
-                            "variable2": columns[j],
-                            "correlation": float(corr_matrix.iloc[i, j]),
-                            "p_value": float(p_values.iloc[i, j]),
-                        }
-                    )
-
-        return {
-            "correlation_matrix": corr_matrix.to_dict(),
-            "p_values": p_values.to_dict(),
-            "significant_correlations": significant_correlations,
-        }
+        method = config.get("method", "pearson")
+        values = shared.matrix(columns)
+        r, n, p_values = correlation_matrix(values, method)
+        result = {**correlation_results(columns, r, p_values), "method": method}
+        if config.get("resampling"):
+            result["resampling"] = correlation_resampling(
+                values, columns, method, config["resampling"]
+            )
+        return result
 
-    async def _chi_square_analysis(
-        self, df: pd.DataFrame, config: Dict[str, Any]
+    def _chi_square_analysis(
+        self, df: pd.DataFrame, config: Dict[str, Any], shared: SharedIntermediates
     ) -> ChiSquareAnalysis:
         """Perform chi-square analysis for categorical variables."""
-        variable1 = config["variable1"]
-        variable2 = config["variable2"]
-
-        # Create contingency table
-        contingency_table = pd.crosstab(df[variable1], df[variable2])
-
-        # Perform chi-square test
-        chi2, p_value, dof, expected = stats.chi2_contingency(contingency_table)
+        if config.get("variables"):
+            variables = unique_columns(config["variables"])
+            return association_matrix(
+                df,
+                variables,
+                config.get("max_table_cells"),
+                codes={column: shared.codes(column) for column in variables},
+            )
 
-        # Calculate Cramer's V
-        n = len(df)
-        min_dim = min(contingency_table.shape) - 1
-        cramer_v = np.sqrt(chi2 / (n * min_dim))
+        # Factorize both variables once; the table is built from their codes
+        table = SparseContingency.from_codes(
+            shared.codes(config["variable1"]), shared.codes(config["variable2"])
+        )
+        return chi_square_results(table, config)
 
-        return {
-            "contingency_table": contingency_table.to_dict(),
-            "chi_square_statistic": float(chi2),
-            "p_value": float(p_value),
-            "degrees_of_freedom": int(dof),
-            "cramers_v": float(cramer_v),
-            "significant": float(p_value) < 0.05,
+    def _regression_analysis(
+        self, df: pd.DataFrame, config: Dict[str, Any], shared: SharedIntermediates
+    ) -> RegressionAnalysis:
+        """Perform linear regression on one or more predictors."""
+        if config.get("screening_variables"):
+            return self._regression_screening(df, config, shared)
+
+        design = DesignMatrix(
+            df,
+            config["dependent_variable"],
+            regression_predictors(config),
+            config.get("categorical_variables"),
+        )
+        y = design.y
+        model = LeastSquares.fit(design.X, y, design.terms)
+        # fit() centered X in place; residuals need the centered intercept
+        residuals = y - y.mean() - design.X @ model.coefficients
+
+        ss_total = float(np.sum((y - y.mean()) ** 2))
+        ss_residual = float(residuals @ residuals)
+        names = coefficient_names(config, design.terms)
+        results = model.results(ss_total, ss_residual, names)
+        if design.reference_levels:
+            results["reference_levels"] = design.reference_levels
+        results["residuals_summary"] = {
+            "mean": float(np.mean(residuals)),
+            "std": float(np.std(residuals)),
+            "skewness": float(stats.skew(residuals)),
+            "kurtosis": float(stats.kurtosis(residuals)),
         }
+        if config.get("resampling"):
+            results["resampling"] = regression_resampling(
+                design.X,
+                y,
+                model.x_mean,
+                names,
+                np.concatenate([[model.intercept], model.coefficients]),
+                results["r_squared"],
+                config["resampling"],
+            )
+        return results
 
-    async def _regression_analysis(
-        self, df: pd.DataFrame, config: Dict[str, Any]
-    ) -> RegressionAnalysis:
-        """Perform simple linear regression analysis."""
+    def _regression_screening(
+        self, df: pd.DataFrame, config: Dict[str, Any], shared: SharedIntermediates
+    ) -> RegressionScreening:
+        """Regress the outcome on each screening variable separately."""
         dependent_var = config["dependent_variable"]
-        independent_var = config["independent_variable"]
+        predictors = unique_columns(config["screening_variables"])
 
-        # Prepare data
-        X = df[independent_var].values.reshape(-1, 1)
-        y = df[dependent_var].values
-
-        # Add constant for intercept
-        X = np.column_stack([np.ones(len(X)), X])
-
-        # Calculate regression coefficients
-        beta_hat = np.linalg.inv(X.T @ X) @ X.T @ y
+        screen = UnivariateScreen(len(predictors))
+        screen.update(shared.matrix(predictors), shared.values(dependent_var))
+        return screening_results(
+            dependent_var, screen.results(predictors), config.get("fdr_alpha")
+        )
 
-        # Calculate predicted values
-        y_pred = X @ beta_hat
 
-        # Calculate residuals
-        residuals = y - y_pred
+def _batch_item(
+    analysis_type: str,
+    results: Optional[Dict[str, Any]] = None,
+    error: Optional[Exception] = None,
+) -> Dict[str, Any]:
+    return {
+        "analysis_type": analysis_type,
+        "status": "failed" if error is not None else "completed",
+        "results": results,
+        "error": str(error) if error is not None else None,
+    }
 
-        # Calculate R-squared
-        ss_total = np.sum((y - np.mean(y)) ** 2)
-        ss_residual = np.sum(residuals**2)
-        r_squared = 1 - (ss_residual / ss_total)
 
-        # Calculate standard errors
-        n = len(X)
-        mse = ss_residual / (n - 2)
-        var_beta_hat = mse * np.linalg.inv(X.T @ X)
-        se_beta = np.sqrt(np.diag(var_beta_hat))
+analysis_service = AnalysisService()
 
-        # Calculate t-statistics and p-values
-        t_stats = beta_hat / se_beta
-        p_values = 2 * (1 - stats.t.cdf(np.abs(t_stats), df=n - 2))
 
-        return {
-            "coefficients": {
-                "intercept": float(beta_hat[0]),
-                "slope": float(beta_hat[1]),
-            },
-            "standard_errors": {
-                "intercept": float(se_beta[0]),
-                "slope": float(se_beta[1]),
-            },
-            "t_statistics": {
-                "intercept": float(t_stats[0]),
-                "slope": float(t_stats[1]),
-            },
-            "p_values": {"intercept": float(p_values[0]), "slope": float(p_values[1])},
-            "r_squared": float(r_squared),
-            "adjusted_r_squared": float(1 - (1 - r_squared) * (n - 1) / (n - 2)),
-            "sample_size": int(n),
-            "residuals_summary": {
-                "mean": float(np.mean(residuals)),
-                "std": float(np.std(residuals)),
-                "skewness": float(stats.skew(residuals)),
-                "kurtosis": float(stats.kurtosis(residuals)),
-            },
-        }
+def execute_analysis(*args: Any) -> Dict[str, Any]:
+    """Executor entry point; see ``AnalysisService.execute``."""
+    return analysis_service.execute(*args)
@@ -1,51 +1,536 @@
+import fnmatch
+import hashlib
 import json
-from typing import Any, Optional
-from redis import Redis
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional
+from redis import Redis, RedisError
+from redis.asyncio import BlockingConnectionPool
+from redis.asyncio import Redis as AsyncRedis
+from redis.backoff import NoBackoff
+from redis.retry import Retry
 from app.core.config import settings
+from app.services.codec import decode, encode
+from app.services.dataset_cache import file_fingerprint
 
+logger = logging.getLogger(__name__)
 
-class CacheService:
-    def __init__(self):
-        self.redis = Redis(
-            host=settings.REDIS_HOST,
-            port=settings.REDIS_PORT,
-            db=settings.REDIS_DB,
-            decode_responses=True,
+# Keys per UNLINK when deleting by pattern
+DELETE_BATCH_KEYS = 500
+# Namespaces whose keys embed a dataset fingerprint
+FINGERPRINTED_NAMESPACES = ("analysis", "visualization")
+
+
+def canonical_config(config: Dict[str, Any]) -> str:
+    """JSON of a config with sorted keys and unset (None) options dropped,
+    so equivalent requests serialize identically."""
+
+    def strip(value: Any) -> Any:
+        if isinstance(value, dict):
+            return {k: strip(v) for k, v in value.items() if v is not None}
+        if isinstance(value, (list, tuple)):
+            return [strip(v) for v in value]
+        return value
+
+    return json.dumps(strip(config), sort_keys=True, separators=(",", ":"))
+
+
+def dataset_fingerprint(dataset: Any) -> Optional[str]:
+    """Identity of a dataset's contents, or None if it cannot be determined."""
+    if getattr(dataset, "content_hash", None):
+        return dataset.content_hash
+    # Datasets stored before uploads were hashed: the stored file's identity
+    try:
+        return f"{dataset.id}-{file_fingerprint(dataset.file_path)}"
+    except OSError:
+        return None
+
+
+def is_cacheable(analysis_type: str, config: Dict[str, Any]) -> bool:
+    """False for analyses whose results are random, i.e. resampling without
+    a fixed seed."""
+    if analysis_type == "batch":
+        return all(
+            is_cacheable(item["analysis_type"], item.get("config") or {})
+            for item in config.get("analyses", [])
         )
-        self.default_ttl = 3600  # 1 hour
+    resampling = config.get("resampling")
+    return not resampling or resampling.get("seed") is not None
+
+
+def fingerprint_patterns(fingerprint: str) -> List[str]:
+    """Key patterns matching everything derived from a dataset's contents."""
+    return [f"{namespace}:*:{fingerprint}:*" for namespace in FINGERPRINTED_NAMESPACES]
+
+
+class _LocalEntry:
+    def __init__(self, payload: bytes, expires_at: float):
+        self.payload = payload
+        self.expires_at = expires_at
+        self.nbytes = len(payload)
+
+
+class LocalCache:
+    """In-process LRU of encoded values with a byte budget.
+
+    Entries expire after their TTL, capped at ``max_ttl`` when the cache
+    sits in front of Redis so that other processes' writes and deletes are
+    seen soon. Safe to share between threads, and between the sync and
+    async services of one process.
+    """
+
+    def __init__(self, max_bytes: int, max_ttl: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_ttl = max_ttl
+        self._entries: "OrderedDict[str, _LocalEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry.payload
+
+    def set(self, key: str, payload: bytes, ttl: int) -> None:
+        if self.max_ttl is not None:
+            ttl = min(ttl, self.max_ttl)
+        entry = _LocalEntry(payload, time.monotonic() + ttl)
+        with self._lock:
+            self._remove(key)
+            if entry.nbytes > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._remove(key)
+
+    def delete_matching(self, pattern: str) -> int:
+        """Drop the keys matching a glob pattern."""
+        with self._lock:
+            keys = [key for key in self._entries if fnmatch.fnmatchcase(key, pattern)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "local_entries": len(self._entries),
+                "local_bytes": self._bytes,
+                "local_max_bytes": self.max_bytes,
+            }
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry.nbytes
+        return True
+
+
+class _CacheKeys:
+    """Key layout shared by the sync and async services. Keys embed the
+    dataset fingerprint, so everything derived from one dataset's contents
+    can be deleted by pattern."""
 
     def _generate_key(self, prefix: str, identifier: str) -> str:
         return f"{prefix}:{identifier}"
 
+    def get_analysis_cache_key(
+        self, dataset_fingerprint: str, analysis_type: str, params: dict
+    ) -> str:
+        """Generate a cache key for analysis results"""
+        return self._generate_key(
+            f"analysis:{analysis_type}",
+            f"{dataset_fingerprint}:{self._digest(params)}",
+        )
+
+    def get_visualization_cache_key(
+        self,
+        dataset_fingerprint: str,
+        viz_type: str,
+        columns: List[str],
+        parameters: Optional[dict] = None,
+    ) -> str:
+        """Generate a cache key for chart data"""
+        params = {"columns": columns, "parameters": parameters}
+        return self._generate_key(
+            f"visualization:{viz_type}",
+            f"{dataset_fingerprint}:{self._digest(params)}",
+        )
+
+    @staticmethod
+    def _digest(params: dict) -> str:
+        return hashlib.sha256(canonical_config(params).encode()).hexdigest()
+
+
+class CacheService(_CacheKeys):
+    """Two-tier cache of serialized results for synchronous callers: the
+    analysis workers and sync endpoints.
+
+    An in-process LRU with a byte budget and a short TTL sits in front of
+    Redis, which is shared by the API and the workers. Values are stored
+    in the compact results encoding in both tiers, so callers never share
+    mutable objects. Redis can be disabled, leaving the local tier alone;
+    when it is configured but unreachable, lookups fall back to the local
+    tier and Redis is retried after ``CACHE_REDIS_RETRY_SECONDS``.
+    """
+
+    def __init__(
+        self,
+        redis: Optional[Redis] = None,
+        local_max_bytes: int = settings.CACHE_LOCAL_MAX_BYTES,
+        local_ttl: int = settings.CACHE_LOCAL_TTL_SECONDS,
+        default_ttl: int = settings.CACHE_TTL_SECONDS,
+        local: Optional[LocalCache] = None,
+    ):
+        self.redis = redis
+        self.default_ttl = default_ttl
+        self.local = local or LocalCache(
+            local_max_bytes, local_ttl if redis is not None else None
+        )
+        self._redis_retry_at = 0.0
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.redis_errors = 0
+
     def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
         try:
-            serialized_value = json.dumps(value)
-            return self.redis.set(
-                key, serialized_value, ex=ttl if ttl is not None else self.default_ttl
-            )
-        except (TypeError, json.JSONDecodeError):
+            serialized_value = encode(value)
+        except (TypeError, ValueError, OverflowError):
             return False
+        ttl = ttl if ttl is not None else self.default_ttl
+        self.local.set(key, serialized_value, ttl)
+        stored = self._call_redis(
+            lambda redis: redis.set(key, serialized_value, ex=ttl)
+        )
+        return True if stored is None else bool(stored)
 
     def get(self, key: str) -> Optional[Any]:
-        try:
-            value = self.redis.get(key)
-            if value is None:
+        payload = self.local.get(key)
+        if payload is not None:
+            self.local_hits += 1
+        else:
+            payload = self._call_redis(lambda redis: redis.get(key))
+            if payload is None:
+                self.misses += 1
                 return None
-            return json.loads(value)
-        except (TypeError, json.JSONDecodeError):
-            return None
+            self.redis_hits += 1
+            self.local.set(key, payload, self.default_ttl)
+        return _decode(payload)
 
     def delete(self, key: str) -> bool:
-        return bool(self.redis.delete(key))
+        removed = self.local.delete(key)
+        deleted = self._call_redis(lambda redis: redis.delete(key))
+        return bool(deleted) or removed
 
-    def get_analysis_cache_key(
-        self, dataset_id: str, analysis_type: str, params: dict
-    ) -> str:
-        """Generate a cache key for analysis results"""
-        params_str = json.dumps(params, sort_keys=True)
-        return self._generate_key(
-            f"analysis:{analysis_type}", f"{dataset_id}:{params_str}"
+    def delete_matching(self, pattern: str) -> int:
+        """Drop every key matching a glob pattern. Redis is scanned and the
+        matches unlinked in one pipeline."""
+        removed = self.local.delete_matching(pattern)
+
+        def drop(redis: Redis) -> int:
+            with redis.pipeline(transaction=False) as pipeline:
+                for batch in _batches(redis.scan_iter(match=pattern, count=1000)):
+                    pipeline.unlink(*batch)
+                return sum(pipeline.execute())
+
+        return max(removed, self._call_redis(drop) or 0)
+
+    def invalidate_fingerprint(self, fingerprint: str) -> None:
+        """Drop every key derived from a dataset's contents."""
+        for pattern in fingerprint_patterns(fingerprint):
+            self.delete_matching(pattern)
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.local_hits + self.redis_hits
+        lookups = hits + self.misses
+        return {
+            **self.local.stats(),
+            "local_hits": self.local_hits,
+            "redis_enabled": self.redis is not None,
+            "redis_hits": self.redis_hits,
+            "redis_errors": self.redis_errors,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+    def _call_redis(self, operation: Callable[[Redis], Any]) -> Any:
+        if self.redis is None or time.monotonic() < self._redis_retry_at:
+            return None
+        try:
+            return operation(self.redis)
+        except RedisError as e:
+            self.redis_errors += 1
+            self._redis_retry_at = time.monotonic() + settings.CACHE_REDIS_RETRY_SECONDS
+            logger.warning(f"Redis unavailable, using the local cache only: {e}")
+            return None
+
+
+class MemoryBackend:
+    """Async cache backend holding values in a ``LocalCache``, for tests and
+    single-node deployments without Redis."""
+
+    def __init__(self, local: LocalCache):
+        self.local = local
+
+    async def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        return [self.local.get(key) for key in keys]
+
+    async def mset(self, items: Dict[str, bytes], ttl: int) -> None:
+        for key, payload in items.items():
+            self.local.set(key, payload, ttl)
+
+    async def delete(self, keys: List[str]) -> int:
+        return sum(self.local.delete(key) for key in keys)
+
+    async def delete_matching(self, pattern: str) -> int:
+        return self.local.delete_matching(pattern)
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisBackend:
+    """Async cache backend on ``redis.asyncio`` with a bounded connection
+    pool.
+
+    Requests wait up to ``CACHE_REDIS_POOL_TIMEOUT_SECONDS`` for a free
+    connection. Multi-key writes and deletes by pattern are pipelined, so
+    they cost one round trip however many keys they touch.
+    """
+
+    def __init__(self, redis: AsyncRedis):
+        self.redis = redis
+
+    @classmethod
+    def from_settings(cls) -> "RedisBackend":
+        pool = BlockingConnectionPool(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            password=settings.REDIS_PASSWORD,
+            max_connections=settings.CACHE_REDIS_MAX_CONNECTIONS,
+            timeout=settings.CACHE_REDIS_POOL_TIMEOUT_SECONDS,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+            # A miss is cheaper than waiting out connection retries
+            retry=Retry(NoBackoff(), 0),
         )
+        return cls(AsyncRedis(connection_pool=pool))
+
+    async def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        return await self.redis.mget(keys) if keys else []
+
+    async def mset(self, items: Dict[str, bytes], ttl: int) -> None:
+        # MSET cannot set expiries
+        async with self.redis.pipeline(transaction=False) as pipeline:
+            for key, payload in items.items():
+                pipeline.set(key, payload, ex=ttl)
+            await pipeline.execute()
+
+    async def delete(self, keys: List[str]) -> int:
+        return await self.redis.unlink(*keys) if keys else 0
+
+    async def delete_matching(self, pattern: str) -> int:
+        async with self.redis.pipeline(transaction=False) as pipeline:
+            batch: List[bytes] = []
+            async for key in self.redis.scan_iter(match=pattern, count=1000):
+                batch.append(key)
+                if len(batch) == DELETE_BATCH_KEYS:
+                    pipeline.unlink(*batch)
+                    batch = []
+            if batch:
+                pipeline.unlink(*batch)
+            return sum(await pipeline.execute())
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+        await self.redis.connection_pool.disconnect()
+
+
+class AsyncCacheService(_CacheKeys):
+    """The result cache for ``async`` endpoints.
+
+    Wraps a ``RedisBackend`` or ``MemoryBackend`` so cache round trips never
+    block the event loop, optionally behind a ``LocalCache`` shared with
+    the sync service. Several keys are read or written in one backend
+    request. Backend failures are handled like ``CacheService``'s: lookups
+    miss and the backend is retried after ``CACHE_REDIS_RETRY_SECONDS``.
+    """
+
+    def __init__(
+        self,
+        backend: Any,
+        local: Optional[LocalCache] = None,
+        default_ttl: int = settings.CACHE_TTL_SECONDS,
+    ):
+        self.backend = backend
+        self.local = local
+        self.default_ttl = default_ttl
+        self._backend_retry_at = 0.0
+        self.local_hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+        self.backend_errors = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        return (await self.mget([key]))[0]
 
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """Values of the keys, None for misses."""
+        payloads = [self.local.get(key) if self.local else None for key in keys]
+        self.local_hits += sum(payload is not None for payload in payloads)
+        missing = [i for i, payload in enumerate(payloads) if payload is None]
+        if missing:
+            fetched = await self._call_backend(
+                lambda backend: backend.mget([keys[i] for i in missing])
+            )
+            for i, payload in zip(missing, fetched or []):
+                if payload is None:
+                    continue
+                payloads[i] = payload
+                self.backend_hits += 1
+                if self.local:
+                    self.local.set(keys[i], payload, self.default_ttl)
+        self.misses += sum(payload is None for payload in payloads)
+        return [_decode(payload) for payload in payloads]
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        return await self.mset({key: value}, ttl)
+
+    async def mset(self, items: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """Store several values; if any cannot be serialized, none is."""
+        try:
+            payloads = {key: encode(value) for key, value in items.items()}
+        except (TypeError, ValueError, OverflowError):
+            return False
+        ttl = ttl if ttl is not None else self.default_ttl
+        if self.local:
+            for key, payload in payloads.items():
+                self.local.set(key, payload, ttl)
+        await self._call_backend(lambda backend: backend.mset(payloads, ttl))
+        return True
+
+    async def delete(self, key: str) -> bool:
+        removed = self.local.delete(key) if self.local else False
+        deleted = await self._call_backend(lambda backend: backend.delete([key]))
+        return bool(deleted) or removed
+
+    async def delete_matching(self, pattern: str) -> int:
+        """Drop every key matching a glob pattern, e.g. ``analysis:*``."""
+        removed = self.local.delete_matching(pattern) if self.local else 0
+        deleted = await self._call_backend(
+            lambda backend: backend.delete_matching(pattern)
+        )
+        return max(removed, deleted or 0)
+
+    async def invalidate_fingerprint(self, fingerprint: str) -> None:
+        """Drop every key derived from a dataset's contents."""
+        for pattern in fingerprint_patterns(fingerprint):
+            await self.delete_matching(pattern)
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.local_hits + self.backend_hits
+        lookups = hits + self.misses
+        return {
+            **(self.local.stats() if self.local else {}),
+            "backend": type(self.backend).__name__,
+            "local_hits": self.local_hits,
+            "backend_hits": self.backend_hits,
+            "backend_errors": self.backend_errors,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+    async def _call_backend(self, operation: Callable[[Any], Awaitable[Any]]) -> Any:
+        if time.monotonic() < self._backend_retry_at:
+            return None
+        try:
+            return await operation(self.backend)
+        except RedisError as e:
+            self.backend_errors += 1
+            self._backend_retry_at = (
+                time.monotonic() + settings.CACHE_REDIS_RETRY_SECONDS
+            )
+            logger.warning(f"Redis unavailable, using the local cache only: {e}")
+            return None
+
+
+def _decode(payload: Optional[bytes]) -> Optional[Any]:
+    if payload is None:
+        return None
+    try:
+        return decode(payload)
+    except ValueError:
+        # Written by an older release, or corrupt: a miss
+        return None
+
+
+def _batches(keys: Iterable[Any], size: int = DELETE_BATCH_KEYS) -> Iterator[List]:
+    batch = []
+    for key in keys:
+        batch.append(key)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def analysis_cache_key(
+    dataset: Any, analysis_type: str, config: Dict[str, Any]
+) -> Optional[str]:
+    """Cache key of an analysis, or None if its results must not be cached."""
+    fingerprint = dataset_fingerprint(dataset)
+    if fingerprint is None or not is_cacheable(analysis_type, config):
+        return None
+    return cache_service.get_analysis_cache_key(fingerprint, analysis_type, config)
+
+
+# One local tier per process, shared by the API's async service and the
+# sync service of an embedded worker; without Redis it is the whole cache
+local_cache = LocalCache(
+    settings.CACHE_LOCAL_MAX_BYTES,
+    settings.CACHE_LOCAL_TTL_SECONDS if settings.CACHE_REDIS_ENABLED else None,
+)
+
+cache_service = CacheService(
+    (
+        Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            password=settings.REDIS_PASSWORD,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+            # A miss is cheaper than waiting out connection retries
+            retry=Retry(NoBackoff(), 0),
+        )
+        if settings.CACHE_REDIS_ENABLED
+        else None
+    ),
+    local=local_cache,
+)
 
-cache_service = CacheService()
+async_cache_service = (
+    AsyncCacheService(RedisBackend.from_settings(), local=local_cache)
+    if settings.CACHE_REDIS_ENABLED
+    else AsyncCacheService(MemoryBackend(local_cache))
+)
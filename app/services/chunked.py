@@ -0,0 +1,360 @@
+import math
+from typing import Any, Dict, Iterator, List, Optional
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from scipy import stats
+from app.core.config import settings
+from app.services.correlation import (
+    PairwiseMoments,
+    correlation_p_values,
+    correlation_results,
+)
+from app.services.contingency import SparseContingency, chi_square_results
+from app.services.dataset_io import PARQUET_EXTENSION
+from app.services.object_storage import open_stored
+from app.services.regression import (
+    LeastSquares,
+    UnivariateScreen,
+    coefficient_names,
+    regression_predictors,
+    screening_results,
+)
+from app.services.sketches import ColumnSketch
+
+CHUNKED_ANALYSIS_TYPES = ("basic", "correlation", "chi_square", "regression")
+
+# Rank margin around each KLL quartile estimate; the exact order statistic
+# is searched among the values that fall inside it
+QUANTILE_RANK_MARGIN = 0.015
+QUARTILES = {"0.25": 0.25, "median": 0.5, "0.75": 0.75}
+
+
+def projected_size(file_path: str, columns: Optional[List[str]] = None) -> int:
+    """Uncompressed bytes of the given Parquet columns, read from the footer."""
+    with open_stored(file_path) as source:
+        metadata = pq.ParquetFile(source).metadata
+    total = 0
+    for row_group in range(metadata.num_row_groups):
+        group = metadata.row_group(row_group)
+        for index in range(group.num_columns):
+            chunk = group.column(index)
+            if columns is None or chunk.path_in_schema in columns:
+                total += chunk.total_uncompressed_size
+    return total
+
+
+def should_run_chunked(
+    file_path: str,
+    analysis_type: str,
+    config: Dict[str, Any],
+    columns: Optional[List[str]] = None,
+) -> bool:
+    """Whether an analysis is large enough to run over record batches."""
+    # Resampling draws rows at random from the whole dataset
+    if config.get("resampling"):
+        return False
+    # Rank correlations need each column sorted as a whole
+    if analysis_type == "correlation" and config.get("method", "pearson") != "pearson":
+        return False
+    # The association matrix keeps every column's codes in memory
+    if analysis_type == "chi_square" and config.get("variables"):
+        return False
+    # Dummy coding needs every level of a categorical predictor up front
+    if analysis_type == "regression" and config.get("categorical_variables"):
+        return False
+    return (
+        analysis_type in CHUNKED_ANALYSIS_TYPES
+        and file_path.endswith(PARQUET_EXTENSION)
+        and projected_size(file_path, columns)
+        > settings.CHUNKED_ANALYSIS_THRESHOLD_BYTES
+    )
+
+
+class Moments:
+    """Mergeable count, mean and central moments up to the fourth (Pébay)."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+
+    def update(self, values: np.ndarray) -> None:
+        if len(values) == 0:
+            return
+        mean = values.mean()
+        deviations = values - mean
+        self.merge(
+            len(values),
+            mean,
+            (deviations**2).sum(),
+            (deviations**3).sum(),
+            (deviations**4).sum(),
+        )
+
+    def merge(self, n: int, mean: float, m2: float, m3: float, m4: float) -> None:
+        na, nb = self.n, n
+        total = na + nb
+        delta = mean - self.mean
+        self.m4 += (
+            m4
+            + delta**4 * na * nb * (na * na - na * nb + nb * nb) / total**3
+            + 6 * delta**2 * (na * na * m2 + nb * nb * self.m2) / total**2
+            + 4 * delta * (na * m3 - nb * self.m3) / total
+        )
+        self.m3 += (
+            m3
+            + delta**3 * na * nb * (na - nb) / total**2
+            + 3 * delta * (na * m2 - nb * self.m2) / total
+        )
+        self.m2 += m2 + delta**2 * na * nb / total
+        self.mean += delta * nb / total
+        self.n = total
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation, as ``np.std``."""
+        return math.sqrt(self.m2 / self.n)
+
+    @property
+    def skewness(self) -> float:
+        """Biased sample skewness, as ``scipy.stats.skew``."""
+        return (self.m3 / self.n) / (self.m2 / self.n) ** 1.5
+
+    @property
+    def kurtosis(self) -> float:
+        """Biased excess kurtosis, as ``scipy.stats.kurtosis``."""
+        return (self.m4 / self.n) / (self.m2 / self.n) ** 2 - 3.0
+
+
+class ChunkedAnalysisEngine:
+    """Runs analyses over Parquet record batches with bounded memory.
+
+    Every analysis keeps only accumulators between batches: sketches and
+    quartile windows for basic statistics, masked cross-products for
+    correlation, normal equations for regression and partial crosstabs
+    for chi-square. Results have the same shape as the in-memory
+    ``AnalysisService`` methods and agree with them to floating-point
+    tolerance.
+    """
+
+    def __init__(self, file_path: str, batch_rows: Optional[int] = None):
+        self.file_path = file_path
+        self.batch_rows = batch_rows or settings.CHUNKED_BATCH_ROWS
+
+    def batches(self, columns: List[str]) -> Iterator[pd.DataFrame]:
+        with open_stored(self.file_path) as source:
+            parquet_file = pq.ParquetFile(source)
+            for batch in parquet_file.iter_batches(
+                batch_size=self.batch_rows, columns=columns
+            ):
+                yield batch.to_pandas()
+
+    def run(
+        self, analysis_type: str, config: Dict[str, Any], columns: List[str]
+    ) -> Dict[str, Any]:
+        methods = {
+            "basic": self.basic_statistics,
+            "correlation": self.correlation_analysis,
+            "chi_square": self.chi_square_analysis,
+            "regression": self.regression_analysis,
+        }
+        if analysis_type not in methods:
+            raise ValueError(f"Analysis type {analysis_type} cannot run chunked")
+        return methods[analysis_type](config, columns)
+
+    def _numeric_columns(self, columns: List[str]) -> List[str]:
+        with open_stored(self.file_path) as source:
+            schema = pq.ParquetFile(source).schema_arrow
+        numeric = []
+        for column in columns:
+            dtype = schema.field(column).type.to_pandas_dtype()
+            if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(
+                dtype
+            ):
+                numeric.append(column)
+        return numeric
+
+    def basic_statistics(
+        self, config: Dict[str, Any], columns: List[str]
+    ) -> Dict[str, Any]:
+        columns = self._numeric_columns(columns)
+
+        # Pass 1: moments, extremes and a quantile sketch per column
+        sketches = {col: ColumnSketch(numeric=True) for col in columns}
+        for batch in self.batches(columns):
+            for column in columns:
+                sketches[column].update(batch[column])
+
+        # Pass 2: for each quartile, count values below a window around the
+        # sketch estimate and keep the values inside it
+        windows = {}
+        for column, sketch in sketches.items():
+            if not sketch.count:
+                continue
+            for key, q in QUARTILES.items():
+                low = sketch.kll.quantile(max(0.0, q - QUANTILE_RANK_MARGIN))
+                high = sketch.kll.quantile(min(1.0, q + QUANTILE_RANK_MARGIN))
+                windows[column, key] = {
+                    "low": low,
+                    "high": high,
+                    "below": 0,
+                    "values": [],
+                }
+        for batch in self.batches(columns):
+            for (column, _), window in windows.items():
+                values = batch[column].to_numpy(dtype=float)
+                values = values[~np.isnan(values)]
+                window["below"] += int(np.count_nonzero(values < window["low"]))
+                inside = (values >= window["low"]) & (values <= window["high"])
+                window["values"].append(values[inside])
+
+        results = {}
+        exact = True
+        for column, sketch in sketches.items():
+            column_stats = sketch.describe()
+            for key, q in QUARTILES.items():
+                if (column, key) not in windows:
+                    continue
+                value = self._exact_quantile(windows[column, key], sketch.count, q)
+                if value is None:
+                    # The sketch missed by more than the margin; keep its estimate
+                    exact = False
+                else:
+                    column_stats[key] = value
+            results[column] = column_stats
+        return {"descriptive_statistics": results, "exact": exact}
+
+    @staticmethod
+    def _exact_quantile(
+        window: Dict[str, Any], count: int, q: float
+    ) -> Optional[float]:
+        # Linear interpolation between order statistics, as pandas does
+        position = (count - 1) * q
+        lower = int(math.floor(position)) - window["below"]
+        upper = int(math.ceil(position)) - window["below"]
+        values = np.sort(np.concatenate(window["values"]))
+        if lower < 0 or upper >= len(values):
+            return None
+        fraction = position - math.floor(position)
+        return float(values[lower] + (values[upper] - values[lower]) * fraction)
+
+    def correlation_analysis(
+        self, config: Dict[str, Any], columns: List[str]
+    ) -> Dict[str, Any]:
+        columns = self._numeric_columns(columns)
+        moments = PairwiseMoments(len(columns))
+        for batch in self.batches(columns):
+            moments.update(batch[columns].to_numpy(dtype=float))
+
+        r, n = moments.correlation()
+        return {
+            **correlation_results(columns, r, correlation_p_values(r, n)),
+            "method": "pearson",
+        }
+
+    def chi_square_analysis(
+        self, config: Dict[str, Any], columns: List[str]
+    ) -> Dict[str, Any]:
+        variable1 = config["variable1"]
+        variable2 = config["variable2"]
+
+        counts: Optional[pd.Series] = None
+        for batch in self.batches(columns):
+            batch_counts = batch.groupby([variable1, variable2]).size()
+            counts = (
+                batch_counts
+                if counts is None
+                else counts.add(batch_counts, fill_value=0)
+            )
+
+        return chi_square_results(
+            SparseContingency.from_series(counts.astype(np.int64)), config
+        )
+
+    def regression_analysis(
+        self, config: Dict[str, Any], columns: List[str]
+    ) -> Dict[str, Any]:
+        dependent_var = config["dependent_variable"]
+        predictors = regression_predictors(config)
+        if config.get("screening_variables"):
+            return self._regression_screening(dependent_var, predictors, config)
+        if config.get("categorical_variables") or len(
+            self._numeric_columns(predictors)
+        ) < len(predictors):
+            raise ValueError("Chunked regression supports numeric predictors only")
+
+        # Pass 1: sums and cross-products of data shifted by the first batch
+        # means, so centering at the end does not cancel catastrophically
+        p = len(predictors)
+        n = 0
+        shift = None
+        sum_x, sum_y = np.zeros(p), 0.0
+        sxx, sxy, syy = np.zeros((p, p)), np.zeros(p), 0.0
+        for batch in self.batches(columns):
+            X, y = self._complete_rows(batch, predictors, dependent_var)
+            if shift is None:
+                if len(y) == 0:
+                    continue
+                shift = (X.mean(axis=0), y.mean())
+            X -= shift[0]
+            y -= shift[1]
+            sum_x += X.sum(axis=0)
+            sum_y += y.sum()
+            sxx += X.T @ X
+            sxy += X.T @ y
+            syy += y @ y
+            n += len(y)
+        if shift is None:
+            raise ValueError("Not enough complete rows to fit the regression")
+
+        dx, dy = sum_x / n, sum_y / n
+        model = LeastSquares(
+            n,
+            shift[0] + dx,
+            shift[1] + dy,
+            sxx - n * np.outer(dx, dx),
+            sxy - n * dx * dy,
+            predictors,
+        )
+        ss_total = syy - n * dy * dy
+
+        # Pass 2: residuals, for their moments and an exact residual sum
+        residual_moments = Moments()
+        for batch in self.batches(columns):
+            X, y = self._complete_rows(batch, predictors, dependent_var)
+            residual_moments.update(y - model.predict(X))
+        ss_residual = residual_moments.m2 + n * residual_moments.mean**2
+
+        results = model.results(
+            ss_total, ss_residual, coefficient_names(config, predictors)
+        )
+        results["residuals_summary"] = {
+            "mean": float(residual_moments.mean),
+            "std": float(residual_moments.std),
+            "skewness": float(residual_moments.skewness),
+            "kurtosis": float(residual_moments.kurtosis),
+        }
+        return results
+
+    def _regression_screening(
+        self, dependent_var: str, predictors: List[str], config: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        screen = UnivariateScreen(len(predictors))
+        for batch in self.batches([*predictors, dependent_var]):
+            screen.update(
+                batch[predictors].to_numpy(dtype=float),
+                batch[dependent_var].to_numpy(dtype=float),
+            )
+        return screening_results(
+            dependent_var, screen.results(predictors), config.get("fdr_alpha")
+        )
+
+    @staticmethod
+    def _complete_rows(batch: pd.DataFrame, x_columns: List[str], y_column: str):
+        X = batch[x_columns].to_numpy(dtype=float)
+        y = batch[y_column].to_numpy(dtype=float)
+        complete = ~(np.isnan(X).any(axis=1) | np.isnan(y))
+        return X[complete], y[complete]
@@ -0,0 +1,80 @@
+"""Compact encoding of analysis results.
+
+Matrices are kept as their labels plus one flat row-major list of values
+rather than the nested dicts of ``DataFrame.to_dict()``, which repeat every
+label once per cell. Encoded results are msgpack, compressed with zstd
+when large; a one-byte header records which.
+"""
+
+from typing import Any, Dict, Sequence
+import msgpack
+import numpy as np
+import zstandard
+from app.core.config import settings
+
+_RAW = b"\x00"
+_ZSTD = b"\x01"
+
+
+def compact_matrix(labels: Sequence[Any], values: np.ndarray) -> Dict[str, Any]:
+    """A square matrix as ``{"columns": labels, "values": row-major values}``."""
+    return {
+        "columns": list(labels),
+        "values": np.asarray(values, dtype=float).ravel().tolist(),
+    }
+
+
+def is_compact_matrix(value: Any) -> bool:
+    return (
+        isinstance(value, dict)
+        and value.keys() == {"columns", "values"}
+        and isinstance(value["values"], list)
+        and len(value["values"]) == len(value["columns"]) ** 2
+    )
+
+
+def expand_matrix(matrix: Dict[str, Any]) -> Dict[Any, Dict[Any, float]]:
+    """The ``DataFrame.to_dict()`` shape of a compact matrix: column, then
+    row, to value."""
+    columns, values = matrix["columns"], matrix["values"]
+    k = len(columns)
+    return {
+        column: {row: values[i * k + j] for i, row in enumerate(columns)}
+        for j, column in enumerate(columns)
+    }
+
+
+def expand_results(results: Any) -> Any:
+    """Results with every compact matrix in the legacy nested-dict shape."""
+    if is_compact_matrix(results):
+        return expand_matrix(results)
+    if isinstance(results, dict):
+        return {key: expand_results(value) for key, value in results.items()}
+    if isinstance(results, list):
+        return [expand_results(value) for value in results]
+    return results
+
+
+def encode(value: Any) -> bytes:
+    """Encode a JSON-like value; raises TypeError for anything msgpack
+    cannot represent."""
+    packed = msgpack.packb(value, use_single_float=settings.RESULTS_FLOAT32)
+    if len(packed) < settings.RESULTS_COMPRESS_MIN_BYTES:
+        return _RAW + packed
+    compressor = zstandard.ZstdCompressor(level=settings.RESULTS_ZSTD_LEVEL)
+    return _ZSTD + compressor.compress(packed)
+
+
+def decode(payload: bytes) -> Any:
+    """Decode a value written by ``encode``; raises ValueError for anything
+    else."""
+    header, body = payload[:1], payload[1:]
+    try:
+        if header == _ZSTD:
+            body = zstandard.ZstdDecompressor().decompress(body)
+        elif header != _RAW:
+            raise ValueError("Unknown results encoding")
+        # Tables keyed by numeric categories have integer keys
+        return msgpack.unpackb(body, strict_map_key=False)
+    except (zstandard.ZstdError, msgpack.UnpackException) as e:
+        raise ValueError(f"Corrupt results payload: {str(e)}") from e
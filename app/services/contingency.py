@@ -0,0 +1,283 @@
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from scipy import sparse, stats
+from app.services.groups import GroupCodes
+
+# Pairs whose contingency table would have more cells than this are skipped
+# by the association matrix, and single tables this large are kept sparse
+MAX_TABLE_CELLS = 10_000
+# Rows of a contingency table returned per page
+TABLE_PAGE_ROWS = 100
+OTHER_LABEL = "other"
+
+
+def contingency_counts(first: GroupCodes, second: GroupCodes) -> np.ndarray:
+    """Dense contingency table of two factorized columns via one ``bincount``.
+
+    Rows missing either value are left out. Levels that never occur
+    together with a value of the other column keep an all-zero row or
+    column; see ``chi_square_test``.
+    """
+    complete = (first.codes >= 0) & (second.codes >= 0)
+    combined = first.codes[complete] * second.n_groups + second.codes[complete]
+    counts = np.bincount(combined, minlength=first.n_groups * second.n_groups)
+    return counts.reshape(first.n_groups, second.n_groups)
+
+
+def chi_square_test(table: np.ndarray) -> Dict[str, Any]:
+    """Chi-square test of independence and Cramér's V for a count table.
+
+    Empty rows and columns are dropped first, as ``pd.crosstab`` would
+    never produce them.
+    """
+    table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+    n = int(table.sum())
+    min_dim = min(table.shape) - 1
+    if min_dim < 1:
+        raise ValueError("Chi-square test needs at least two levels in each variable")
+
+    chi2, p_value, dof, _ = stats.chi2_contingency(table)
+    return {
+        "chi_square_statistic": float(chi2),
+        "p_value": float(p_value),
+        "degrees_of_freedom": int(dof),
+        "cramers_v": float(np.sqrt(chi2 / (n * min_dim))),
+        "significant": float(p_value) < 0.05,
+        "sample_size": n,
+    }
+
+
+def association_matrix(
+    df: pd.DataFrame,
+    variables: List[str],
+    max_cells: Optional[int] = None,
+    codes: Optional[Dict[str, GroupCodes]] = None,
+) -> Dict[str, Any]:
+    """Chi-square and Cramér's V for every pair of categorical columns.
+
+    Each column is factorized once; every pair's table then costs one
+    ``bincount`` over the combined codes. Pairs whose table would exceed
+    ``max_cells`` cells, or that have fewer than two levels on a side, are
+    reported in ``skipped_pairs`` instead. Columns already factorized can
+    be passed in ``codes``.
+    """
+    max_cells = max_cells or MAX_TABLE_CELLS
+    codes = codes or {column: GroupCodes(df[column]) for column in variables}
+
+    pairs = []
+    skipped = []
+    cramers_v = {column: {other: None for other in variables} for column in variables}
+    for column in variables:
+        cramers_v[column][column] = 1.0
+    for i, first in enumerate(variables):
+        for second in variables[i + 1 :]:
+            cells = codes[first].n_groups * codes[second].n_groups
+            if cells > max_cells:
+                skipped.append(
+                    {
+                        "variable1": first,
+                        "variable2": second,
+                        "reason": f"Contingency table would have {cells} cells",
+                    }
+                )
+                continue
+            try:
+                result = chi_square_test(
+                    contingency_counts(codes[first], codes[second])
+                )
+            except ValueError as e:
+                skipped.append(
+                    {"variable1": first, "variable2": second, "reason": str(e)}
+                )
+                continue
+            pairs.append({"variable1": first, "variable2": second, **result})
+            cramers_v[first][second] = cramers_v[second][first] = result["cramers_v"]
+
+    return {
+        "variables": variables,
+        "cramers_v_matrix": cramers_v,
+        "pairs": pairs,
+        "skipped_pairs": skipped,
+    }
+
+
+class SparseContingency:
+    """Contingency table stored as its non-zero cells.
+
+    Built from factorized codes with ``bincount`` when the full table is
+    small and from the unique combined codes otherwise, so memory follows
+    the number of level pairs that actually occur rather than the product
+    of the cardinalities. Statistics are always computed on the full table;
+    only the returned table is paginated.
+    """
+
+    def __init__(
+        self,
+        row_labels: List[Any],
+        column_labels: List[Any],
+        counts: sparse.coo_matrix,
+    ):
+        counts = counts.tocsr()
+        counts.sum_duplicates()
+        # Levels with no complete rows would never appear in a crosstab
+        row_totals = np.asarray(counts.sum(axis=1)).ravel()
+        column_totals = np.asarray(counts.sum(axis=0)).ravel()
+        rows, columns = row_totals > 0, column_totals > 0
+        self.counts = counts[rows][:, columns].tocoo()
+        self.row_labels = [label for label, keep in zip(row_labels, rows) if keep]
+        self.column_labels = [
+            label for label, keep in zip(column_labels, columns) if keep
+        ]
+        self.row_totals = row_totals[rows]
+        self.column_totals = column_totals[columns]
+
+    @classmethod
+    def from_codes(cls, first: GroupCodes, second: GroupCodes) -> "SparseContingency":
+        shape = (first.n_groups, second.n_groups)
+        if shape[0] * shape[1] <= MAX_TABLE_CELLS:
+            counts = sparse.coo_matrix(contingency_counts(first, second))
+        else:
+            complete = (first.codes >= 0) & (second.codes >= 0)
+            combined = (
+                first.codes[complete].astype(np.int64) * shape[1]
+                + second.codes[complete]
+            )
+            cells, cell_counts = np.unique(combined, return_counts=True)
+            counts = sparse.coo_matrix(
+                (cell_counts, (cells // shape[1], cells % shape[1])), shape=shape
+            )
+        return cls(first.labels, second.labels, counts)
+
+    @classmethod
+    def from_series(cls, counts: pd.Series) -> "SparseContingency":
+        """From counts indexed by (row level, column level) pairs."""
+        rows, row_labels = pd.factorize(counts.index.get_level_values(0), sort=True)
+        columns, column_labels = pd.factorize(
+            counts.index.get_level_values(1), sort=True
+        )
+        return cls(
+            row_labels.tolist(),
+            column_labels.tolist(),
+            sparse.coo_matrix(
+                (counts.to_numpy(), (rows, columns)),
+                shape=(len(row_labels), len(column_labels)),
+            ),
+        )
+
+    @property
+    def shape(self):
+        return self.counts.shape
+
+    def lump_rare_levels(self, max_levels: int) -> "SparseContingency":
+        """Keep the ``max_levels - 1`` most frequent levels of each variable
+        and merge the rest into one ``"other"`` level, suffixed if a kept
+        level already has that name."""
+        rows, row_labels = _lumped_levels(self.row_totals, self.row_labels, max_levels)
+        columns, column_labels = _lumped_levels(
+            self.column_totals, self.column_labels, max_levels
+        )
+        counts = sparse.coo_matrix(
+            (self.counts.data, (rows[self.counts.row], columns[self.counts.col])),
+            shape=(len(row_labels), len(column_labels)),
+        )
+        return SparseContingency(row_labels, column_labels, counts)
+
+    def test(self) -> Dict[str, Any]:
+        """Chi-square test of independence and Cramér's V on the full table."""
+        if self.shape[0] * self.shape[1] <= MAX_TABLE_CELLS:
+            # Small tables go through scipy, with its Yates correction for 2x2
+            return chi_square_test(self.counts.toarray())
+
+        n = float(self.row_totals.sum())
+        expected = (
+            self.row_totals[self.counts.row] * self.column_totals[self.counts.col] / n
+        )
+        # sum (O - E)^2 / E over every cell equals sum O^2 / E - n, and
+        # only non-zero cells contribute to the first term
+        chi2 = float(np.sum(self.counts.data.astype(float) ** 2 / expected) - n)
+        dof = (self.shape[0] - 1) * (self.shape[1] - 1)
+        p_value = float(stats.chi2.sf(chi2, dof))
+        return {
+            "chi_square_statistic": chi2,
+            "p_value": p_value,
+            "degrees_of_freedom": int(dof),
+            "cramers_v": float(np.sqrt(chi2 / (n * (min(self.shape) - 1)))),
+            "significant": p_value < 0.05,
+            "sample_size": int(n),
+        }
+
+    def page(self, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Rows ``offset`` to ``offset + limit`` of the table.
+
+        The table is nested column -> row -> count like
+        ``DataFrame.to_dict()``. A table returned whole and small enough to
+        be dense includes its zero cells; otherwise only non-zero cells are
+        listed.
+        """
+        limit = limit or TABLE_PAGE_ROWS
+        stop = min(offset + limit, self.shape[0])
+        complete = offset == 0 and stop == self.shape[0]
+        if complete and self.shape[0] * self.shape[1] <= MAX_TABLE_CELLS:
+            table = pd.DataFrame(
+                self.counts.toarray(),
+                index=self.row_labels,
+                columns=self.column_labels,
+            ).to_dict()
+        else:
+            in_page = (self.counts.row >= offset) & (self.counts.row < stop)
+            table: Dict[Any, Dict[Any, int]] = {}
+            for row, column, count in zip(
+                self.counts.row[in_page],
+                self.counts.col[in_page],
+                self.counts.data[in_page],
+            ):
+                table.setdefault(self.column_labels[column], {})[
+                    self.row_labels[row]
+                ] = int(count)
+        return {
+            "contingency_table": table,
+            "table_page": {
+                "offset": offset,
+                "limit": limit,
+                "total_rows": self.shape[0],
+                "total_columns": self.shape[1],
+                "nonzero_cells": int(self.counts.nnz),
+                "truncated": not complete,
+            },
+        }
+
+
+def _lumped_levels(totals: np.ndarray, labels: List[Any], max_levels: int):
+    """Index map from levels to kept levels plus a trailing ``"other"``."""
+    if len(labels) <= max_levels:
+        return np.arange(len(labels)), list(labels)
+    kept = np.sort(np.argsort(-totals, kind="stable")[: max_levels - 1])
+    mapping = np.full(len(labels), len(kept))
+    mapping[kept] = np.arange(len(kept))
+    kept_labels = [labels[i] for i in kept]
+    return mapping, kept_labels + [_other_label(kept_labels)]
+
+
+def _other_label(kept_labels: List[Any]) -> str:
+    # Results are keyed by label, so the catch-all must not share one
+    taken = {str(label) for label in kept_labels}
+    label, suffix = OTHER_LABEL, 1
+    while label in taken:
+        suffix += 1
+        label = f"{OTHER_LABEL} ({suffix})"
+    return label
+
+
+def chi_square_results(
+    table: SparseContingency, config: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Single-pair chi-square payload, with optional lumping and paging."""
+    if config.get("max_levels"):
+        table = table.lump_rare_levels(config["max_levels"])
+    result = table.test()
+    result.pop("sample_size")
+    return {
+        **table.page(config.get("table_offset", 0), config.get("table_limit")),
+        **result,
+    }
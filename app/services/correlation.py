@@ -0,0 +1,332 @@
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from scipy import stats
+from app.services.codec import compact_matrix
+
+# Rows per block when multiplying masked matrices, which bounds the
+# temporaries to a few copies of one block
+CORRELATION_BLOCK_ROWS = 65_536
+# Columns sorted together when ranking
+RANK_BLOCK_COLUMNS = 16
+# Values sorted together when counting Kendall discordant pairs, a
+# block of column pairs at a time
+KENDALL_BLOCK_VALUES = 1 << 20
+# Runs this short are compared value by value before merging starts
+DISCORDANCE_RUN_LENGTH = 16
+
+
+class PairwiseMoments:
+    """Masked cross-products behind pairwise-complete Pearson correlation.
+
+    With M the validity mask and X the values centered on a shift and
+    zeroed where missing, entry [i, j] of M'M, X'M, (X*X)'M and X'X gives
+    the number of rows where columns i and j are both set, and the sum
+    of x_i, the sum of x_i squared and the sum of x_i * x_j over those
+    rows. Four BLAS products per block cover every pair at once, and
+    blocks accumulate, so the same object serves in-memory frames and
+    streamed record batches.
+    """
+
+    def __init__(self, k: int, shift: Optional[np.ndarray] = None):
+        self.shift = shift
+        self.n = np.zeros((k, k))
+        self.sums = np.zeros((k, k))
+        self.squares = np.zeros((k, k))
+        self.products = np.zeros((k, k))
+
+    def update(self, values: np.ndarray) -> None:
+        if self.shift is None:
+            # Centering on the first block keeps the sums well conditioned
+            self.shift = np.nan_to_num(np.nanmean(values, axis=0))
+        centered = values - self.shift
+        mask = ~np.isnan(values)
+        if mask.all():
+            # No gaps: every pair sees every row, one product suffices
+            rows = float(len(values))
+            column_sums = centered.sum(axis=0)
+            self.n += rows
+            self.sums += column_sums[:, None]
+            self.squares += (centered**2).sum(axis=0)[:, None]
+            self.products += centered.T @ centered
+            return
+        centered[~mask] = 0.0
+        weights = mask.astype(float)
+        self.n += weights.T @ weights
+        self.sums += centered.T @ weights
+        self.squares += (centered**2).T @ weights
+        self.products += centered.T @ centered
+
+    def correlation(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Pairwise-complete coefficients and the observation count behind each."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            covariance = self.products - self.sums * self.sums.T / self.n
+            variance = self.squares - self.sums**2 / self.n
+            r = np.clip(covariance / np.sqrt(variance * variance.T), -1.0, 1.0)
+        np.fill_diagonal(r, np.where(np.diag(variance) > 0, 1.0, np.nan))
+        return r, self.n
+
+
+def pairwise_pearson(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Pairwise-complete Pearson r and n for every column pair of ``values``."""
+    accumulator = PairwiseMoments(
+        values.shape[1], shift=np.nan_to_num(np.nanmean(values, axis=0))
+    )
+    for start in range(0, len(values), CORRELATION_BLOCK_ROWS):
+        accumulator.update(values[start : start + CORRELATION_BLOCK_ROWS])
+    return accumulator.correlation()
+
+
+def pairwise_correlation(
+    values: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Pairwise-complete Pearson r, n and p for every column pair of ``values``."""
+    r, n = pairwise_pearson(values)
+    return r, n, correlation_p_values(r, n)
+
+
+def correlation_p_values(r: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """Two-sided p-values for a matrix of Pearson coefficients.
+
+    ``n`` holds the number of observations behind each coefficient. The
+    test statistic t = r * sqrt((n - 2) / (1 - r^2)) follows a t
+    distribution with n - 2 degrees of freedom, which is what
+    ``scipy.stats.pearsonr`` uses for a single pair.
+    """
+    dof = n - 2.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = r * np.sqrt(dof / (1.0 - r**2))
+        p_values = 2 * stats.t.sf(np.abs(t), dof)
+    p_values[dof <= 0] = np.nan
+    np.fill_diagonal(p_values, 0.0)
+    return p_values
+
+
+def rank_columns(values: np.ndarray) -> np.ndarray:
+    """Average ranks of each column (ties share a rank), NaN left in place.
+
+    Columns are ranked a block at a time: one sort per block, then the
+    first and last position of every run of equal values found with
+    running max/min scans, so tied values get the mean of their run.
+    """
+    n, k = values.shape
+    ranks = np.empty((n, k))
+    positions = np.arange(n)
+    for start in range(0, k, RANK_BLOCK_COLUMNS):
+        block = np.ascontiguousarray(values[:, start : start + RANK_BLOCK_COLUMNS].T)
+        order = np.argsort(block, axis=1)
+        ordered = np.take_along_axis(block, order, axis=1)
+        # NaN sorts last and never equals itself, so it never joins a run
+        run_start = np.ones(ordered.shape, dtype=bool)
+        np.not_equal(ordered[:, 1:], ordered[:, :-1], out=run_start[:, 1:])
+        run_end = np.ones(ordered.shape, dtype=bool)
+        run_end[:, :-1] = run_start[:, 1:]
+        first = np.maximum.accumulate(np.where(run_start, positions, 0), axis=1)
+        last = np.minimum.accumulate(np.where(run_end, positions, n)[:, ::-1], axis=1)[
+            :, ::-1
+        ]
+        block_ranks = np.empty(block.shape)
+        np.put_along_axis(block_ranks, order, (first + last) / 2 + 1, axis=1)
+        block_ranks[np.isnan(block)] = np.nan
+        ranks[:, start : start + RANK_BLOCK_COLUMNS] = block_ranks.T
+    return ranks
+
+
+def spearman_correlation(
+    values: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Spearman rho, n and p for every column pair.
+
+    Each column is ranked once and the ranks go through the vectorized
+    Pearson path; the p-value uses the same t approximation as
+    ``scipy.stats.spearmanr``. Ranks are taken over each column's own
+    non-missing values, so for pairs with missing values rho can differ
+    slightly from re-ranking the pair's complete rows.
+    """
+    return pairwise_correlation(rank_columns(values))
+
+
+def kendall_correlation(
+    values: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Kendall tau-b, n and p for every column pair.
+
+    Columns are converted to dense integer ranks once. Pairs are then
+    handled a block at a time: one sort of the combined (x, y) ranks
+    puts every pair's rows in x order, ``_discordant_pairs`` counts the
+    discordant pairs of the whole block with a vectorized merge count,
+    and the tie sums come from runs of equal values. Tau-b and its
+    p-value follow ``scipy.stats.kendalltau``, which is still asked for
+    the exact p-value of the small tie-free pairs it computes exactly.
+    """
+    k = values.shape[1]
+    mask = ~np.isnan(values)
+    dense = np.zeros(values.shape, dtype=np.int64)
+    for column in range(k):
+        present = mask[:, column]
+        dense[present, column] = np.unique(
+            values[present, column], return_inverse=True
+        )[1]
+    # Missing values take a rank above every other, so they sort last
+    top = int(dense.max()) + 1 if dense.size else 1
+
+    tau = np.eye(k)
+    p_values = np.zeros((k, k))
+    weights = mask.astype(float)
+    n = weights.T @ weights
+    first, second = np.triu_indices(k, 1)
+    step = max(1, KENDALL_BLOCK_VALUES // max(len(values), 1))
+    for start in range(0, len(first), step):
+        i, j = first[start : start + step], second[start : start + step]
+        both = (mask[:, i] & mask[:, j]).T
+        size = both.sum(axis=1)
+        joint = np.sort(
+            np.where(both, dense[:, i].T * (top + 1) + dense[:, j].T, top * (top + 2)),
+            axis=1,
+        )
+        x, y = np.divmod(joint, top + 1)
+        discordant, y = _discordant_pairs(y, top)
+        joint_ties, _, _ = _tie_sums(joint, size)
+        x_ties, x_0, x_1 = _tie_sums(x, size)
+        y_ties, y_0, y_1 = _tie_sums(y, size)
+
+        size = size.astype(float)
+        total = size * (size - 1) / 2
+        con_minus_dis = total - x_ties - y_ties + joint_ties - 2 * discordant
+        with np.errstate(divide="ignore", invalid="ignore"):
+            block_tau = np.clip(
+                con_minus_dis / np.sqrt(total - x_ties) / np.sqrt(total - y_ties),
+                -1.0,
+                1.0,
+            )
+            m = size * (size - 1)
+            variance = (
+                (m * (2 * size + 5) - x_1 - y_1) / 18
+                + 2 * x_ties * y_ties / m
+                + x_0 * y_0 / (9 * m * (size - 2))
+            )
+            block_p = 2 * stats.norm.sf(np.abs(con_minus_dis / np.sqrt(variance)))
+        block_p[np.isnan(block_tau)] = np.nan
+        exact = (
+            (x_ties == 0)
+            & (y_ties == 0)
+            & ((size <= 33) | (np.minimum(discordant, total - discordant) <= 1))
+            & ~np.isnan(block_tau)
+        )
+        for pair in np.flatnonzero(exact):
+            rows = both[pair]
+            block_p[pair] = stats.kendalltau(
+                dense[rows, i[pair]], dense[rows, j[pair]]
+            ).pvalue
+        tau[i, j] = tau[j, i] = block_tau
+        p_values[i, j] = p_values[j, i] = block_p
+    return tau, n, p_values
+
+
+def _discordant_pairs(y: np.ndarray, top: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Pairs s < t with y[s] > y[t] in every row of ``y``, and ``y`` sorted.
+
+    A bottom-up merge count: short runs are compared directly, then at
+    each level pairs of neighbouring sorted runs are merged by sorting
+    them together with the right run's values marked in the low bit.
+    A right value's position in the merged run minus its position in
+    its own run is the number of left values not above it, so every
+    row's count for the level is a weighted sum of the marks. Each
+    level sorts the whole block at once, so pairs share every call.
+    """
+    b, length = y.shape
+    levels = max(0, int(np.ceil(np.log2(max(length, 1) / DISCORDANCE_RUN_LENGTH))))
+    width = -(-length // (1 << levels))
+    dtype = np.int32 if 2 * top + 1 < np.iinfo(np.int32).max else np.int64
+    # Padding with the largest value at the end adds no discordant pairs
+    keys = np.full((b, width << levels), top, dtype=dtype)
+    keys[:, :length] = y
+    padded = keys.shape[1]
+
+    runs = keys.reshape(b, -1, width)
+    discordant = np.zeros(b, dtype=np.int64)
+    for position in range(1, width):
+        discordant += np.count_nonzero(
+            runs[..., :position] > runs[..., position : position + 1], axis=(1, 2)
+        )
+    runs.sort(axis=-1)
+    keys <<= 1
+    while width < padded:
+        merged = keys.reshape(b, -1, 2 * width)
+        merged &= -2
+        merged[..., width:] |= 1
+        merged.sort(axis=-1)
+        offsets = np.tile(np.arange(2 * width), merged.shape[1])
+        placed = (keys & 1) @ offsets
+        # Right values placed after a left value larger than them
+        discordant += merged.shape[1] * (width * width + width * (width - 1) // 2)
+        discordant -= placed
+        width *= 2
+    return discordant, keys[:, :length] >> 1
+
+
+def _tie_sums(
+    ordered: np.ndarray, size: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sums of c(c-1)/2, c(c-1)(c-2) and c(c-1)(2c+5) over every run of c
+    equal values among the first ``size`` values of each sorted row.
+
+    Written as sums over each value's position r within its run, these
+    are sum(r), 3 * sum(r(r-1)) and 6 * sum(r(r+2)). The values after
+    ``size`` form one run of their own and are taken back out.
+    """
+    length = ordered.shape[1]
+    positions = np.arange(length)
+    run_start = np.ones(ordered.shape, dtype=bool)
+    np.not_equal(ordered[:, 1:], ordered[:, :-1], out=run_start[:, 1:])
+    within = positions - np.maximum.accumulate(
+        np.where(run_start, positions, 0), axis=1
+    )
+    within = within.astype(float)
+    rest = (length - size).astype(float)
+    sums = within.sum(axis=1) - rest * (rest - 1) / 2
+    squares = np.einsum("ij,ij->i", within, within)
+    squares -= (rest - 1) * rest * (2 * rest - 1) / 6
+    return sums, 3 * (squares - sums), 6 * (squares + 2 * sums)
+
+
+CORRELATION_METHODS = {
+    "pearson": pairwise_correlation,
+    "spearman": spearman_correlation,
+    "kendall": kendall_correlation,
+}
+
+
+def correlation_matrix(
+    values: np.ndarray, method: str = "pearson"
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Coefficients, pairwise n and p-values for the requested method."""
+    if method not in CORRELATION_METHODS:
+        raise ValueError(f"Unsupported correlation method: {method}")
+    return CORRELATION_METHODS[method](values)
+
+
+def correlation_results(
+    columns: List[str], r: np.ndarray, p_values: np.ndarray, alpha: float = 0.05
+) -> Dict[str, Any]:
+    """Format a correlation matrix and its p-values as an analysis result,
+    the matrices in the compact form of ``compact_matrix``."""
+    rounded = np.round(r, 4)
+
+    # Significant pairs from the upper triangle, in row-major order
+    upper = np.triu(np.ones_like(p_values, dtype=bool), k=1)
+    rows, cols = np.nonzero(upper & (p_values < alpha))
+    significant_correlations = [
+        {
+            "variable1": columns[i],
+            "variable2": columns[j],
+            "correlation": float(rounded[i, j]),
+            "p_value": float(p_values[i, j]),
+        }
+        for i, j in zip(rows, cols)
+    ]
+
+    return {
+        "correlation_matrix": compact_matrix(columns, rounded),
+        "p_values": compact_matrix(columns, p_values),
+        "significant_correlations": significant_correlations,
+    }
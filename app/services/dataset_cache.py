@@ -0,0 +1,137 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import pandas as pd
+from app.core.config import settings
+from app.services.dataset_io import load_dataset
+from app.services.object_storage import is_object_uri
+
+
+def file_fingerprint(file_path: str) -> str:
+    """Cheap identity of a file's current contents (size and mtime)."""
+    if is_object_uri(file_path):
+        # Stored objects are content-addressed and never rewritten
+        return file_path
+    stat = os.stat(file_path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+class _CacheEntry:
+    def __init__(self, fingerprint: str, frame: pd.DataFrame, complete: bool):
+        self.fingerprint = fingerprint
+        self.frame = frame
+        # True when every column of the file has been loaded
+        self.complete = complete
+        self.nbytes = int(frame.memory_usage(deep=True).sum())
+
+
+class DatasetCache:
+    """Process-wide LRU cache of loaded datasets with a byte budget.
+
+    Entries are keyed by the path of the file they were loaded from and
+    remember its fingerprint, so a changed file is reloaded rather than
+    served stale. Stored files are content-addressed, so datasets uploaded
+    with identical contents share one entry. An entry grows column by
+    column: a projected load only reads the columns that are not cached
+    yet.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, file_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Return the dataset (or the requested columns), loading what is missing."""
+        fingerprint = file_fingerprint(file_path)
+
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is not None and entry.fingerprint != fingerprint:
+                self._remove(file_path)
+                entry = None
+            if entry is not None and self._covers(entry, columns):
+                self._entries.move_to_end(file_path)
+                self.hits += 1
+                return self._project(entry.frame, columns)
+            self.misses += 1
+            cached = entry.frame if entry is not None else None
+
+        # Read outside the lock so a slow load does not block other datasets
+        if cached is None:
+            frame = load_dataset(file_path, columns=columns)
+        elif columns is None:
+            frame = load_dataset(file_path)
+        else:
+            missing = [col for col in columns if col not in cached.columns]
+            frame = pd.concat(
+                [cached, load_dataset(file_path, columns=missing)], axis=1
+            )
+
+        self._store(file_path, _CacheEntry(fingerprint, frame, columns is None))
+        return self._project(frame, columns)
+
+    def invalidate(self, file_path: str) -> None:
+        with self._lock:
+            if file_path in self._entries:
+                self._remove(file_path)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    @staticmethod
+    def _covers(entry: _CacheEntry, columns: Optional[List[str]]) -> bool:
+        if columns is None:
+            return entry.complete
+        return all(col in entry.frame.columns for col in columns)
+
+    @staticmethod
+    def _project(frame: pd.DataFrame, columns: Optional[List[str]]) -> pd.DataFrame:
+        # Shallow copies keep callers from adding or dropping columns on the
+        # cached frame; analyses never modify values in place.
+        if columns is None:
+            return frame.copy(deep=False)
+        return frame[columns]
+
+    def _store(self, file_path: str, entry: _CacheEntry) -> None:
+        with self._lock:
+            if file_path in self._entries:
+                self._remove(file_path)
+            if entry.nbytes > self.max_bytes:
+                return
+            self._entries[file_path] = entry
+            self._bytes += entry.nbytes
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, file_path: str) -> None:
+        entry = self._entries.pop(file_path)
+        self._bytes -= entry.nbytes
+
+
+dataset_cache = DatasetCache(settings.DATASET_CACHE_MAX_BYTES)
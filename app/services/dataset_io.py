@@ -0,0 +1,145 @@
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app.services.object_storage import open_stored
+
+PARQUET_EXTENSION = ".parquet"
+SOURCE_EXTENSIONS = (".csv", ".xls", ".xlsx")
+
+# Rows per Parquet row group. Small enough that a projected read of a few
+# columns stays cheap, large enough to keep the footer metadata small.
+PARQUET_ROW_GROUP_SIZE = 128_000
+
+
+def read_source_file(
+    file_path: str, columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """Parse an uploaded CSV or Excel file."""
+    if file_path.endswith(".csv"):
+        return pd.read_csv(file_path, usecols=columns)
+    elif file_path.endswith((".xls", ".xlsx")):
+        return pd.read_excel(file_path, usecols=columns)
+    raise ValueError("Unsupported file format")
+
+
+def normalize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Coerce a freshly parsed frame into types Parquet can store as-is.
+
+    Column labels become strings and object columns holding a mix of
+    Python types (common in Excel exports) are stored as text, so every
+    column ends up with one fixed physical type.
+    """
+    df.columns = [str(col) for col in df.columns]
+    for column in df.select_dtypes(include=["object"]).columns:
+        values = df[column]
+        df[column] = values.where(values.isna(), values.astype(str))
+    return df
+
+
+def column_info_from_frame(df: pd.DataFrame) -> Dict[str, str]:
+    return {col: str(dtype) for col, dtype in df.dtypes.items()}
+
+
+def parquet_path_for(source_path: str) -> str:
+    return os.path.splitext(source_path)[0] + PARQUET_EXTENSION
+
+
+def write_parquet(df: pd.DataFrame, parquet_path: str) -> str:
+    """Write a normalized frame as a columnar Parquet file."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(table, parquet_path, row_group_size=PARQUET_ROW_GROUP_SIZE)
+    return parquet_path
+
+
+def arrow_schema(column_info: Dict[str, str]) -> pa.Schema:
+    """Arrow schema matching ``column_info``; non-numeric columns become text."""
+    fields = []
+    for column, dtype_name in column_info.items():
+        if dtype_name == "bool":
+            arrow_type = pa.bool_()
+        elif is_numeric_dtype_name(dtype_name):
+            arrow_type = pa.from_numpy_dtype(np.dtype(dtype_name))
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column, arrow_type))
+    return pa.schema(fields)
+
+
+def csv_to_parquet(
+    source_path: str,
+    parquet_path: str,
+    column_info: Dict[str, str],
+    chunk_rows: int,
+    on_chunk: Optional[Callable[[pd.DataFrame], None]] = None,
+) -> str:
+    """Convert a CSV file to Parquet in bounded-memory chunks with fixed types.
+
+    ``on_chunk`` is called with every typed chunk before it is written.
+    """
+    schema = arrow_schema(column_info)
+    dtypes = {
+        col: dtype if dtype == "bool" or is_numeric_dtype_name(dtype) else "object"
+        for col, dtype in column_info.items()
+    }
+    with pq.ParquetWriter(parquet_path, schema) as writer:
+        for chunk in pd.read_csv(source_path, dtype=dtypes, chunksize=chunk_rows):
+            chunk.columns = [str(col) for col in chunk.columns]
+            if on_chunk is not None:
+                on_chunk(chunk)
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            for batch in table.to_batches(max_chunksize=PARQUET_ROW_GROUP_SIZE):
+                writer.write_batch(batch)
+    return parquet_path
+
+
+def convert_to_parquet(source_path: str) -> str:
+    """Parse a CSV/Excel file once and store it next to the source as Parquet."""
+    df = normalize_dtypes(read_source_file(source_path))
+    return write_parquet(df, parquet_path_for(source_path))
+
+
+def load_dataset(file_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Load a dataset, reading only ``columns`` when given.
+
+    Parquet files are read column by column, so the cost of a projected
+    load is proportional to the columns asked for; from object storage
+    only their byte ranges are fetched. Datasets uploaded before the
+    Parquet conversion still point at their CSV/Excel source.
+
+    Unreadable contents raise ValueError; storage failures, which may be
+    transient, raise OSError.
+    """
+    try:
+        if file_path.endswith(PARQUET_EXTENSION):
+            with open_stored(file_path) as source:
+                return pd.read_parquet(source, columns=columns)
+        return normalize_dtypes(read_source_file(file_path, columns=columns))
+    except OSError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Error loading dataset: {str(e)}")
+
+
+def is_numeric_dtype_name(dtype_name: str) -> bool:
+    """Whether a ``column_info`` dtype string is numeric (booleans excluded)."""
+    try:
+        dtype = np.dtype(dtype_name)
+    except TypeError:
+        return False
+    return np.issubdtype(dtype, np.number)
+
+
+def numeric_columns(column_info: Dict[str, str]) -> List[str]:
+    return [col for col, dtype in column_info.items() if is_numeric_dtype_name(dtype)]
+
+
+def unique_columns(columns: Iterable[Any]) -> List[str]:
+    """Drop duplicates and empty entries while keeping the first-seen order."""
+    seen = []
+    for column in columns:
+        if column and column not in seen:
+            seen.append(column)
+    return seen
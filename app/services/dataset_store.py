@@ -0,0 +1,233 @@
+import logging
+import os
+import uuid
+from typing import BinaryIO, Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.dataset import Dataset, DatasetBlob
+from app.services.dataset_cache import dataset_cache
+from app.services.dataset_io import parquet_path_for
+from app.services.ingest import IngestResult, RowLimitExceeded, ingest_upload
+from app.services.object_storage import (
+    LocalStorage,
+    ObjectStorage,
+    is_object_uri,
+    object_storage,
+)
+
+logger = logging.getLogger(__name__)
+
+# Upload formats whose original files are kept beside the Parquet copy
+UPLOAD_EXTENSIONS = (".csv", ".xlsx", ".xls")
+
+
+class StoredUpload:
+    """An upload's stored file and the profile to record on its dataset."""
+
+    def __init__(
+        self,
+        file_path: str,
+        content_hash: str,
+        row_count: int,
+        column_info: dict,
+        column_stats: dict,
+        deduplicated: bool,
+    ):
+        self.file_path = file_path
+        self.content_hash = content_hash
+        self.row_count = row_count
+        self.column_info = column_info
+        self.column_stats = column_stats
+        # True when identical contents were already stored
+        self.deduplicated = deduplicated
+
+
+class DatasetStore:
+    """Content-addressed storage of uploaded datasets.
+
+    Uploads are written to a scratch path under ``root`` while they are
+    hashed, then put in ``storage`` under ``blobs/{hash[:2]}/{hash}`` with
+    their Parquet copy beside them. Identical contents are stored once
+    however often they are uploaded: a duplicate is not converted again,
+    and its dataset takes the stored profile. Since loads and results are cached by file
+    path and content hash, a duplicate starts with warm caches.
+
+    A ``DatasetBlob`` row counts the datasets referencing each stored
+    file. Acquiring and releasing a reference lock that row and commit
+    with the dataset row, and the files are deleted while the lock is
+    held, so an upload racing the deletion of the last reference stores
+    its files again rather than losing them.
+    """
+
+    def __init__(self, root: str, storage: Optional[ObjectStorage] = None):
+        self.root = root
+        self.storage = storage or LocalStorage(root)
+
+    def store_upload(
+        self, db: Session, source: BinaryIO, filename: str, row_limit: int
+    ) -> StoredUpload:
+        """Ingest an upload and take a reference to its stored file. The
+        reference is flushed, not committed: the caller commits it with the
+        dataset row."""
+        ingested = ingest_upload(
+            source,
+            self._scratch_path(filename),
+            row_limit,
+            is_stored=lambda content_hash: self._blob(db, content_hash) is not None,
+        )
+        try:
+            blob = self._blob(db, ingested.content_hash, lock=True)
+            if blob is None:
+                if ingested.parquet_path is None:
+                    # The stored copy was deleted after the upload was hashed
+                    ingested = self._reingest(ingested, row_limit)
+                blob = self._add_blob(db, ingested)
+                if blob is not None:
+                    return self._stored(blob, ingested, deduplicated=False)
+                # Stored meanwhile by another upload of the same contents
+                blob = self._blob(db, ingested.content_hash, lock=True)
+
+            sibling = (
+                db.query(Dataset)
+                .filter(Dataset.content_hash == blob.content_hash)
+                .order_by(Dataset.id)
+                .first()
+            )
+            if sibling is None and ingested.parquet_path is None:
+                ingested = self._reingest(ingested, row_limit)
+            if sibling is not None and sibling.row_count > row_limit:
+                raise RowLimitExceeded(row_limit)
+            blob.ref_count += 1
+            db.flush()
+            if sibling is None:
+                return self._stored(blob, ingested, deduplicated=True)
+            return StoredUpload(
+                blob.file_path,
+                blob.content_hash,
+                sibling.row_count,
+                sibling.column_info,
+                sibling.column_stats,
+                deduplicated=True,
+            )
+        finally:
+            self._remove_scratch(ingested)
+
+    def release(self, db: Session, dataset: Dataset) -> bool:
+        """Drop a dataset's reference to its stored file, deleting the file
+        with its last reference. True if no other dataset has the same
+        contents. Flushed, not committed: the caller commits it with the
+        dataset's deletion."""
+        blob = self._blob(db, dataset.content_hash, lock=True)
+        if blob is None:
+            return self._release_unshared(db, dataset)
+        blob.ref_count -= 1
+        if blob.ref_count > 0:
+            return False
+        db.delete(blob)
+        db.flush()
+        self._remove_files(blob.source_path, blob.file_path)
+        return True
+
+    def _add_blob(self, db: Session, ingested: IngestResult) -> Optional[DatasetBlob]:
+        content_hash = ingested.content_hash
+        extension = os.path.splitext(ingested.file_path)[1]
+        source_key = f"blobs/{content_hash[:2]}/{content_hash}{extension}"
+        parquet_key = parquet_path_for(source_key)
+        blob = DatasetBlob(
+            content_hash=content_hash,
+            source_path=self.storage.uri(source_key),
+            file_path=self.storage.uri(parquet_key),
+            ref_count=1,
+        )
+        try:
+            with db.begin_nested():
+                db.add(blob)
+        except IntegrityError:
+            return None
+        # A leftover copy has identical contents, so replacing it is harmless
+        self.storage.put_file(source_key, ingested.file_path)
+        self.storage.put_file(parquet_key, ingested.parquet_path)
+        return blob
+
+    def _reingest(self, ingested: IngestResult, row_limit: int) -> IngestResult:
+        """Convert an upload whose conversion was skipped as a duplicate."""
+        with open(ingested.file_path, "rb") as source:
+            converted = ingest_upload(
+                source, self._scratch_path(ingested.file_path), row_limit
+            )
+        self._remove_scratch(ingested)
+        return converted
+
+    def _release_unshared(self, db: Session, dataset: Dataset) -> bool:
+        """Datasets stored before storage was content-addressed own their
+        files, unless another dataset reuses the same path."""
+        reused = (
+            db.query(Dataset)
+            .filter(Dataset.file_path == dataset.file_path, Dataset.id != dataset.id)
+            .first()
+        )
+        if reused is None:
+            base = os.path.splitext(dataset.file_path)[0]
+            self._remove_files(
+                dataset.file_path,
+                *(base + extension for extension in UPLOAD_EXTENSIONS),
+            )
+        return not (
+            dataset.content_hash
+            and db.query(Dataset)
+            .filter(
+                Dataset.content_hash == dataset.content_hash, Dataset.id != dataset.id
+            )
+            .first()
+        )
+
+    def _scratch_path(self, filename: str) -> str:
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(self.root, "incoming", f"{uuid.uuid4().hex}{extension}")
+
+    @staticmethod
+    def _stored(
+        blob: DatasetBlob, ingested: IngestResult, deduplicated: bool
+    ) -> StoredUpload:
+        return StoredUpload(
+            blob.file_path,
+            blob.content_hash,
+            ingested.profile.row_count,
+            ingested.profile.column_info,
+            ingested.column_stats,
+            deduplicated,
+        )
+
+    @staticmethod
+    def _remove_scratch(ingested: IngestResult) -> None:
+        for path in (ingested.file_path, parquet_path_for(ingested.file_path)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    @staticmethod
+    def _blob(
+        db: Session, content_hash: Optional[str], lock: bool = False
+    ) -> Optional[DatasetBlob]:
+        if not content_hash:
+            return None
+        query = db.query(DatasetBlob).filter(DatasetBlob.content_hash == content_hash)
+        if lock:
+            query = query.with_for_update()
+        return query.first()
+
+    def _remove_files(self, *paths: str) -> None:
+        for path in paths:
+            dataset_cache.invalidate(path)
+            try:
+                if is_object_uri(path):
+                    self.storage.delete(path)
+                else:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Could not delete stored dataset {path}: {str(e)}")
+
+
+dataset_store = DatasetStore(settings.DATASET_STORAGE_ROOT, object_storage)
@@ -0,0 +1,83 @@
+import asyncio
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from app.core.config import settings
+
+EXECUTOR_KINDS = ("process", "thread")
+
+
+class AnalysisExecutor:
+    """Runs CPU-bound analysis work off the event loop.
+
+    ``process`` workers sidestep the GIL for pandas/scipy code that holds
+    it; ``thread`` workers suit kernels that release it (BLAS, Arrow) and
+    avoid process start-up. Jobs receive file references rather than
+    frames, so nothing large is pickled and each worker process keeps its
+    own dataset cache. Workers are spawned rather than forked, so they do
+    not inherit the server's threads or open connections.
+    """
+
+    def __init__(self, kind: str, max_workers: int):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unsupported analysis executor: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+
+    def _get_pool(self) -> Executor:
+        with self._lock:
+            if self._pool is None:
+                if self.kind == "process":
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="analysis",
+                    )
+            return self._pool
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run ``fn(*args, **kwargs)`` in a worker and await its result."""
+        loop = asyncio.get_running_loop()
+        self.running += 1
+        try:
+            result = await loop.run_in_executor(
+                self._get_pool(), functools.partial(fn, *args, **kwargs)
+            )
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.running -= 1
+        self.completed += 1
+        return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+analysis_executor = AnalysisExecutor(
+    settings.ANALYSIS_EXECUTOR, settings.ANALYSIS_WORKERS
+)
@@ -0,0 +1,206 @@
+import warnings
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+from scipy import sparse, stats
+from app.services.correlation import rank_columns
+
+
+class GroupCodes:
+    """A grouping column factorized once into integer codes.
+
+    Labels are sorted like ``DataFrame.groupby`` sorts its keys, and rows
+    with a missing group get code -1 and are left out of every group.
+    """
+
+    def __init__(self, groups: pd.Series):
+        codes, labels = pd.factorize(groups, sort=True)
+        self.codes = codes
+        self.labels = labels.tolist()
+
+    @property
+    def n_groups(self) -> int:
+        return len(self.labels)
+
+    def partition(self, values: np.ndarray) -> "GroupPartition":
+        return GroupPartition(self, values)
+
+
+class GroupPartition:
+    """Non-missing values of one target column split by group in one pass.
+
+    Rows are ordered by group code with a single stable sort, and each
+    group is a contiguous slice of the sorted values, so no group needs its
+    own scan of the frame.
+    """
+
+    def __init__(self, groups: GroupCodes, values: np.ndarray):
+        self.groups = groups
+        keep = (groups.codes >= 0) & ~np.isnan(values)
+        codes = groups.codes[keep]
+        order = np.argsort(codes, kind="stable")
+        self.codes = codes[order]
+        self.values = values[keep][order]
+        self.counts = np.bincount(self.codes, minlength=groups.n_groups)
+        self.offsets = np.concatenate([[0], np.cumsum(self.counts)])
+
+    def group_values(self) -> List[np.ndarray]:
+        return [
+            self.values[self.offsets[g] : self.offsets[g + 1]]
+            for g in range(self.groups.n_groups)
+        ]
+
+    def statistics(self) -> pd.DataFrame:
+        """count/mean/std/min/max/median per group, as ``groupby().agg``."""
+        counts = self.counts.astype(float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = np.bincount(self.codes, self.values, self.groups.n_groups) / counts
+            deviations = self.values - means[self.codes]
+            variances = np.bincount(
+                self.codes, deviations**2, self.groups.n_groups
+            ) / (counts - 1)
+        variances[counts < 2] = np.nan
+
+        minimums = np.full(self.groups.n_groups, np.nan)
+        maximums = np.full(self.groups.n_groups, np.nan)
+        medians = np.full(self.groups.n_groups, np.nan)
+        for g, values in enumerate(self.group_values()):
+            if len(values):
+                minimums[g] = values.min()
+                maximums[g] = values.max()
+                medians[g] = np.median(values)
+
+        return pd.DataFrame(
+            {
+                "count": self.counts,
+                "mean": means,
+                "std": np.sqrt(variances),
+                "min": minimums,
+                "max": maximums,
+                "median": medians,
+            },
+            index=pd.Index(self.groups.labels),
+        )
+
+
+class GroupedColumns:
+    """Many target columns against one factorized grouping.
+
+    Per-group counts, sums and sums of squares for every column come from
+    one sparse product of the group indicator matrix with the value
+    matrix, so the tests below are array expressions across columns
+    rather than one scipy call per target.
+    """
+
+    def __init__(self, groups: GroupCodes, values: np.ndarray):
+        self.groups = groups
+        grouped = groups.codes >= 0
+        values = np.where(grouped[:, None], values, np.nan)
+        self.values = values
+        self.mask = ~np.isnan(values)
+        rows = np.flatnonzero(grouped)
+        self.indicator = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, groups.codes[grouped])),
+            shape=(len(values), groups.n_groups),
+        )
+
+        # Centering on the column means keeps the sums of squares stable
+        self.shift = np.nan_to_num(np.nanmean(values, axis=0))
+        centered = np.where(self.mask, values - self.shift, 0.0)
+        self.counts = np.asarray(self.indicator.T @ self.mask.astype(float))
+        sums = np.asarray(self.indicator.T @ centered)
+        squares = np.asarray(self.indicator.T @ centered**2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            centered_means = sums / self.counts
+            self.means = centered_means + self.shift
+            self.variances = (squares - sums * centered_means) / (self.counts - 1)
+        self.variances[self.counts < 2] = np.nan
+        # Groups with no values for a column take no part in its tests
+        self.present = self.counts > 0
+
+    def statistics(self) -> Dict[str, np.ndarray]:
+        """count/mean/std/min/max/median, each a (groups x columns) array."""
+        order = np.argsort(self.groups.codes, kind="stable")
+        counts = np.bincount(
+            self.groups.codes[self.groups.codes >= 0], minlength=self.groups.n_groups
+        )
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        # Ungrouped rows (code -1) sort first; skip past them
+        start = int(np.count_nonzero(self.groups.codes < 0))
+        ordered = self.values[order[start:]]
+
+        shape = (self.groups.n_groups, self.values.shape[1])
+        minimums, maximums, medians = (np.full(shape, np.nan) for _ in range(3))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            for g in range(self.groups.n_groups):
+                block = ordered[offsets[g] : offsets[g + 1]]
+                if len(block):
+                    minimums[g] = np.nanmin(block, axis=0)
+                    maximums[g] = np.nanmax(block, axis=0)
+                    medians[g] = np.nanmedian(block, axis=0)
+
+        return {
+            "count": self.counts,
+            "mean": self.means,
+            "std": np.sqrt(self.variances),
+            "min": minimums,
+            "max": maximums,
+            "median": medians,
+        }
+
+    def _present_groups(self) -> np.ndarray:
+        return self.present.sum(axis=0)
+
+    def t_test(self) -> Dict[str, np.ndarray]:
+        """Pooled-variance t-test between two groups, as ``ttest_ind``."""
+        n1, n2 = self.counts
+        dof = n1 + n2 - 2
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pooled = ((n1 - 1) * self.variances[0] + (n2 - 1) * self.variances[1]) / dof
+            t = (self.means[0] - self.means[1]) / np.sqrt(pooled * (1 / n1 + 1 / n2))
+        return {"statistic": t, "p_value": 2 * stats.t.sf(np.abs(t), dof)}
+
+    def anova(self) -> Dict[str, np.ndarray]:
+        """One-way ANOVA across groups, as ``f_oneway``."""
+        total = self.counts.sum(axis=0)
+        k = self._present_groups()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            grand_mean = np.nansum(self.counts * self.means, axis=0) / total
+            between = np.nansum(self.counts * (self.means - grand_mean) ** 2, axis=0)
+            within = np.nansum((self.counts - 1) * self.variances, axis=0)
+            f = (between / (k - 1)) / (within / (total - k))
+        return {"statistic": f, "p_value": stats.f.sf(f, k - 1, total - k)}
+
+    def _rank_sums(self):
+        ranks = rank_columns(self.values)
+        total = self.mask.sum(axis=0).astype(float)
+        rank_sums = np.asarray(self.indicator.T @ np.nan_to_num(ranks))
+        # Sum of t^3 - t over tied runs, from the identity
+        # sum(r^2) = N(N+1)(2N+1)/6 - sum(t^3 - t)/12 for average ranks
+        ties = 12 * (
+            total * (total + 1) * (2 * total + 1) / 6 - np.nansum(ranks**2, axis=0)
+        )
+        return rank_sums, total, np.maximum(np.round(ties), 0.0)
+
+    def mann_whitney(self) -> Dict[str, np.ndarray]:
+        """Two-sided Mann-Whitney U with tie and continuity correction."""
+        rank_sums, total, ties = self._rank_sums()
+        n1, n2 = self.counts
+        u1 = rank_sums[0] - n1 * (n1 + 1) / 2
+        u = np.maximum(u1, n1 * n2 - u1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sigma = np.sqrt(n1 * n2 / 12 * ((total + 1) - ties / (total * (total - 1))))
+            z = (u - n1 * n2 / 2 - 0.5) / sigma
+        return {"statistic": u1, "p_value": np.minimum(2 * stats.norm.sf(z), 1.0)}
+
+    def kruskal(self) -> Dict[str, np.ndarray]:
+        """Kruskal-Wallis H with tie correction, as ``scipy.stats.kruskal``."""
+        rank_sums, total, ties = self._rank_sums()
+        k = self._present_groups()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            h = 12 / (total * (total + 1)) * np.nansum(
+                rank_sums**2 / self.counts, axis=0
+            ) - 3 * (total + 1)
+            h /= 1 - ties / (total**3 - total)
+        return {"statistic": h, "p_value": stats.chi2.sf(h, k - 1)}
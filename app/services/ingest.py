@@ -0,0 +1,252 @@
+import hashlib
+import io
+import os
+from typing import Any, BinaryIO, Callable, Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+from app.services.dataset_io import (
+    column_info_from_frame,
+    csv_to_parquet,
+    normalize_dtypes,
+    parquet_path_for,
+    write_parquet,
+)
+from app.services.sketches import DatasetSketcher
+
+# Bytes pulled from the upload per read and rows parsed per CSV chunk
+READ_BLOCK_SIZE = 1024 * 1024
+CSV_CHUNK_ROWS = 50_000
+
+
+class RowLimitExceeded(ValueError):
+    def __init__(self, row_limit: int):
+        self.row_limit = row_limit
+        super().__init__(
+            f"Dataset exceeds the {row_limit} row limit for your subscription tier"
+        )
+
+
+class _TeeReader(io.RawIOBase):
+    """Binary reader that copies every byte it hands out into ``sink``."""
+
+    def __init__(self, source: BinaryIO, sink: BinaryIO):
+        self.source = source
+        self.sink = sink
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.source.read(min(len(buffer), READ_BLOCK_SIZE))
+        self.sink.write(data)
+        buffer[: len(data)] = data
+        return len(data)
+
+    def drain(self) -> None:
+        """Copy whatever the parser left unread."""
+        while self.readinto(bytearray(READ_BLOCK_SIZE)):
+            pass
+
+
+class _HashingWriter:
+    """Binary writer that hashes everything written through it."""
+
+    def __init__(self, sink: BinaryIO):
+        self.sink = sink
+        self.digest = hashlib.sha256()
+
+    def write(self, data: bytes) -> int:
+        self.digest.update(data)
+        return self.sink.write(data)
+
+
+def _dtype_name(dtype: Any) -> str:
+    if pd.api.types.is_bool_dtype(dtype):
+        return "bool"
+    if pd.api.types.is_numeric_dtype(dtype):
+        return dtype.name
+    return "object"
+
+
+def merge_dtypes(current: Optional[str], chunk_dtype: Any) -> str:
+    """Widen a column type across CSV chunks the way a one-shot parse would."""
+    chunk = _dtype_name(chunk_dtype)
+    if current is None or current == chunk:
+        return chunk
+    if "object" in (current, chunk) or "bool" in (current, chunk):
+        return "object"
+    return np.result_type(current, chunk).name
+
+
+class DatasetProfile:
+    """Row count, column types, null counts and ranges seen while ingesting."""
+
+    def __init__(self):
+        self.row_count = 0
+        self.dtypes: Dict[str, Optional[str]] = {}
+        self.null_counts: Dict[str, int] = {}
+        self.value_ranges: Dict[str, Tuple[float, float]] = {}
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        self.row_count += len(chunk)
+        nulls = chunk.isna().sum()
+        for column in chunk.columns:
+            self.null_counts[column] = self.null_counts.get(column, 0) + int(
+                nulls[column]
+            )
+            dtype = self.dtypes.get(column)
+            # An all-null chunk says nothing about the column's type
+            if nulls[column] < len(chunk):
+                dtype = merge_dtypes(dtype, chunk[column].dtype)
+                if dtype not in ("object", "bool"):
+                    low, high = chunk[column].min(), chunk[column].max()
+                    if column in self.value_ranges:
+                        low = min(low, self.value_ranges[column][0])
+                        high = max(high, self.value_ranges[column][1])
+                    self.value_ranges[column] = (float(low), float(high))
+            # Integer and bool columns with nulls in any chunk parse as
+            # float64 and object
+            if dtype is not None and self.null_counts[column]:
+                if dtype == "bool":
+                    dtype = "object"
+                elif np.issubdtype(np.dtype(dtype), np.integer):
+                    dtype = "float64"
+            self.dtypes[column] = dtype
+
+    @property
+    def column_info(self) -> Dict[str, str]:
+        return {col: dtype or "float64" for col, dtype in self.dtypes.items()}
+
+
+class IngestResult:
+    def __init__(
+        self,
+        file_path: str,
+        parquet_path: Optional[str],
+        profile: Optional[DatasetProfile],
+        column_stats: Optional[Dict[str, Dict[str, Any]]],
+        content_hash: Optional[str] = None,
+    ):
+        self.file_path = file_path
+        self.parquet_path = parquet_path
+        self.profile = profile
+        # Mergeable per-column sketches, see app.services.sketches
+        self.column_stats = column_stats
+        # SHA-256 of the uploaded bytes, the dataset's content identity
+        self.content_hash = content_hash
+
+
+def _profile_csv(source: BinaryIO, sink: BinaryIO, row_limit: int) -> DatasetProfile:
+    profile = DatasetProfile()
+    tee = _TeeReader(source, sink)
+    reader = pd.read_csv(tee, chunksize=CSV_CHUNK_ROWS)
+    for chunk in reader:
+        chunk.columns = [str(col) for col in chunk.columns]
+        profile.update(chunk)
+        if profile.row_count > row_limit:
+            raise RowLimitExceeded(row_limit)
+    tee.drain()
+    return profile
+
+
+def _xlsx_row_count(file_path: str) -> Optional[int]:
+    """Row count from the worksheet dimension, without parsing the cells."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True)
+    try:
+        max_row = workbook.worksheets[0].max_row
+        return max_row - 1 if max_row else None
+    finally:
+        workbook.close()
+
+
+def _ingest_excel(
+    file_path: str, row_limit: int, content_hash: Optional[str] = None
+) -> IngestResult:
+    if file_path.endswith(".xlsx"):
+        declared_rows = _xlsx_row_count(file_path)
+        if declared_rows is not None and declared_rows > row_limit:
+            raise RowLimitExceeded(row_limit)
+
+    df = normalize_dtypes(pd.read_excel(file_path))
+    if len(df) > row_limit:
+        raise RowLimitExceeded(row_limit)
+
+    profile = DatasetProfile()
+    profile.update(df)
+    profile.dtypes = column_info_from_frame(df)
+    sketcher = DatasetSketcher(profile.column_info, profile.value_ranges)
+    sketcher.update(df)
+    parquet_path = write_parquet(df, parquet_path_for(file_path))
+    return IngestResult(
+        file_path, parquet_path, profile, sketcher.to_dict(), content_hash
+    )
+
+
+def ingest_upload(
+    source: BinaryIO,
+    file_path: str,
+    row_limit: int,
+    is_stored: Optional[Callable[[str], bool]] = None,
+) -> IngestResult:
+    """Write an upload to ``file_path`` while profiling it, then store it as Parquet.
+
+    CSV uploads are parsed in chunks as their bytes stream to disk, so the
+    row limit is enforced as soon as it is crossed and the upload is never
+    held in memory as a whole. The Parquet copy is then written chunk by
+    chunk from the local file using the column types found while
+    profiling, and per-column sketches are built from the same chunks.
+    Excel workbooks cannot be parsed incrementally; they are
+    streamed to disk first and rejected from the sheet dimension when
+    possible. A rejected or failed upload leaves no files behind.
+
+    When ``is_stored`` reports the upload's content hash as already stored,
+    the upload is not converted: the result has no Parquet path or column
+    statistics, and no profile for Excel workbooks.
+    """
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    partial_path = file_path + ".part"
+    parquet_path = parquet_path_for(file_path)
+    created = [partial_path]
+
+    try:
+        with open(partial_path, "wb") as raw_sink:
+            sink = _HashingWriter(raw_sink)
+            if file_path.endswith(".csv"):
+                profile = _profile_csv(source, sink, row_limit)
+            else:
+                while True:
+                    block = source.read(READ_BLOCK_SIZE)
+                    if not block:
+                        break
+                    sink.write(block)
+        os.replace(partial_path, file_path)
+        created = [file_path, parquet_path]
+        content_hash = sink.digest.hexdigest()
+
+        if is_stored is not None and is_stored(content_hash):
+            csv_profile = profile if file_path.endswith(".csv") else None
+            return IngestResult(file_path, None, csv_profile, None, content_hash)
+
+        if not file_path.endswith(".csv"):
+            return _ingest_excel(file_path, row_limit, content_hash)
+
+        # Sketches need the final column types, so they are built while the
+        # typed chunks are written out rather than during profiling
+        sketcher = DatasetSketcher(profile.column_info, profile.value_ranges)
+        csv_to_parquet(
+            file_path,
+            parquet_path,
+            profile.column_info,
+            CSV_CHUNK_ROWS,
+            on_chunk=sketcher.update,
+        )
+        return IngestResult(
+            file_path, parquet_path, profile, sketcher.to_dict(), content_hash
+        )
+    except Exception:
+        for path in created:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
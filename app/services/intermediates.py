@@ -0,0 +1,81 @@
+from typing import Any, Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from app.services.groups import GroupCodes, GroupPartition
+
+
+class SharedIntermediates:
+    """Per-frame memo of the arrays analyses derive from their columns.
+
+    A batch of analyses on one dataset shares one instance, so a column is
+    converted to floats, scanned for missing values, factorized or split
+    by a grouping at most once however many analyses read it. Cached
+    arrays are read-only; analyses that modify their input work on the
+    fresh matrices from ``matrix``.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._values: Dict[str, np.ndarray] = {}
+        self._missing: Dict[str, np.ndarray] = {}
+        self._codes: Dict[str, GroupCodes] = {}
+        self._partitions: Dict[Tuple[str, str], GroupPartition] = {}
+        self._descriptions: Dict[str, Dict[str, Any]] = {}
+
+    def values(self, column: str) -> np.ndarray:
+        """The column as a float array, missing values as NaN."""
+        if column not in self._values:
+            values = self.df[column].to_numpy(dtype=float)
+            values.flags.writeable = False
+            self._values[column] = values
+        return self._values[column]
+
+    def matrix(self, columns: List[str]) -> np.ndarray:
+        """A new float matrix with one column per name."""
+        matrix = np.empty((len(self.df), len(columns)))
+        for j, column in enumerate(columns):
+            matrix[:, j] = self.values(column)
+        return matrix
+
+    def missing(self, column: str) -> np.ndarray:
+        if column not in self._missing:
+            missing = self.df[column].isna().to_numpy()
+            missing.flags.writeable = False
+            self._missing[column] = missing
+        return self._missing[column]
+
+    def codes(self, column: str) -> GroupCodes:
+        if column not in self._codes:
+            self._codes[column] = GroupCodes(self.df[column])
+        return self._codes[column]
+
+    def partition(self, group_column: str, target_column: str) -> GroupPartition:
+        key = (group_column, target_column)
+        if key not in self._partitions:
+            self._partitions[key] = self.codes(group_column).partition(
+                self.values(target_column)
+            )
+        return self._partitions[key]
+
+    def describe(self, column: str) -> Dict[str, Any]:
+        """Count, moments, extremes and quartiles of a numeric column."""
+        if column not in self._descriptions:
+            values = self.values(column)
+            present = values[~self.missing(column)]
+            if len(present):
+                quartiles = np.percentile(present, [25, 50, 75])
+                extremes = (float(present.min()), float(present.max()))
+            else:
+                quartiles = np.full(3, np.nan)
+                extremes = (np.nan, np.nan)
+            self._descriptions[column] = {
+                "count": int(len(present)),
+                "mean": float(present.mean()) if len(present) else np.nan,
+                "std": float(present.std(ddof=1)) if len(present) > 1 else np.nan,
+                "min": extremes[0],
+                "max": extremes[1],
+                "median": float(quartiles[1]),
+                "0.25": float(quartiles[0]),
+                "0.75": float(quartiles[2]),
+            }
+        return self._descriptions[column]
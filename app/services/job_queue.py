@@ -0,0 +1,415 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.analysis import Analysis, AnalysisStatus
+from app.models.user import User
+from app.services.scheduler import FairScheduler, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+# Jobs sampled for queue wait and run time statistics
+RECENT_JOBS = 200
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; everything is stored in UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _mean(values: List[float]) -> Optional[float]:
+    return float(np.mean(values)) if values else None
+
+
+class JobQueue:
+    """Durable queue of analyses, backed by the ``analysis`` table.
+
+    A pending row is claimed by flipping it to ``PROCESSING`` with a
+    conditional update, so exactly one worker wins it. On PostgreSQL the
+    candidate rows are selected ``FOR UPDATE SKIP LOCKED`` and concurrent
+    workers never wait on each other; SQLite ignores the locking clause
+    and serializes writers, and the conditional update still guarantees a
+    single claimant.
+
+    Jobs with the same cache key are computed once. A job queued while an
+    identical one is in flight follows it (``leader_id``) and is never
+    claimed; it completes or fails together with its leader. A unique
+    index allows one running job per key, so identical jobs that were
+    queued at the same moment still run only once. The leader's heartbeat
+    is the lease: a crashed leader is reaped and retried, and followers
+    whose leader is gone are detached and queued normally.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        scheduler: Optional[FairScheduler] = None,
+    ):
+        self.session_factory = session_factory
+        self.scheduler = scheduler or FairScheduler.from_settings()
+
+    def claim(self, worker_id: str, limit: int = 1) -> List[int]:
+        """Claim up to ``limit`` runnable analyses, shared fairly between users.
+
+        Only each user's ``limit`` oldest runnable jobs are considered, so
+        one user's backlog does not crowd everyone else out of the
+        candidate set; see ``FairScheduler`` for the choice among them.
+        """
+        now = utcnow()
+        with self.session_factory() as db:
+            window = (
+                select(
+                    Analysis.id,
+                    func.row_number()
+                    .over(partition_by=Analysis.user_id, order_by=Analysis.id)
+                    .label("position"),
+                )
+                .where(
+                    Analysis.status == AnalysisStatus.PENDING,
+                    Analysis.leader_id.is_(None),
+                    or_(Analysis.available_at.is_(None), Analysis.available_at <= now),
+                )
+                .subquery()
+            )
+            candidates = db.execute(
+                select(
+                    Analysis.id,
+                    Analysis.user_id,
+                    User.subscription_tier,
+                    Analysis.cache_key,
+                )
+                .join(User, User.id == Analysis.user_id)
+                .where(
+                    Analysis.id.in_(
+                        select(window.c.id).where(window.c.position <= limit)
+                    )
+                )
+                .order_by(Analysis.id)
+                .with_for_update(of=Analysis, skip_locked=True)
+            ).all()
+            running_by_user: Dict[int, int] = {}
+            running_by_tier: Dict[str, int] = {}
+            for user_id, tier, count in db.execute(
+                select(Analysis.user_id, User.subscription_tier, func.count())
+                .join(User, User.id == Analysis.user_id)
+                .where(Analysis.status == AnalysisStatus.PROCESSING)
+                .group_by(Analysis.user_id, User.subscription_tier)
+            ):
+                running_by_user[user_id] = count
+                running_by_tier[tier.value] = running_by_tier.get(tier.value, 0) + count
+
+            selected = self.scheduler.select(
+                [(job_id, user, tier.value) for job_id, user, tier, _ in candidates],
+                running_by_user,
+                running_by_tier,
+                limit,
+            )
+            keys = {job_id: key for job_id, _, _, key in candidates}
+            running_keys = self._running_keys(db, [key for key in keys.values() if key])
+
+            claimed = []
+            for job_id in selected:
+                key = keys[job_id]
+                if key in running_keys:
+                    self._follow(db, job_id, running_keys[key])
+                    continue
+                try:
+                    with db.begin_nested():
+                        result = db.execute(
+                            update(Analysis)
+                            .where(
+                                Analysis.id == job_id,
+                                Analysis.status == AnalysisStatus.PENDING,
+                            )
+                            .values(
+                                status=AnalysisStatus.PROCESSING,
+                                claimed_by=worker_id,
+                                heartbeat_at=now,
+                                started_at=now,
+                                attempts=Analysis.attempts + 1,
+                            )
+                        )
+                except IntegrityError:
+                    # Another worker started the same computation meanwhile
+                    running_keys.update(self._running_keys(db, [key]))
+                    self._follow(db, job_id, running_keys.get(key))
+                    continue
+                if result.rowcount == 1:
+                    claimed.append(job_id)
+                    if key:
+                        running_keys[key] = job_id
+            db.commit()
+        return claimed
+
+    def find_in_flight(self, cache_key: str) -> Optional[int]:
+        """Id of the queued or running job computing ``cache_key``, if any."""
+        with self.session_factory() as db:
+            return db.scalar(
+                select(Analysis.id)
+                .where(
+                    Analysis.cache_key == cache_key,
+                    Analysis.leader_id.is_(None),
+                    Analysis.status.in_(
+                        [AnalysisStatus.PENDING, AnalysisStatus.PROCESSING]
+                    ),
+                )
+                .order_by(Analysis.id)
+                .limit(1)
+            )
+
+    def admission(self, user_id: int, tier: str) -> Optional[int]:
+        """Seconds to wait before submitting again, or None if admitted.
+
+        A user may have ``JOB_USER_MAX_PENDING`` jobs of their tier queued,
+        and the queue as a whole ``JOB_MAX_PENDING``. The wait is how long
+        the excess takes to drain at recent run times.
+        """
+        with self.session_factory() as db:
+            # Followers cost no compute and are not counted
+            pending = select(func.count()).where(
+                Analysis.status == AnalysisStatus.PENDING,
+                Analysis.leader_id.is_(None),
+            )
+            user_pending = db.scalar(pending.where(Analysis.user_id == user_id))
+            total_pending = db.scalar(pending)
+            run_seconds = _mean(self._recent_durations(db, "run"))
+
+        user_limit = settings.JOB_USER_MAX_PENDING.get(tier)
+        if user_limit is not None and user_pending >= user_limit:
+            return retry_after_seconds(
+                user_pending - user_limit + 1,
+                settings.JOB_USER_MAX_RUNNING.get(tier, 1),
+                run_seconds,
+            )
+        if total_pending >= settings.JOB_MAX_PENDING:
+            return retry_after_seconds(
+                total_pending - settings.JOB_MAX_PENDING + 1,
+                sum(settings.JOB_TIER_MAX_RUNNING.values()),
+                run_seconds,
+            )
+        return None
+
+    def heartbeat(self, worker_id: str, job_ids: List[int]) -> None:
+        if not job_ids:
+            return
+        with self.session_factory() as db:
+            db.execute(
+                update(Analysis)
+                .where(
+                    Analysis.id.in_(job_ids),
+                    Analysis.claimed_by == worker_id,
+                    Analysis.status == AnalysisStatus.PROCESSING,
+                )
+                .values(heartbeat_at=utcnow())
+            )
+            db.commit()
+
+    def complete(self, worker_id: str, job_id: int, results: Dict[str, Any]) -> bool:
+        """Store results for the job and its followers; False if the job was
+        reaped and handed to another worker."""
+        now = utcnow()
+        with self.session_factory() as db:
+            result = db.execute(
+                update(Analysis)
+                .where(Analysis.id == job_id, Analysis.claimed_by == worker_id)
+                .values(
+                    status=AnalysisStatus.COMPLETED,
+                    results=results,
+                    error_message=None,
+                    claimed_by=None,
+                    finished_at=now,
+                )
+            )
+            if result.rowcount == 1:
+                db.execute(
+                    update(Analysis)
+                    .where(
+                        Analysis.leader_id == job_id,
+                        Analysis.status == AnalysisStatus.PENDING,
+                    )
+                    .values(
+                        status=AnalysisStatus.COMPLETED,
+                        results=results,
+                        leader_id=None,
+                        started_at=now,
+                        finished_at=now,
+                    )
+                )
+            db.commit()
+            return result.rowcount == 1
+
+    def fail(
+        self, worker_id: str, job_id: int, error: str, retryable: bool = True
+    ) -> None:
+        """Record a failure, putting the job back with backoff if it may retry."""
+        with self.session_factory() as db:
+            analysis = db.get(Analysis, job_id)
+            if analysis is None or analysis.claimed_by != worker_id:
+                return
+            self._release(db, analysis, error, retryable)
+            db.commit()
+
+    def reap(self, stale_after: Optional[float] = None) -> int:
+        """Hand back processing jobs whose worker stopped heartbeating, and
+        detach followers whose leader is no longer in flight."""
+        stale_after = stale_after or settings.JOB_STALE_AFTER_SECONDS
+        cutoff = utcnow() - timedelta(seconds=stale_after)
+        with self.session_factory() as db:
+            stale = db.scalars(
+                select(Analysis)
+                .where(
+                    Analysis.status == AnalysisStatus.PROCESSING,
+                    or_(
+                        Analysis.heartbeat_at.is_(None), Analysis.heartbeat_at < cutoff
+                    ),
+                )
+                .with_for_update(skip_locked=True)
+            ).all()
+            for analysis in stale:
+                logger.warning(
+                    f"Reaping analysis {analysis.id} from worker {analysis.claimed_by}"
+                )
+                self._release(db, analysis, "Worker stopped responding", retryable=True)
+            # A follower can attach just as its leader finishes, or outlive a
+            # deleted leader; it then runs on its own
+            in_flight = select(Analysis.id).where(
+                Analysis.leader_id.is_(None),
+                Analysis.status.in_(
+                    [AnalysisStatus.PENDING, AnalysisStatus.PROCESSING]
+                ),
+            )
+            db.execute(
+                update(Analysis)
+                .where(
+                    Analysis.leader_id.is_not(None),
+                    Analysis.status == AnalysisStatus.PENDING,
+                    Analysis.leader_id.not_in(in_flight),
+                )
+                .values(leader_id=None)
+            )
+            db.commit()
+            return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        """Depth by status and tier, and recent queue wait and run times."""
+        now = utcnow()
+        with self.session_factory() as db:
+            counts = dict(
+                db.execute(
+                    select(Analysis.status, func.count()).group_by(Analysis.status)
+                ).all()
+            )
+            tiers: Dict[str, Dict[str, int]] = {}
+            for tier, status, count in db.execute(
+                select(User.subscription_tier, Analysis.status, func.count())
+                .join(User, User.id == Analysis.user_id)
+                .where(
+                    Analysis.status.in_(
+                        [AnalysisStatus.PENDING, AnalysisStatus.PROCESSING]
+                    )
+                )
+                .group_by(User.subscription_tier, Analysis.status)
+            ):
+                tiers.setdefault(tier.value, {"pending": 0, "processing": 0})[
+                    status.value
+                ] = count
+            oldest = db.scalar(
+                select(func.min(Analysis.created_at)).where(
+                    Analysis.status == AnalysisStatus.PENDING
+                )
+            )
+            coalesced = db.scalar(
+                select(func.count()).where(
+                    Analysis.status == AnalysisStatus.PENDING,
+                    Analysis.leader_id.is_not(None),
+                )
+            )
+            waits = self._recent_durations(db, "wait")
+            runs = self._recent_durations(db, "run")
+
+        return {
+            **{status.value: counts.get(status, 0) for status in AnalysisStatus},
+            "coalesced": coalesced,
+            "tiers": tiers,
+            "wait_seconds": {
+                "mean": _mean(waits),
+                "p95": float(np.percentile(waits, 95)) if waits else None,
+                "oldest_pending": (
+                    (now - _as_utc(oldest)).total_seconds() if oldest else None
+                ),
+            },
+            "run_seconds": {"mean": _mean(runs)},
+        }
+
+    @staticmethod
+    def _recent_durations(db: Session, kind: str) -> List[float]:
+        """Queue waits or run times of the most recent jobs, in seconds."""
+        if kind == "wait":
+            start, end = Analysis.created_at, Analysis.started_at
+        else:
+            start, end = Analysis.started_at, Analysis.finished_at
+        rows = db.execute(
+            select(start, end)
+            .where(start.is_not(None), end.is_not(None))
+            .order_by(Analysis.id.desc())
+            .limit(RECENT_JOBS)
+        ).all()
+        return [(_as_utc(b) - _as_utc(a)).total_seconds() for a, b in rows]
+
+    @staticmethod
+    def _running_keys(db: Session, keys: List[str]) -> Dict[str, int]:
+        if not keys:
+            return {}
+        return dict(
+            db.execute(
+                select(Analysis.cache_key, Analysis.id).where(
+                    Analysis.cache_key.in_(keys),
+                    Analysis.status == AnalysisStatus.PROCESSING,
+                )
+            ).all()
+        )
+
+    @staticmethod
+    def _follow(db: Session, job_id: int, leader_id: Optional[int]) -> None:
+        # A leader that finished in the meantime leaves the job to be claimed
+        # again, when it will find the results cached
+        if leader_id is not None:
+            db.execute(
+                update(Analysis)
+                .where(Analysis.id == job_id, Analysis.status == AnalysisStatus.PENDING)
+                .values(leader_id=leader_id)
+            )
+
+    @staticmethod
+    def _release(db: Session, analysis: Analysis, error: str, retryable: bool) -> None:
+        analysis.claimed_by = None
+        analysis.error_message = error
+        if retryable and analysis.attempts < settings.JOB_MAX_ATTEMPTS:
+            delay = settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (analysis.attempts - 1)
+            analysis.status = AnalysisStatus.PENDING
+            analysis.available_at = utcnow() + timedelta(seconds=delay)
+        else:
+            analysis.status = AnalysisStatus.FAILED
+            analysis.finished_at = utcnow()
+            # Followers would fail the same way
+            db.execute(
+                update(Analysis)
+                .where(
+                    Analysis.leader_id == analysis.id,
+                    Analysis.status == AnalysisStatus.PENDING,
+                )
+                .values(
+                    status=AnalysisStatus.FAILED,
+                    error_message=error,
+                    leader_id=None,
+                    finished_at=analysis.finished_at,
+                )
+            )
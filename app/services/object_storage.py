@@ -0,0 +1,403 @@
+"""Storage of dataset files on the local filesystem or an S3-compatible
+object store.
+
+Stored files are addressed by URI: a plain path for local storage and
+``s3://bucket/key`` for S3. ``open_stored`` gives Parquet readers a path
+or a seekable reader for either, so they fetch only the footer and the
+column chunks they need. S3 objects are read in fixed-size ranged blocks
+kept in a size-bounded local disk cache.
+"""
+
+import fcntl
+import hashlib
+import io
+import itertools
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+from botocore.exceptions import BotoCoreError, ClientError
+from app.core.config import settings
+
+S3_SCHEME = "s3://"
+# S3 rejects parts other than the last below this size
+S3_MIN_PART_BYTES = 5 * 1024 * 1024
+# Held while a block cache evicts, see BlockCache
+LOCK_FILE = ".lock"
+
+
+class StorageError(OSError):
+    """A stored file could not be read or written, possibly only for now."""
+
+
+def is_object_uri(uri: str) -> bool:
+    return uri.startswith(S3_SCHEME)
+
+
+def parse_object_uri(uri: str) -> Tuple[str, str]:
+    """Bucket and key of an ``s3://`` URI."""
+    bucket, _, key = uri[len(S3_SCHEME) :].partition("/")
+    if not bucket or not key:
+        raise ValueError(f"Invalid object URI: {uri}")
+    return bucket, key
+
+
+class ObjectStorage(ABC):
+    """Where stored dataset files live."""
+
+    @abstractmethod
+    def uri(self, key: str) -> str:
+        """The URI a file stored under ``key`` has."""
+
+    @abstractmethod
+    def put_file(self, key: str, local_path: str) -> str:
+        """Store a local file under ``key`` and return its URI. The local
+        file may be moved."""
+
+    @abstractmethod
+    def delete(self, uri: str) -> None:
+        """Delete a stored file; deleting a missing file is not an error."""
+
+
+class LocalStorage(ObjectStorage):
+    """Files under a directory on the local filesystem; URIs are paths."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def uri(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def put_file(self, key: str, local_path: str) -> str:
+        path = self.uri(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(local_path, path)
+        return path
+
+    def delete(self, uri: str) -> None:
+        try:
+            os.remove(uri)
+        except FileNotFoundError:
+            pass
+
+
+class BlockCache:
+    """Size-bounded local disk cache of object blocks, shared by every
+    process using the same directory.
+
+    Blocks are files named after their object and index, and a block's
+    mtime records when it was last used. After each write the least
+    recently used blocks are deleted until the directory holds at most
+    ``max_bytes``. The size is taken from the directory itself under a
+    lock file, so the bound holds however many processes share it.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, uri: str, index: int, block_size: int) -> Optional[bytes]:
+        path = self._path(uri, index, block_size)
+        try:
+            with open(path, "rb") as block:
+                data = block.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        _touch(path)
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, uri: str, index: int, block_size: int, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(uri, index, block_size)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial_path = f"{path}.{uuid.uuid4().hex}.part"
+        with open(partial_path, "wb") as block:
+            block.write(data)
+        os.replace(partial_path, path)
+        _touch(path)
+        self._evict()
+
+    def discard(self, uri: str) -> None:
+        """Drop every cached block of an object."""
+        directory, name = os.path.split(self._path(uri, 0, 0))
+        prefix = name.rsplit("-", 2)[0] + "-"
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if name.startswith(prefix) and not name.endswith(".part"):
+                _remove(os.path.join(directory, name))
+
+    def stats(self) -> Dict[str, Any]:
+        blocks = self._blocks()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(blocks),
+                "bytes": sum(size for _, _, size in blocks),
+                "max_bytes": self.max_bytes,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+    def _path(self, uri: str, index: int, block_size: int) -> str:
+        digest = hashlib.sha256(uri.encode()).hexdigest()
+        return os.path.join(
+            self.directory, digest[:2], f"{digest}-{block_size}-{index}"
+        )
+
+    def _blocks(self) -> List[Tuple[int, str, int]]:
+        """Last use, path and size of every block on disk."""
+        blocks = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".part") or name == LOCK_FILE:
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                blocks.append((stat.st_mtime_ns, path, stat.st_size))
+        return blocks
+
+    def _evict(self) -> None:
+        with self._lock, self._directory_lock():
+            blocks = self._blocks()
+            total = sum(size for _, _, size in blocks)
+            for _, path, size in sorted(blocks):
+                if total <= self.max_bytes:
+                    break
+                _remove(path)
+                total -= size
+                self.evictions += 1
+
+    @contextmanager
+    def _directory_lock(self) -> Iterator[None]:
+        with open(os.path.join(self.directory, LOCK_FILE), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _touch(path: str) -> None:
+    now = time.time_ns()
+    try:
+        os.utime(path, ns=(now, now))
+    except FileNotFoundError:
+        pass
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class S3Storage(ObjectStorage):
+    """Objects in an S3-compatible bucket.
+
+    Files are uploaded as a single PUT up to ``part_size`` and as a
+    multipart upload above it, read from disk one part at a time. Reads
+    fetch ``block_size`` ranges through the ``BlockCache``, so a Parquet
+    reader downloads only the blocks that hold the footer and the column
+    chunks it asks for, and only once.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        bucket: str,
+        prefix: str = "",
+        part_size: int = settings.S3_MULTIPART_PART_BYTES,
+        block_size: int = settings.STORAGE_READ_BLOCK_BYTES,
+        cache: Optional[BlockCache] = None,
+    ):
+        if part_size < S3_MIN_PART_BYTES:
+            raise ValueError(f"Multipart parts must be at least {S3_MIN_PART_BYTES}")
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.part_size = part_size
+        self.block_size = block_size
+        self.cache = cache
+
+    @classmethod
+    def from_settings(cls) -> "S3Storage":
+        import boto3
+
+        if not settings.S3_BUCKET:
+            raise ValueError("S3_BUCKET must be set for S3 storage")
+        client = boto3.client(
+            "s3",
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region_name=settings.S3_REGION,
+        )
+        cache = BlockCache(settings.STORAGE_CACHE_DIR, settings.STORAGE_CACHE_MAX_BYTES)
+        return cls(client, settings.S3_BUCKET, settings.S3_PREFIX, cache=cache)
+
+    def uri(self, key: str) -> str:
+        return f"{S3_SCHEME}{self.bucket}/{self.prefix}{key}"
+
+    def put_file(self, key: str, local_path: str) -> str:
+        object_key = self.prefix + key
+        with open(local_path, "rb") as source:
+            if os.path.getsize(local_path) <= self.part_size:
+                self.client.put_object(
+                    Bucket=self.bucket, Key=object_key, Body=source.read()
+                )
+            else:
+                self._put_multipart(object_key, source)
+        return self.uri(key)
+
+    def delete(self, uri: str) -> None:
+        bucket, key = parse_object_uri(uri)
+        self.client.delete_object(Bucket=bucket, Key=key)
+        if self.cache is not None:
+            self.cache.discard(uri)
+
+    def open(self, uri: str) -> "ObjectReader":
+        bucket, key = parse_object_uri(uri)
+        try:
+            size = self.client.head_object(Bucket=bucket, Key=key)["ContentLength"]
+        except (BotoCoreError, ClientError) as e:
+            raise StorageError(f"Could not open {uri}: {str(e)}") from e
+        return ObjectReader(self, uri, size)
+
+    def read_block(self, uri: str, index: int) -> bytes:
+        if self.cache is not None:
+            data = self.cache.get(uri, index, self.block_size)
+            if data is not None:
+                return data
+        bucket, key = parse_object_uri(uri)
+        start = index * self.block_size
+        try:
+            data = self.client.get_object(
+                Bucket=bucket,
+                Key=key,
+                Range=f"bytes={start}-{start + self.block_size - 1}",
+            )["Body"].read()
+        except (BotoCoreError, ClientError) as e:
+            raise StorageError(f"Could not read {uri}: {str(e)}") from e
+        if self.cache is not None:
+            self.cache.put(uri, index, self.block_size, data)
+        return data
+
+    def _put_multipart(self, key: str, source: BinaryIO) -> None:
+        upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=key)[
+            "UploadId"
+        ]
+        try:
+            parts = []
+            for number in itertools.count(1):
+                data = source.read(self.part_size)
+                if not data:
+                    break
+                response = self.client.upload_part(
+                    Bucket=self.bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                    PartNumber=number,
+                    Body=data,
+                )
+                parts.append({"ETag": response["ETag"], "PartNumber": number})
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except BaseException:
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id
+            )
+            raise
+
+
+class ObjectReader(io.RawIOBase):
+    """Seekable reader of an object that fetches it block by block."""
+
+    def __init__(self, storage: S3Storage, uri: str, size: int):
+        self.storage = storage
+        self.uri = uri
+        self.size = size
+        self.position = 0
+        # The block most recently read, since reads are mostly sequential
+        self._block: Tuple[int, bytes] = (-1, b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self.position + offset
+        else:
+            position = self.size + offset
+        self.position = max(0, position)
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer).cast("B")
+        block_size = self.storage.block_size
+        written = 0
+        while written < len(view) and self.position < self.size:
+            index, offset = divmod(self.position, block_size)
+            if self._block[0] != index:
+                self._block = (index, self.storage.read_block(self.uri, index))
+            chunk = self._block[1][offset : offset + len(view) - written]
+            if not chunk:
+                break
+            view[written : written + len(chunk)] = chunk
+            written += len(chunk)
+            self.position += len(chunk)
+        return written
+
+
+def storage_from_settings() -> ObjectStorage:
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage.from_settings()
+    if settings.STORAGE_BACKEND != "local":
+        raise ValueError(f"Unknown storage backend: {settings.STORAGE_BACKEND}")
+    return LocalStorage(settings.DATASET_STORAGE_ROOT)
+
+
+object_storage = storage_from_settings()
+
+
+@contextmanager
+def open_stored(uri: str) -> Iterator[Union[str, BinaryIO]]:
+    """A path or seekable reader pyarrow can read a stored file from."""
+    if not is_object_uri(uri):
+        yield uri
+        return
+    if not isinstance(object_storage, S3Storage):
+        raise ValueError("S3 storage is not configured")
+    reader = object_storage.open(uri)
+    try:
+        yield reader
+    finally:
+        reader.close()
@@ -0,0 +1,281 @@
+import warnings
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from scipy import linalg, stats
+
+# Smallest diagonal entry of the Cholesky factor of the unit-scaled Gram
+# matrix: the distance of a predictor from the span of the ones before it
+COLLINEARITY_TOLERANCE = 1e-7
+# Rows per block when screening many predictors at once
+SCREEN_BLOCK_ROWS = 16_384
+
+
+def regression_predictors(config: Dict[str, Any]) -> List[str]:
+    """Predictors of a regression config: screened, multiple or single."""
+    if config.get("screening_variables"):
+        return list(config["screening_variables"])
+    return list(config.get("independent_variables") or [config["independent_variable"]])
+
+
+def coefficient_names(config: Dict[str, Any], terms: List[str]) -> List[str]:
+    """Result keys for the fitted terms.
+
+    A single ``independent_variable`` keeps the original ``slope`` key.
+    """
+    if config.get("independent_variables"):
+        return terms
+    return ["slope"]
+
+
+class DesignMatrix:
+    """Listwise-complete design matrix with dummy-coded categorical predictors.
+
+    Rows missing the outcome or any predictor are dropped through one row
+    index; the matrix is filled column by column from that index, so the
+    source frame is never copied. A categorical predictor with L levels
+    becomes L - 1 indicator columns against its first level (sorted).
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        dependent: str,
+        predictors: List[str],
+        categorical: Optional[List[str]] = None,
+    ):
+        categorical = set(categorical or [])
+        complete = df[dependent].notna().to_numpy().copy()
+        for column in predictors:
+            complete &= df[column].notna().to_numpy()
+        rows = np.flatnonzero(complete)
+
+        columns: List[Tuple[str, Any]] = []
+        self.reference_levels: Dict[str, Any] = {}
+        width = 0
+        for column in predictors:
+            values = df[column].to_numpy()[rows]
+            if column in categorical or not pd.api.types.is_numeric_dtype(
+                df[column].dtype
+            ):
+                codes, labels = pd.factorize(values, sort=True)
+                self.reference_levels[column] = (
+                    labels.tolist()[0] if len(labels) else None
+                )
+                columns.append((column, (codes, labels)))
+                width += max(len(labels) - 1, 0)
+            else:
+                columns.append((column, values))
+                width += 1
+
+        self.n = len(rows)
+        self.y = df[dependent].to_numpy(dtype=float)[rows]
+        self.X = np.zeros((self.n, width))
+        self.terms: List[str] = []
+        for column, values in columns:
+            offset = len(self.terms)
+            if column in self.reference_levels:
+                codes, labels = values
+                dummies = codes > 0
+                self.X[np.flatnonzero(dummies), offset + codes[dummies] - 1] = 1.0
+                self.terms.extend(f"{column}[{label}]" for label in labels[1:])
+            else:
+                self.X[:, offset] = values
+                self.terms.append(column)
+
+
+class LeastSquares:
+    """Linear least squares from centered cross-products and one Cholesky factor.
+
+    Predictors are centered and scaled to unit length before factorizing,
+    which keeps the Gram matrix well conditioned; the same factor gives the
+    coefficients and, through one triangular solve, their standard errors.
+    """
+
+    def __init__(
+        self,
+        n: int,
+        x_mean: np.ndarray,
+        y_mean: float,
+        cxx: np.ndarray,
+        cxy: np.ndarray,
+        terms: List[str],
+    ):
+        self.n = n
+        self.terms = terms
+        self.x_mean = x_mean
+        if n <= len(terms) + 1:
+            raise ValueError("Not enough complete rows to fit the regression")
+
+        scale = np.sqrt(np.diag(cxx))
+        constant = [term for term, s in zip(terms, scale) if not s > 0]
+        if constant:
+            raise ValueError(f"Predictors without variation: {', '.join(constant)}")
+        gram = cxx / np.outer(scale, scale)
+        try:
+            factor = np.linalg.cholesky(gram)
+        except np.linalg.LinAlgError:
+            factor = None
+        if factor is None or np.diag(factor).min() < COLLINEARITY_TOLERANCE:
+            raise ValueError("Predictors are collinear")
+
+        self.scale = scale
+        self.factor = factor
+        self.coefficients = linalg.cho_solve((factor, True), cxy / scale) / scale
+        self.intercept = float(y_mean - x_mean @ self.coefficients)
+
+    @classmethod
+    def fit(cls, X: np.ndarray, y: np.ndarray, terms: List[str]) -> "LeastSquares":
+        """Fit from data, centering ``X`` in place."""
+        x_mean = X.mean(axis=0)
+        y_mean = y.mean()
+        X -= x_mean
+        yc = y - y_mean
+        return cls(len(y), x_mean, y_mean, X.T @ X, X.T @ yc, terms)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.intercept + X @ self.coefficients
+
+    def results(
+        self, ss_total: float, ss_residual: float, names: List[str]
+    ) -> Dict[str, Any]:
+        """Coefficient table and fit statistics keyed by ``names``."""
+        p = len(self.terms)
+        dof = self.n - p - 1
+        mse = ss_residual / dof
+
+        # Rows of L^-1 D^-1 give the covariance of the slopes as M'M * mse
+        inverse = linalg.solve_triangular(
+            self.factor, np.diag(1.0 / self.scale), lower=True
+        )
+        slope_se = np.sqrt(mse * (inverse**2).sum(axis=0))
+        intercept_se = np.sqrt(
+            mse * (1.0 / self.n + np.sum((inverse @ self.x_mean) ** 2))
+        )
+
+        keys = ["intercept", *names]
+        beta = np.concatenate([[self.intercept], self.coefficients])
+        se = np.concatenate([[intercept_se], slope_se])
+        t_stats = beta / se
+        p_values = 2 * stats.t.sf(np.abs(t_stats), df=dof)
+
+        r_squared = 1 - ss_residual / ss_total
+        f_statistic = ((ss_total - ss_residual) / p) / mse
+        return {
+            "coefficients": dict(zip(keys, beta.tolist())),
+            "standard_errors": dict(zip(keys, se.tolist())),
+            "t_statistics": dict(zip(keys, t_stats.tolist())),
+            "p_values": dict(zip(keys, p_values.tolist())),
+            "r_squared": float(r_squared),
+            "adjusted_r_squared": float(1 - (1 - r_squared) * (self.n - 1) / dof),
+            "f_statistic": float(f_statistic),
+            "f_p_value": float(stats.f.sf(f_statistic, p, dof)),
+            "sample_size": int(self.n),
+        }
+
+
+class UnivariateScreen:
+    """One simple regression of the outcome on each of many predictors.
+
+    Every predictor uses the rows where it and the outcome are both
+    present. Sums and centered cross-products for all predictors are
+    accumulated column-wise per block of rows, around a shift taken from
+    the first block, so one pass fits every model and blocks from a
+    chunked read merge by addition.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self.shift: Optional[Tuple[np.ndarray, float]] = None
+        self.n = np.zeros(k)
+        self.sum_x = np.zeros(k)
+        self.sum_y = np.zeros(k)
+        self.sxx = np.zeros(k)
+        self.sxy = np.zeros(k)
+        self.syy = np.zeros(k)
+
+    def update(self, X: np.ndarray, y: np.ndarray) -> None:
+        if self.shift is None:
+            if np.isnan(y).all():
+                return
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                self.shift = (np.nan_to_num(np.nanmean(X, axis=0)), np.nanmean(y))
+        # Blocks of rows bound the masked temporaries
+        for start in range(0, len(y), SCREEN_BLOCK_ROWS):
+            block_x = X[start : start + SCREEN_BLOCK_ROWS]
+            block_y = y[start : start + SCREEN_BLOCK_ROWS]
+            xc = block_x - self.shift[0]
+            yc = block_y - self.shift[1]
+            missing = np.isnan(xc)
+            missing |= np.isnan(yc)[:, None]
+            if missing.any():
+                xc[missing] = 0.0
+                yc = np.nan_to_num(yc)
+                present = (~missing).astype(float)
+                self.n += present.sum(axis=0)
+                self.sum_y += yc @ present
+                self.syy += yc**2 @ present
+            else:
+                self.n += len(yc)
+                self.sum_y += yc.sum()
+                self.syy += yc @ yc
+            self.sum_x += xc.sum(axis=0)
+            self.sxx += np.einsum("ij,ij->j", xc, xc)
+            self.sxy += yc @ xc
+
+    def results(self, names: List[str]) -> List[Dict[str, Any]]:
+        """Per-predictor fits with Benjamini-Hochberg q-values, by p-value."""
+        n = self.n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dx, dy = self.sum_x / n, self.sum_y / n
+            cxx = self.sxx - n * dx * dx
+            cxy = self.sxy - n * dx * dy
+            cyy = self.syy - n * dy * dy
+            slope = cxy / cxx
+            ss_residual = np.maximum(cyy - slope * cxy, 0.0)
+            standard_error = np.sqrt(ss_residual / (n - 2) / cxx)
+            t_stats = slope / standard_error
+            p_values = 2 * stats.t.sf(np.abs(t_stats), df=n - 2)
+            r_squared = 1 - ss_residual / cyy
+        shift_x, shift_y = self.shift if self.shift is not None else (0.0, 0.0)
+        intercept = (shift_y + dy) - slope * (shift_x + dx)
+        invalid = (n < 3) | ~(cxx > 0)
+        for values in (slope, intercept, standard_error, t_stats, p_values, r_squared):
+            values[invalid] = np.nan
+
+        q_values = np.full(self.k, np.nan)
+        tested = ~np.isnan(p_values)
+        if tested.any():
+            q_values[tested] = stats.false_discovery_control(p_values[tested])
+
+        order = np.argsort(np.where(tested, p_values, np.inf), kind="stable")
+        return [
+            {
+                "variable": names[j],
+                "slope": float(slope[j]),
+                "intercept": float(intercept[j]),
+                "standard_error": float(standard_error[j]),
+                "t_statistic": float(t_stats[j]),
+                "p_value": float(p_values[j]),
+                "q_value": float(q_values[j]),
+                "r_squared": float(r_squared[j]),
+                "sample_size": int(n[j]),
+            }
+            for j in order
+        ]
+
+
+def screening_results(
+    dependent: str, fits: List[Dict[str, Any]], fdr_alpha: Optional[float] = None
+) -> Dict[str, Any]:
+    """Screening payload, keeping only fits with q <= ``fdr_alpha`` if given."""
+    screened = len(fits)
+    if fdr_alpha is not None:
+        fits = [fit for fit in fits if fit["q_value"] <= fdr_alpha]
+    return {
+        "dependent_variable": dependent,
+        "predictors_screened": screened,
+        "fdr_alpha": fdr_alpha,
+        "results": fits,
+    }
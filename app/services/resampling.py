@@ -0,0 +1,408 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.services.correlation import rank_columns
+from app.services.groups import GroupPartition
+
+RESAMPLING_METHODS = ("both", "bootstrap", "permutation")
+
+# Blocks run in threads: the statistics are vectorized numpy, which
+# releases the GIL, and threads share the data instead of pickling it
+# into processes nested inside the analysis workers
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> Optional[ThreadPoolExecutor]:
+    global _executor
+    if settings.RESAMPLING_WORKERS <= 1:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RESAMPLING_WORKERS,
+                thread_name_prefix="resampling",
+            )
+        return _executor
+
+
+def shutdown_executor() -> None:
+    """Stop the threads running resampling blocks, if any were started."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
+
+
+def _run_block(
+    statistic: Callable[..., np.ndarray],
+    seed: np.random.SeedSequence,
+    size: int,
+    data: Tuple[Any, ...],
+) -> np.ndarray:
+    return statistic(np.random.default_rng(seed), size, *data)
+
+
+def resample(
+    statistic: Callable[..., np.ndarray],
+    data: Tuple[Any, ...],
+    iterations: int,
+    seed: int,
+    width: int,
+) -> np.ndarray:
+    """Evaluate ``statistic`` over ``iterations`` resamples, block by block.
+
+    ``statistic(rng, size, *data)`` draws ``size`` resamples at once and
+    returns one row of statistics per resample. ``width`` is the number of
+    values one resample materializes; blocks are sized so that no block
+    holds more than ``RESAMPLING_BLOCK_ELEMENTS`` of them. Each block gets
+    its own child of ``seed``, so results do not depend on how many
+    workers run the blocks.
+    """
+    block_size = max(
+        1,
+        min(
+            settings.RESAMPLING_BLOCK_SIZE,
+            settings.RESAMPLING_BLOCK_ELEMENTS // max(width, 1),
+        ),
+    )
+    sizes = [
+        min(block_size, iterations - start)
+        for start in range(0, iterations, block_size)
+    ]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    executor = _get_executor()
+    if executor is None or len(sizes) == 1:
+        blocks = [
+            _run_block(statistic, block_seed, size, data)
+            for block_seed, size in zip(seeds, sizes)
+        ]
+    else:
+        futures = [
+            executor.submit(_run_block, statistic, block_seed, size, data)
+            for block_seed, size in zip(seeds, sizes)
+        ]
+        blocks = [future.result() for future in futures]
+    return np.concatenate(blocks)
+
+
+class Resampler:
+    """Bootstrap intervals and permutation p-values for one analysis."""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.method = config.get("method", "both")
+        if self.method not in RESAMPLING_METHODS:
+            raise ValueError(f"Unsupported resampling method: {self.method}")
+        self.iterations = int(config.get("iterations", 2000))
+        self.confidence_level = float(config.get("confidence_level", 0.95))
+        seed = config.get("seed")
+        # Without a seed one is drawn and reported, so the run can be repeated
+        self.seed = (
+            int(seed)
+            if seed is not None
+            else int(np.random.SeedSequence().generate_state(1)[0])
+        )
+
+    @property
+    def bootstrap(self) -> bool:
+        return self.method in ("both", "bootstrap")
+
+    @property
+    def permutation(self) -> bool:
+        return self.method in ("both", "permutation")
+
+    def interval(
+        self,
+        statistic: Callable[..., np.ndarray],
+        data: Tuple[Any, ...],
+        width: int,
+    ) -> Optional[np.ndarray]:
+        """Percentile bootstrap interval per statistic, shape (2, s)."""
+        if not self.bootstrap:
+            return None
+        samples = resample(statistic, data, self.iterations, self.seed, width)
+        tail = (1 - self.confidence_level) / 2 * 100
+        return np.nanpercentile(samples, [tail, 100 - tail], axis=0)
+
+    def p_values(
+        self,
+        statistic: Callable[..., np.ndarray],
+        data: Tuple[Any, ...],
+        observed: np.ndarray,
+        width: int,
+    ) -> Optional[np.ndarray]:
+        """Two-sided permutation p-values, counting the observed arrangement."""
+        if not self.permutation:
+            return None
+        # A different stream from the bootstrap draws
+        samples = resample(statistic, data, self.iterations, self.seed + 1, width)
+        extreme = np.abs(samples) >= np.abs(observed) * (1 - 1e-12)
+        return (extreme.sum(axis=0) + 1) / (self.iterations + 1)
+
+    def summary(
+        self,
+        names: List[str],
+        observed: np.ndarray,
+        interval: Optional[np.ndarray] = None,
+        p_values: Optional[np.ndarray] = None,
+    ) -> Dict[str, Any]:
+        statistics = {}
+        for i, name in enumerate(names):
+            entry = {"estimate": float(observed[i])}
+            if interval is not None:
+                entry["ci_lower"] = float(interval[0, i])
+                entry["ci_upper"] = float(interval[1, i])
+            if p_values is not None:
+                entry["permutation_p_value"] = float(p_values[i])
+            statistics[name] = entry
+        return {
+            "method": self.method,
+            "iterations": self.iterations,
+            "confidence_level": self.confidence_level,
+            "seed": self.seed,
+            "statistics": statistics,
+        }
+
+
+# Block statistics. They are module-level so process pool workers can
+# unpickle them, and each draws a whole block of resamples at once.
+
+
+def _group_summaries(
+    sample: np.ndarray, offsets: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-resample group means and medians of group-contiguous samples."""
+    counts = np.diff(offsets)
+    means = np.add.reduceat(sample, offsets[:-1], axis=1) / counts
+    medians = np.column_stack(
+        [
+            np.median(sample[:, offsets[g] : offsets[g + 1]], axis=1)
+            for g in range(len(counts))
+        ]
+    )
+    return means, medians
+
+
+def _group_comparison(sample: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    means, medians = _group_summaries(sample, offsets)
+    if len(offsets) == 3:
+        return np.column_stack(
+            [means[:, 0] - means[:, 1], medians[:, 0] - medians[:, 1]]
+        )
+    return means
+
+
+def _f_statistic(sample: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    counts = np.diff(offsets)
+    k, n = len(counts), offsets[-1]
+    # Centered first, so the within-group sum of squares does not cancel
+    sample = sample - sample.mean(axis=1, keepdims=True)
+    means = np.add.reduceat(sample, offsets[:-1], axis=1) / counts
+    between = (counts * means**2).sum(axis=1)
+    within = (sample**2).sum(axis=1) - (counts * means**2).sum(axis=1)
+    return ((between / (k - 1)) / (within / (n - k)))[:, None]
+
+
+def group_bootstrap_block(
+    rng: np.random.Generator, size: int, values: np.ndarray, offsets: np.ndarray
+) -> np.ndarray:
+    """Resample within each group, keeping the group sizes."""
+    index = np.hstack(
+        [
+            offsets[g] + rng.integers(0, offsets[g + 1] - offsets[g], (size, count))
+            for g, count in enumerate(np.diff(offsets))
+        ]
+    )
+    return _group_comparison(values[index], offsets)
+
+
+def group_permutation_block(
+    rng: np.random.Generator, size: int, values: np.ndarray, offsets: np.ndarray
+) -> np.ndarray:
+    """Shuffle the group labels; F for more than two groups."""
+    index = rng.permuted(np.tile(np.arange(len(values)), (size, 1)), axis=1)
+    if len(offsets) == 3:
+        return _group_comparison(values[index], offsets)
+    return _f_statistic(values[index], offsets)
+
+
+def _row_correlation(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    x = x - x.mean(axis=1, keepdims=True)
+    y = y - y.mean(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (x * y).sum(axis=1) / np.sqrt((x * x).sum(axis=1) * (y * y).sum(axis=1))
+
+
+def _ranked(sample: np.ndarray, rank: bool) -> np.ndarray:
+    return rank_columns(sample.T).T if rank else sample
+
+
+def correlation_bootstrap_block(
+    rng: np.random.Generator,
+    size: int,
+    pairs: List[Tuple[np.ndarray, np.ndarray]],
+    rank: bool,
+) -> np.ndarray:
+    """Resample the complete rows of each pair; Spearman re-ranks each one."""
+    statistics = np.empty((size, len(pairs)))
+    for j, (x, y) in enumerate(pairs):
+        index = rng.integers(0, len(x), (size, len(x)))
+        statistics[:, j] = _row_correlation(
+            _ranked(x[index], rank), _ranked(y[index], rank)
+        )
+    return statistics
+
+
+def correlation_permutation_block(
+    rng: np.random.Generator,
+    size: int,
+    pairs: List[Tuple[np.ndarray, np.ndarray]],
+    rank: bool,
+) -> np.ndarray:
+    """Shuffle one side of each pair; ranks are invariant to the shuffle."""
+    statistics = np.empty((size, len(pairs)))
+    for j, (x, y) in enumerate(pairs):
+        if rank:
+            x, y = _ranked(x[None, :], True)[0], _ranked(y[None, :], True)[0]
+        index = rng.permuted(np.tile(np.arange(len(y)), (size, 1)), axis=1)
+        statistics[:, j] = _row_correlation(np.broadcast_to(x, index.shape), y[index])
+    return statistics
+
+
+def regression_bootstrap_block(
+    rng: np.random.Generator,
+    size: int,
+    X: np.ndarray,
+    y: np.ndarray,
+    x_mean: np.ndarray,
+) -> np.ndarray:
+    """Case-resampling bootstrap of the intercept and coefficients.
+
+    ``X`` is centered on the full sample; each resample is re-centered and
+    its normal equations are solved as one batched system.
+    """
+    index = rng.integers(0, len(y), (size, len(y)))
+    Xb, yb = X[index], y[index]
+    xb_mean, yb_mean = Xb.mean(axis=1), yb.mean(axis=1)
+    Xb -= xb_mean[:, None, :]
+    yb = yb - yb_mean[:, None]
+    gram = np.einsum("bni,bnj->bij", Xb, Xb)
+    moments = np.einsum("bni,bn->bi", Xb, yb)
+    try:
+        coefficients = np.linalg.solve(gram, moments[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        # Some resample left a predictor without variation; skip only those
+        coefficients = np.full(moments.shape, np.nan)
+        for b in range(size):
+            try:
+                coefficients[b] = np.linalg.solve(gram[b], moments[b])
+            except np.linalg.LinAlgError:
+                pass
+    intercept = yb_mean - ((xb_mean + x_mean) * coefficients).sum(axis=1)
+    return np.column_stack([intercept, coefficients])
+
+
+def regression_permutation_block(
+    rng: np.random.Generator, size: int, basis: np.ndarray, y: np.ndarray
+) -> np.ndarray:
+    """R-squared with the outcome shuffled, from an orthonormal basis of X."""
+    index = rng.permuted(np.tile(np.arange(len(y)), (size, 1)), axis=1)
+    yp = y[index] - y.mean()
+    return ((yp @ basis) ** 2).sum(axis=1)[:, None] / (yp**2).sum(axis=1)[:, None]
+
+
+def comparative_resampling(
+    partition: GroupPartition, config: Dict[str, Any]
+) -> Dict[str, Any]:
+    resampler = Resampler(config)
+    labels = partition.groups.labels
+    values = partition.values
+    offsets = partition.offsets
+    if np.any(np.diff(offsets) == 0):
+        raise ValueError("Resampling needs at least one value in every group")
+
+    data, width = (values, offsets), len(values)
+    observed_groups = _group_comparison(values[None, :], offsets)[0]
+    interval = resampler.interval(group_bootstrap_block, data, width)
+    if len(labels) == 2:
+        names = ["mean_difference", "median_difference"]
+        p_values = resampler.p_values(
+            group_permutation_block, data, observed_groups, width
+        )
+        return resampler.summary(names, observed_groups, interval, p_values)
+
+    names = [f"mean {label}" for label in labels]
+    summary = resampler.summary(names, observed_groups, interval)
+    observed_f = _f_statistic(values[None, :], offsets)[0]
+    p_values = resampler.p_values(group_permutation_block, data, observed_f, width)
+    if p_values is not None:
+        summary["statistics"]["f_statistic"] = {
+            "estimate": float(observed_f[0]),
+            "permutation_p_value": float(p_values[0]),
+        }
+    return summary
+
+
+def correlation_resampling(
+    values: np.ndarray, columns: List[str], method: str, config: Dict[str, Any]
+) -> Dict[str, Any]:
+    if method not in ("pearson", "spearman"):
+        raise ValueError("Resampling supports pearson and spearman correlation")
+    resampler = Resampler(config)
+    rank = method == "spearman"
+
+    names, pairs = [], []
+    for i in range(len(columns)):
+        for j in range(i + 1, len(columns)):
+            complete = ~(np.isnan(values[:, i]) | np.isnan(values[:, j]))
+            names.append(f"{columns[i]} vs {columns[j]}")
+            pairs.append((values[complete, i], values[complete, j]))
+
+    observed = np.array(
+        [
+            _row_correlation(_ranked(x[None, :], rank), _ranked(y[None, :], rank))[0]
+            for x, y in pairs
+        ]
+    )
+    # Pairs are resampled one at a time within a block
+    width = 2 * max((len(x) for x, _ in pairs), default=1)
+    interval = resampler.interval(correlation_bootstrap_block, (pairs, rank), width)
+    p_values = resampler.p_values(
+        correlation_permutation_block, (pairs, rank), observed, width
+    )
+    return resampler.summary(names, observed, interval, p_values)
+
+
+def regression_resampling(
+    X: np.ndarray,
+    y: np.ndarray,
+    x_mean: np.ndarray,
+    names: List[str],
+    observed: np.ndarray,
+    r_squared: float,
+    config: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Bootstrap intervals for every coefficient and a permutation p for R².
+
+    ``X`` holds the predictors centered on ``x_mean``; ``observed`` is the
+    fitted intercept followed by the coefficients.
+    """
+    resampler = Resampler(config)
+    width = len(y) * (X.shape[1] + 1)
+    interval = resampler.interval(regression_bootstrap_block, (X, y, x_mean), width)
+    summary = resampler.summary(["intercept", *names], observed, interval)
+
+    basis, _ = np.linalg.qr(X)
+    p_values = resampler.p_values(
+        regression_permutation_block, (basis, y), np.array([r_squared]), len(y)
+    )
+    if p_values is not None:
+        summary["statistics"]["r_squared"] = {
+            "estimate": float(r_squared),
+            "permutation_p_value": float(p_values[0]),
+        }
+    return summary
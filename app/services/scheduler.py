@@ -0,0 +1,86 @@
+import math
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+from app.core.config import settings
+
+# (analysis id, user id, subscription tier) of a runnable job, oldest first
+Candidate = Tuple[int, int, str]
+
+
+class FairScheduler:
+    """Weighted fair sharing of worker slots between users.
+
+    A user's share is their running jobs divided by their tier's weight.
+    Each free slot goes to the user with the smallest share, so a user
+    with hundreds of queued jobs gets no more slots than one with a
+    single job; ties go to the heavier tier, then the oldest job. Users
+    and tiers at their running caps are passed over.
+
+    Caps are checked against the running jobs seen at claim time, so
+    workers claiming concurrently can overshoot them by one claim batch.
+    """
+
+    def __init__(
+        self,
+        weights: Dict[str, float],
+        tier_max_running: Dict[str, int],
+        user_max_running: Dict[str, int],
+    ):
+        self.weights = weights
+        self.tier_max_running = tier_max_running
+        self.user_max_running = user_max_running
+
+    @classmethod
+    def from_settings(cls) -> "FairScheduler":
+        return cls(
+            settings.JOB_TIER_WEIGHTS,
+            settings.JOB_TIER_MAX_RUNNING,
+            settings.JOB_USER_MAX_RUNNING,
+        )
+
+    def select(
+        self,
+        candidates: List[Candidate],
+        running_by_user: Dict[int, int],
+        running_by_tier: Dict[str, int],
+        limit: int,
+    ) -> List[int]:
+        """Ids of up to ``limit`` candidates to start, in start order."""
+        queues: Dict[int, Deque[Candidate]] = defaultdict(deque)
+        for candidate in candidates:
+            queues[candidate[1]].append(candidate)
+        running_by_user = defaultdict(int, running_by_user)
+        running_by_tier = defaultdict(int, running_by_tier)
+
+        selected = []
+        while len(selected) < limit:
+            best: Optional[Tuple[Tuple[float, float, int], int]] = None
+            for user_id, queue in queues.items():
+                job_id, _, tier = queue[0]
+                if running_by_user[user_id] >= self.user_max_running.get(
+                    tier, math.inf
+                ) or running_by_tier[tier] >= self.tier_max_running.get(tier, math.inf):
+                    continue
+                weight = self.weights.get(tier, 1.0)
+                key = (running_by_user[user_id] / weight, -weight, job_id)
+                if best is None or key < best[0]:
+                    best = (key, user_id)
+            if best is None:
+                break
+
+            user_id = best[1]
+            job_id, _, tier = queues[user_id].popleft()
+            if not queues[user_id]:
+                del queues[user_id]
+            running_by_user[user_id] += 1
+            running_by_tier[tier] += 1
+            selected.append(job_id)
+        return selected
+
+
+def retry_after_seconds(
+    excess: int, slots: int, mean_run_seconds: Optional[float]
+) -> int:
+    """Time for ``excess`` queued jobs to drain through ``slots`` workers."""
+    run_seconds = mean_run_seconds or settings.JOB_RETRY_AFTER_SECONDS
+    return max(1, math.ceil(excess * run_seconds / max(slots, 1)))
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.services.analysis import AnalysisService
+from app.services.dataset_io import write_parquet
+from app.services.intermediates import SharedIntermediates
+
+
+@pytest.fixture
+def cohort(tmp_path):
+    rng = np.random.default_rng(7)
+    n = 400
+    df = pd.DataFrame(
+        {
+            "age": rng.normal(50, 12, n).round(),
+            "bmi": rng.normal(26, 4, n),
+            "sbp": rng.normal(130, 15, n),
+            "arm": rng.choice(["control", "treated"], n),
+            "site": rng.choice(["a", "b", "c"], n),
+        }
+    )
+    df.loc[rng.choice(n, 20, replace=False), "bmi"] = np.nan
+    path = write_parquet(df, str(tmp_path / "cohort.parquet"))
+    column_info = {column: str(dtype) for column, dtype in df.dtypes.items()}
+    return df, path, column_info
+
+
+ITEMS = [
+    {"analysis_type": "basic", "config": {"columns": ["age", "bmi"], "exact": True}},
+    {"analysis_type": "correlation", "config": {"columns": ["age", "bmi", "sbp"]}},
+    {
+        "analysis_type": "comparative",
+        "config": {"target_column": "sbp", "group_column": "arm"},
+    },
+    {
+        "analysis_type": "comparative",
+        "config": {"target_columns": ["sbp", "bmi"], "group_column": "site"},
+    },
+    {
+        "analysis_type": "chi_square",
+        "config": {"variable1": "arm", "variable2": "site"},
+    },
+    {
+        "analysis_type": "regression",
+        "config": {
+            "dependent_variable": "sbp",
+            "independent_variables": ["age", "bmi"],
+        },
+    },
+]
+
+
+def test_batch_matches_separate_analyses(cohort):
+    _, path, column_info = cohort
+    service = AnalysisService()
+
+    batch = service.execute_batch(1, path, ITEMS, column_info)
+
+    assert batch["completed"] == len(ITEMS) and batch["failed"] == 0
+    for item, result in zip(ITEMS, batch["items"]):
+        separate = service.execute(
+            2, path, item["analysis_type"], item["config"], column_info
+        )
+        assert result["status"] == "completed"
+        assert result["results"] == separate
+
+
+def test_failing_item_does_not_stop_the_batch(cohort):
+    _, path, column_info = cohort
+    items = [
+        {"analysis_type": "correlation", "config": {"columns": ["age", "missing"]}},
+        {"analysis_type": "batch", "config": {}},
+        ITEMS[2],
+    ]
+
+    batch = AnalysisService().execute_batch(1, path, items, column_info)
+
+    assert [item["status"] for item in batch["items"]] == [
+        "failed",
+        "failed",
+        "completed",
+    ]
+    assert batch["items"][1]["error"] == "Unsupported analysis type: batch"
+    assert batch["items"][2]["results"]["statistical_test"]["name"] == (
+        "Independent t-test"
+    )
+
+
+def test_intermediates_are_computed_once(cohort):
+    df = cohort[0]
+    shared = SharedIntermediates(df)
+
+    assert shared.codes("site") is shared.codes("site")
+    assert shared.partition("arm", "sbp") is shared.partition("arm", "sbp")
+    assert not shared.values("bmi").flags.writeable
+
+    described = shared.describe("bmi")
+    expected = df["bmi"].describe()
+    assert described["count"] == expected["count"]
+    for key, name in [("mean", "mean"), ("std", "std"), ("0.25", "25%")]:
+        assert described[key] == pytest.approx(expected[name])
@@ -0,0 +1,130 @@
+import asyncio
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from redis.backoff import NoBackoff
+from redis.retry import Retry
+from app.services.cache import (
+    AsyncCacheService,
+    CacheService,
+    LocalCache,
+    MemoryBackend,
+    RedisBackend,
+    is_cacheable,
+)
+
+
+def test_local_tier_serves_copies_and_counts_hits():
+    cache = CacheService()
+    key = cache.get_analysis_cache_key("abc", "correlation", {"columns": ["a"]})
+    assert cache.get(key) is None
+
+    cache.set(key, {"r": [1.0, 0.5]})
+    first = cache.get(key)
+    first["r"].append(9)
+
+    assert cache.get(key) == {"r": [1.0, 0.5]}
+    stats = cache.stats()
+    assert (stats["local_hits"], stats["misses"]) == (2, 1)
+    assert stats["hit_rate"] == 2 / 3
+
+
+def test_equivalent_configs_share_a_key():
+    cache = CacheService()
+    first = cache.get_analysis_cache_key(
+        "abc", "comparative", {"group_column": "arm", "target_column": "sbp"}
+    )
+    second = cache.get_analysis_cache_key(
+        "abc",
+        "comparative",
+        {"target_column": "sbp", "group_column": "arm", "target_columns": None},
+    )
+    assert first == second
+    assert first != cache.get_analysis_cache_key(
+        "abd", "comparative", {"group_column": "arm", "target_column": "sbp"}
+    )
+
+
+def test_local_tier_evicts_least_recently_used_within_budget():
+    cache = CacheService(local_max_bytes=30)
+    cache.set("a", "x" * 10)
+    cache.set("b", "y" * 10)
+    cache.get("a")
+    cache.set("c", "z" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 10
+
+
+def test_invalidate_fingerprint_drops_only_its_keys():
+    cache = CacheService()
+    cache.set("analysis:basic:abc:1", 1)
+    cache.set("visualization:bar:abc:2", 1)
+    cache.set("analysis:basic:def:1", 2)
+
+    cache.invalidate_fingerprint("abc")
+
+    assert cache.get("analysis:basic:abc:1") is None
+    assert cache.get("visualization:bar:abc:2") is None
+    assert cache.get("analysis:basic:def:1") == 2
+
+
+def test_async_service_reads_and_writes_many_keys():
+    cache = AsyncCacheService(MemoryBackend(LocalCache(1024)))
+
+    async def main():
+        assert await cache.mset({"analysis:a:fp:1": [1.0], "analysis:b:fp:2": 2})
+        assert await cache.mget(["analysis:a:fp:1", "x", "analysis:b:fp:2"]) == [
+            [1.0],
+            None,
+            2,
+        ]
+        assert await cache.delete_matching("analysis:*:fp:*") == 2
+        return await cache.get("analysis:a:fp:1")
+
+    assert asyncio.run(main()) is None
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_async_service_shares_the_local_tier_with_workers():
+    local = LocalCache(1024, max_ttl=60)
+    worker_cache = CacheService(local=local)
+    cache = AsyncCacheService(
+        RedisBackend(AsyncRedis(port=1, retry=Retry(NoBackoff(), 0))), local=local
+    )
+    worker_cache.set("analysis:basic:abc:1", {"n": 3})
+
+    async def main():
+        assert await cache.get("analysis:basic:abc:1") == {"n": 3}
+        # Unreachable Redis: misses, and is not retried until the interval ends
+        assert await cache.get("other") is None
+        assert await cache.set("another", 1)
+        await cache.close()
+
+    asyncio.run(main())
+    assert cache.stats()["backend_errors"] == 1
+
+
+def test_unreachable_redis_falls_back_to_local_tier():
+    cache = CacheService(Redis(port=1, retry=Retry(NoBackoff(), 0)))
+    assert cache.set("key", [1, 2])
+    assert cache.get("key") == [1, 2]
+    assert cache.get("other") is None
+    # Redis is not retried until the retry interval has passed
+    assert cache.stats()["redis_errors"] == 1
+
+
+def test_unseeded_resampling_is_not_cached():
+    assert is_cacheable("correlation", {"columns": ["a", "b"]})
+    assert not is_cacheable("correlation", {"resampling": {"iterations": 100}})
+    assert is_cacheable("correlation", {"resampling": {"seed": 3}})
+    assert not is_cacheable(
+        "batch",
+        {
+            "analyses": [
+                {
+                    "analysis_type": "regression",
+                    "config": {"resampling": {"iterations": 9}},
+                }
+            ]
+        },
+    )
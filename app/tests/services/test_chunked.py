@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+from app.services.chunked import ChunkedAnalysisEngine, Moments
+from app.services.codec import expand_matrix
+from app.services.dataset_io import write_parquet
+
+
+@pytest.fixture
+def engine(tmp_path):
+    rng = np.random.default_rng(7)
+    n = 20_000
+    df = pd.DataFrame(
+        {
+            "age": rng.normal(50, 12, n),
+            "crp": rng.lognormal(1, 1, n),
+            "ward": rng.choice(["A", "B", "C"], n),
+            "sex": rng.choice(["M", "F"], n),
+        }
+    )
+    df["crp"] += 0.1 * df["age"]
+    df.loc[rng.random(n) < 0.1, "crp"] = np.nan
+    path = write_parquet(df, str(tmp_path / "data.parquet"))
+    return ChunkedAnalysisEngine(path, batch_rows=3_000), df
+
+
+def test_basic_statistics_match_pandas(engine):
+    engine, df = engine
+
+    result = engine.run("basic", {}, ["age", "crp", "ward"])["descriptive_statistics"]
+
+    assert set(result) == {"age", "crp"}
+    crp = df["crp"]
+    assert result["crp"]["count"] == crp.count()
+    assert result["crp"]["mean"] == pytest.approx(crp.mean(), rel=1e-10)
+    assert result["crp"]["std"] == pytest.approx(crp.std(), rel=1e-10)
+    assert result["crp"]["median"] == pytest.approx(crp.median(), rel=1e-12)
+    assert result["crp"]["0.75"] == pytest.approx(crp.quantile(0.75), rel=1e-12)
+
+
+def test_correlation_is_pairwise_complete(engine):
+    engine, df = engine
+
+    result = engine.run("correlation", {}, ["age", "crp"])
+
+    expected = df[["age", "crp"]].corr().round(4)
+    matrix = expand_matrix(result["correlation_matrix"])
+    assert matrix["age"]["crp"] == expected.loc["crp", "age"]
+
+
+def test_regression_matches_listwise_fit(engine):
+    engine, df = engine
+    config = {"dependent_variable": "crp", "independent_variable": "age"}
+
+    result = engine.run("regression", config, ["crp", "age"])
+
+    complete = df[["age", "crp"]].dropna()
+    fit = stats.linregress(complete["age"], complete["crp"])
+    assert result["coefficients"]["slope"] == pytest.approx(fit.slope, rel=1e-9)
+    assert result["standard_errors"]["slope"] == pytest.approx(fit.stderr, rel=1e-9)
+    assert result["r_squared"] == pytest.approx(fit.rvalue**2, rel=1e-9)
+    assert result["sample_size"] == len(complete)
+
+
+def test_chi_square_accumulates_crosstab(engine):
+    engine, df = engine
+    config = {"variable1": "ward", "variable2": "sex"}
+
+    result = engine.run("chi_square", config, ["ward", "sex"])
+
+    expected = pd.crosstab(df["ward"], df["sex"])
+    assert result["contingency_table"] == expected.to_dict()
+
+
+def test_moments_merge_matches_scipy():
+    values = np.random.default_rng(3).gamma(2.0, size=10_000)
+    moments = Moments()
+    for chunk in np.array_split(values, 9):
+        moments.update(chunk)
+
+    assert moments.std == pytest.approx(np.std(values))
+    assert moments.skewness == pytest.approx(stats.skew(values))
+    assert moments.kurtosis == pytest.approx(stats.kurtosis(values))
@@ -0,0 +1,94 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.db.base import Base
+from app.models.analysis import Analysis, AnalysisStatus, AnalysisType
+from app.services.codec import (
+    compact_matrix,
+    decode,
+    encode,
+    expand_matrix,
+    expand_results,
+)
+from app.services.correlation import correlation_results
+
+
+@pytest.fixture
+def correlations():
+    rng = np.random.default_rng(3)
+    columns = [f"lab_{i}" for i in range(300)]
+    r = np.corrcoef(rng.normal(size=(300, 400)))
+    return columns, r, np.full_like(r, 0.5)
+
+
+def test_expanded_matrix_has_the_data_frame_shape():
+    values = np.array([[1.0, 0.25], [0.5, 1.0]])
+    matrix = compact_matrix(["hb", "crp"], values)
+
+    frame = pd.DataFrame(values, index=["hb", "crp"], columns=["hb", "crp"])
+    assert expand_matrix(matrix) == frame.to_dict()
+    assert expand_results({"items": [{"m": matrix, "n": 2}]}) == {
+        "items": [{"m": frame.to_dict(), "n": 2}]
+    }
+
+
+def test_large_results_are_compressed(correlations):
+    results = correlation_results(*correlations)
+
+    payload = encode(results)
+
+    assert payload[:1] == b"\x01"
+    assert decode(payload) == results
+    legacy = json.dumps(expand_results(results)).encode()
+    assert len(payload) < len(legacy) / 4
+    assert encode({"n": 3})[:1] == b"\x00"
+
+
+def test_float32_halves_float_storage(monkeypatch):
+    values = {"values": np.linspace(0, 1, 1000).tolist()}
+    monkeypatch.setattr(settings, "RESULTS_COMPRESS_MIN_BYTES", 10**9)
+    full = encode(values)
+    monkeypatch.setattr(settings, "RESULTS_FLOAT32", True)
+    single = encode(values)
+
+    assert len(single) < 0.6 * len(full)
+    np.testing.assert_allclose(decode(single)["values"], values["values"], rtol=1e-7)
+
+
+def test_unknown_payloads_are_rejected():
+    with pytest.raises(ValueError):
+        decode(b'{"r": 1}')
+    with pytest.raises(ValueError):
+        decode(b"\x01not zstd")
+
+
+def test_stored_results_are_encoded_and_legacy_json_is_read(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'results.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        for results in ({"matrix": compact_matrix(["a"], np.ones((1, 1)))}, None):
+            db.add(
+                Analysis(
+                    type=AnalysisType.CORRELATION,
+                    status=AnalysisStatus.COMPLETED,
+                    parameters={},
+                    results=results,
+                )
+            )
+        db.commit()
+        # A row written before results were encoded
+        db.execute(text("UPDATE analysis SET results = '{\"n\": 1}' WHERE id = 2"))
+        db.commit()
+
+        stored = db.execute(text("SELECT results FROM analysis WHERE id = 1")).scalar()
+        assert isinstance(stored, bytes)
+        assert db.get(Analysis, 1).results == {
+            "matrix": {"columns": ["a"], "values": [1.0]}
+        }
+        assert db.get(Analysis, 2).results == {"n": 1}
+    engine.dispose()
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+from app.services.contingency import (
+    SparseContingency,
+    association_matrix,
+    chi_square_results,
+    contingency_counts,
+)
+from app.services.groups import GroupCodes
+
+
+@pytest.fixture
+def survey():
+    rng = np.random.default_rng(6)
+    n = 1_000
+    df = pd.DataFrame(
+        {
+            "q1": rng.choice(["agree", "neutral", "disagree"], n),
+            "q2": rng.choice(["yes", "no"], n),
+            "respondent": [f"r{i}" for i in range(n)],
+        }
+    )
+    df["q3"] = np.where(rng.random(n) < 0.6, df["q1"], "neutral")
+    df.loc[::13, "q2"] = None
+    return df
+
+
+def test_contingency_counts_match_crosstab(survey):
+    table = contingency_counts(GroupCodes(survey["q1"]), GroupCodes(survey["q2"]))
+
+    expected = pd.crosstab(survey["q1"], survey["q2"])
+    np.testing.assert_array_equal(table, expected.to_numpy())
+
+
+def test_association_matrix_tests_every_pair(survey):
+    result = association_matrix(
+        survey, ["q1", "q2", "q3", "respondent"], max_cells=1_000
+    )
+
+    assert [(p["variable1"], p["variable2"]) for p in result["pairs"]] == [
+        ("q1", "q2"),
+        ("q1", "q3"),
+        ("q2", "q3"),
+    ]
+    assert len(result["skipped_pairs"]) == 3
+    for pair in result["pairs"]:
+        chi2, p_value, dof, _ = stats.chi2_contingency(
+            pd.crosstab(survey[pair["variable1"]], survey[pair["variable2"]])
+        )
+        assert pair["chi_square_statistic"] == pytest.approx(chi2)
+        assert pair["p_value"] == pytest.approx(p_value)
+        assert pair["degrees_of_freedom"] == dof
+    assert result["cramers_v_matrix"]["q1"]["q3"] > 0.5
+    assert (
+        result["cramers_v_matrix"]["q3"]["q1"] == result["cramers_v_matrix"]["q1"]["q3"]
+    )
+    assert result["cramers_v_matrix"]["q1"]["respondent"] is None
+
+
+@pytest.fixture
+def referrals():
+    rng = np.random.default_rng(14)
+    n = 20_000
+    return pd.DataFrame(
+        {
+            "icd10": [f"K{code:03d}" for code in rng.zipf(1.5, n) % 900],
+            "physician": rng.integers(0, 150, n),
+        }
+    )
+
+
+def test_sparse_table_gives_exact_statistics(referrals):
+    table = SparseContingency.from_codes(
+        GroupCodes(referrals["icd10"]), GroupCodes(referrals["physician"])
+    )
+    crosstab = pd.crosstab(referrals["icd10"], referrals["physician"])
+    chi2, p_value, dof, _ = stats.chi2_contingency(crosstab)
+
+    assert table.shape == crosstab.shape
+    assert table.shape[0] * table.shape[1] > 10_000
+    result = table.test()
+    assert result["chi_square_statistic"] == pytest.approx(chi2)
+    assert result["p_value"] == pytest.approx(p_value)
+    assert result["degrees_of_freedom"] == dof
+
+
+def test_results_lump_rare_levels_and_page_the_table(referrals):
+    table = SparseContingency.from_codes(
+        GroupCodes(referrals["icd10"]), GroupCodes(referrals["physician"])
+    )
+
+    result = chi_square_results(
+        table, {"max_levels": 20, "table_offset": 10, "table_limit": 5}
+    )
+
+    page = result["table_page"]
+    assert (page["total_rows"], page["total_columns"]) == (20, 20)
+    assert page["truncated"]
+    assert result["degrees_of_freedom"] == 19 * 19
+    rows = {row for column in result["contingency_table"].values() for row in column}
+    assert rows <= set(table.lump_rare_levels(20).row_labels[10:15])
+    assert "other" in table.lump_rare_levels(20).row_labels
+
+
+def test_lumped_levels_never_share_the_other_label():
+    codes = ["other"] * 5 + ["other (2)"] * 4 + ["a"] * 3 + ["b", "c"]
+    table = SparseContingency.from_codes(
+        GroupCodes(pd.Series(codes)), GroupCodes(pd.Series(["x", "y"] * 7))
+    )
+
+    lumped = table.lump_rare_levels(4)
+    page = lumped.page(0, None)["contingency_table"]
+
+    assert lumped.row_labels == ["a", "other", "other (2)", "other (3)"]
+    assert page["x"]["other"] + page["y"]["other"] == 5
+    assert page["x"]["other (3)"] + page["y"]["other (3)"] == 2
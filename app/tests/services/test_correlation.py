@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+from app.services.codec import expand_matrix
+from app.services.correlation import (
+    PairwiseMoments,
+    correlation_matrix,
+    correlation_results,
+    pairwise_correlation,
+    rank_columns,
+)
+
+
+@pytest.fixture
+def sparse_labs():
+    rng = np.random.default_rng(11)
+    df = pd.DataFrame(rng.normal(size=(300, 4)), columns=["hb", "crp", "wbc", "plt"])
+    df["crp"] += 0.5 * df["hb"]
+    return df.mask(rng.random(df.shape) < 0.2)
+
+
+def test_matches_pandas_pairwise_complete_correlation(sparse_labs):
+    r, n, _ = pairwise_correlation(sparse_labs.to_numpy())
+
+    np.testing.assert_allclose(r, sparse_labs.corr().to_numpy(), rtol=1e-12)
+    assert n[0, 1] == len(sparse_labs[["hb", "crp"]].dropna())
+
+
+def test_p_values_match_pearsonr_on_pairwise_complete_rows(sparse_labs):
+    _, _, p_values = pairwise_correlation(sparse_labs.to_numpy())
+
+    for i in range(4):
+        for j in range(i + 1, 4):
+            complete = sparse_labs.iloc[:, [i, j]].dropna()
+            expected = stats.pearsonr(complete.iloc[:, 0], complete.iloc[:, 1])[1]
+            assert p_values[i, j] == pytest.approx(expected, rel=1e-9)
+            assert p_values[j, i] == p_values[i, j]
+
+
+def test_significant_pairs_come_from_upper_triangle(sparse_labs):
+    columns = list(sparse_labs.columns)
+    r, _, p_values = pairwise_correlation(sparse_labs.to_numpy())
+
+    result = correlation_results(columns, r, p_values)
+
+    pairs = [
+        (s["variable1"], s["variable2"]) for s in result["significant_correlations"]
+    ]
+    assert ("hb", "crp") in pairs
+    assert all(columns.index(a) < columns.index(b) for a, b in pairs)
+    assert expand_matrix(result["p_values"])["hb"]["hb"] == 0.0
+
+
+def test_blocks_accumulate_to_the_single_pass_result(sparse_labs):
+    values = sparse_labs.to_numpy()
+    moments = PairwiseMoments(values.shape[1])
+    for start in range(0, len(values), 70):
+        moments.update(values[start : start + 70])
+
+    r, n = moments.correlation()
+
+    np.testing.assert_allclose(r, pairwise_correlation(values)[0], rtol=1e-10)
+    assert n[2, 3] == pairwise_correlation(values)[1][2, 3]
+
+
+def test_spearman_matches_scipy_without_missing_values():
+    rng = np.random.default_rng(5)
+    values = np.column_stack(
+        [rng.lognormal(size=200), rng.integers(0, 5, 200), rng.normal(size=200)]
+    )
+    values[:, 1] += values[:, 0]
+
+    rho, _, p_values = correlation_matrix(values, "spearman")
+
+    expected = stats.spearmanr(values)
+    np.testing.assert_allclose(rho, expected.statistic, rtol=1e-10)
+    np.testing.assert_allclose(p_values[0, 1], expected.pvalue[0, 1], rtol=1e-8)
+
+
+def test_kendall_matches_scipy_on_complete_pairs(sparse_labs):
+    tau, n, p_values = correlation_matrix(sparse_labs.to_numpy(), "kendall")
+
+    complete = sparse_labs[["hb", "crp"]].dropna()
+    expected = stats.kendalltau(complete["hb"], complete["crp"])
+    assert tau[0, 1] == pytest.approx(expected.statistic)
+    assert p_values[1, 0] == pytest.approx(expected.pvalue)
+    assert n[0, 1] == len(complete)
+
+
+def test_kendall_matches_scipy_with_ties_and_small_pairs():
+    rng = np.random.default_rng(8)
+    values = rng.normal(size=(500, 6))
+    values[:, :2] = rng.integers(0, 4, size=(500, 2))
+    values[:, 3] = 1.0
+    values[rng.random(values.shape) < 0.1] = np.nan
+    # Few rows in common, where scipy computes the p-value exactly
+    values[20:, 4] = np.nan
+
+    tau, _, p_values = correlation_matrix(values, "kendall")
+
+    for i in range(6):
+        for j in range(i + 1, 6):
+            both = ~np.isnan(values[:, i]) & ~np.isnan(values[:, j])
+            expected = stats.kendalltau(values[both, i], values[both, j])
+            np.testing.assert_allclose(tau[i, j], expected.statistic, rtol=1e-12)
+            np.testing.assert_allclose(p_values[j, i], expected.pvalue, rtol=1e-9)
+
+
+def test_unknown_method_is_rejected(sparse_labs):
+    with pytest.raises(ValueError):
+        correlation_matrix(sparse_labs.to_numpy(), "distance")
+
+
+def test_rank_columns_average_ties_and_keep_nan():
+    rng = np.random.default_rng(4)
+    values = rng.integers(0, 6, size=(200, 20)).astype(float)
+    values[::5, 3] = np.nan
+
+    expected = pd.DataFrame(values).rank(method="average").to_numpy()
+    np.testing.assert_array_equal(rank_columns(values), expected)
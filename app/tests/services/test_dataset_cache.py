@@ -0,0 +1,74 @@
+import os
+import pandas as pd
+from app.services.dataset_cache import DatasetCache
+from app.services.dataset_io import write_parquet
+
+
+def make_dataset(tmp_path, name="data.parquet", rows=100):
+    df = pd.DataFrame(
+        {"a": range(rows), "b": [float(i) for i in range(rows)], "c": ["x"] * rows}
+    )
+    return write_parquet(df, str(tmp_path / name))
+
+
+def test_second_load_is_a_hit(tmp_path):
+    cache = DatasetCache(max_bytes=10**8)
+    path = make_dataset(tmp_path)
+
+    cache.get(path)
+    df = cache.get(path, columns=["a", "c"])
+
+    assert list(df.columns) == ["a", "c"]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_projection_loads_only_missing_columns(tmp_path):
+    cache = DatasetCache(max_bytes=10**8)
+    path = make_dataset(tmp_path)
+
+    cache.get(path, columns=["a"])
+    df = cache.get(path, columns=["a", "b"])
+
+    assert list(df.columns) == ["a", "b"]
+    assert cache.get(path, columns=["b"])["b"].sum() == sum(range(100))
+    assert cache.stats()["hits"] == 1
+
+
+def test_changed_file_is_reloaded(tmp_path):
+    cache = DatasetCache(max_bytes=10**8)
+    path = make_dataset(tmp_path, rows=10)
+    cache.get(path)
+
+    write_parquet(pd.DataFrame({"a": [1], "b": [1.0], "c": ["y"]}), path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert len(cache.get(path)) == 1
+
+
+def test_lru_eviction_respects_byte_budget(tmp_path):
+    first = make_dataset(tmp_path, "first.parquet")
+    second = make_dataset(tmp_path, "second.parquet")
+    probe = DatasetCache(max_bytes=10**8)
+    probe.get(first)
+    cache = DatasetCache(max_bytes=int(probe.stats()["bytes"] * 1.5))
+
+    cache.get(first)
+    cache.get(second)
+
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["evictions"] == 1
+    assert stats["bytes"] <= stats["max_bytes"]
+
+
+def test_invalidate_drops_entry(tmp_path):
+    cache = DatasetCache(max_bytes=10**8)
+    path = make_dataset(tmp_path)
+    cache.get(path)
+
+    cache.invalidate(path)
+
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["invalidations"] == 1
@@ -0,0 +1,46 @@
+import pandas as pd
+from app.services.dataset_io import (
+    convert_to_parquet,
+    load_dataset,
+    normalize_dtypes,
+    numeric_columns,
+)
+
+
+def test_convert_to_parquet_keeps_values(tmp_path):
+    source = tmp_path / "patients.csv"
+    pd.DataFrame(
+        {"age": [25, 30, 35], "weight": [70.5, 75.0, None], "gender": ["M", "F", "M"]}
+    ).to_csv(source, index=False)
+
+    parquet_path = convert_to_parquet(str(source))
+    df = load_dataset(parquet_path)
+
+    assert parquet_path.endswith(".parquet")
+    assert df["age"].tolist() == [25, 30, 35]
+    assert df["weight"].isna().sum() == 1
+    assert df["gender"].tolist() == ["M", "F", "M"]
+
+
+def test_load_dataset_projects_columns(tmp_path):
+    source = tmp_path / "patients.csv"
+    pd.DataFrame({"a": [1, 2], "b": [3, 4], "c": ["x", "y"]}).to_csv(
+        source, index=False
+    )
+
+    df = load_dataset(convert_to_parquet(str(source)), columns=["c", "a"])
+
+    assert list(df.columns) == ["c", "a"]
+
+
+def test_normalize_dtypes_stringifies_mixed_columns():
+    df = normalize_dtypes(pd.DataFrame({1: [1, "two", None]}))
+
+    assert list(df.columns) == ["1"]
+    assert df["1"].tolist()[:2] == ["1", "two"]
+
+
+def test_numeric_columns_skips_text_and_bool():
+    column_info = {"age": "int64", "bmi": "float64", "name": "object", "flag": "bool"}
+
+    assert numeric_columns(column_info) == ["age", "bmi"]
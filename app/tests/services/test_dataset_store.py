@@ -0,0 +1,107 @@
+import io
+import os
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db.base import Base, Dataset, DatasetBlob, User
+from app.services.dataset_io import load_dataset, write_parquet
+from app.services.dataset_store import DatasetStore
+from app.services.ingest import RowLimitExceeded
+
+CSV = pd.DataFrame({"age": [34, 51, 47], "sbp": [120.0, 135.5, None]}).to_csv(
+    index=False
+)
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'store.db'}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        session.add(User(email="a@example.com", hashed_password="x"))
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def _upload(db, store, filename, content=CSV, row_limit=100):
+    stored = store.store_upload(db, io.BytesIO(content.encode()), filename, row_limit)
+    dataset = Dataset(
+        name=filename,
+        file_path=stored.file_path,
+        row_count=stored.row_count,
+        column_info=stored.column_info,
+        column_stats=stored.column_stats,
+        content_hash=stored.content_hash,
+        user_id=1,
+    )
+    db.add(dataset)
+    db.commit()
+    return stored, dataset
+
+
+def test_identical_uploads_share_one_stored_file(db, tmp_path):
+    store = DatasetStore(str(tmp_path / "datasets"))
+
+    first, _ = _upload(db, store, "export.csv")
+    second, _ = _upload(db, store, "export (1).csv")
+    other, _ = _upload(db, store, "other.csv", CSV + "60,141.0\n")
+
+    assert not first.deduplicated and second.deduplicated
+    assert second.file_path == first.file_path != other.file_path
+    assert second.column_info == first.column_info == {
+        "age": "int64",
+        "sbp": "float64",
+    }
+    assert second.column_stats == first.column_stats
+    assert db.get(DatasetBlob, first.content_hash).ref_count == 2
+    assert load_dataset(first.file_path)["age"].tolist() == [34, 51, 47]
+    assert os.listdir(tmp_path / "datasets" / "incoming") == []
+
+
+def test_last_release_deletes_the_stored_files(db, tmp_path):
+    store = DatasetStore(str(tmp_path / "datasets"))
+    stored, first = _upload(db, store, "export.csv")
+    _, second = _upload(db, store, "copy.csv")
+    blob = db.get(DatasetBlob, stored.content_hash)
+    source_path = blob.source_path
+
+    assert not store.release(db, first)
+    db.delete(first)
+    db.commit()
+    assert os.path.exists(stored.file_path)
+
+    assert store.release(db, second)
+    db.delete(second)
+    db.commit()
+    assert not os.path.exists(stored.file_path)
+    assert not os.path.exists(source_path)
+    assert db.get(DatasetBlob, stored.content_hash) is None
+
+    # Uploading the contents again stores them afresh
+    again, _ = _upload(db, store, "export.csv")
+    assert not again.deduplicated
+    assert os.path.exists(again.file_path)
+
+
+def test_duplicates_are_held_to_the_row_limit(db, tmp_path):
+    store = DatasetStore(str(tmp_path / "datasets"))
+    _upload(db, store, "export.csv")
+
+    with pytest.raises(RowLimitExceeded):
+        _upload(db, store, "copy.csv", row_limit=2)
+
+
+def test_datasets_stored_by_path_are_deleted_with_their_files(db, tmp_path):
+    store = DatasetStore(str(tmp_path / "datasets"))
+    source = tmp_path / "trial.csv"
+    source.write_text(CSV)
+    parquet = write_parquet(pd.read_csv(source), str(tmp_path / "trial.parquet"))
+    dataset = Dataset(name="trial", file_path=parquet, user_id=1)
+    db.add(dataset)
+    db.commit()
+
+    assert store.release(db, dataset)
+    assert not os.path.exists(parquet)
+    assert not source.exists()
@@ -0,0 +1,69 @@
+import asyncio
+import time
+import pandas as pd
+import pytest
+from app.services.analysis import execute_analysis
+from app.services.dataset_io import write_parquet
+from app.services.executor import AnalysisExecutor
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+    return seconds
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    df = pd.DataFrame(
+        {"age": [34, 51, 47, 62, 29], "bmi": [22.1, 27.4, 30.2, 25.0, 21.7]}
+    )
+    return write_parquet(df, str(tmp_path / "cohort.parquet"))
+
+
+def test_process_executor_runs_analysis_from_file_reference(dataset):
+    executor = AnalysisExecutor("process", 1)
+    try:
+        results = asyncio.run(
+            executor.run(
+                execute_analysis,
+                1,
+                dataset,
+                "correlation",
+                {"columns": ["age", "bmi"]},
+                {"age": "int64", "bmi": "float64"},
+                None,
+            )
+        )
+    finally:
+        executor.shutdown()
+
+    assert results["method"] == "pearson"
+    assert executor.stats()["completed"] == 1
+
+
+def test_event_loop_stays_responsive_while_work_runs():
+    executor = AnalysisExecutor("process", 1)
+
+    async def main():
+        job = asyncio.ensure_future(executor.run(_busy, 1.0))
+        ticks = 0
+        while not job.done():
+            await asyncio.sleep(0.01)
+            ticks += 1
+        return await job, ticks
+
+    try:
+        result, ticks = asyncio.run(main())
+    finally:
+        executor.shutdown()
+
+    assert result == 1.0
+    # The loop kept ticking while the worker was busy
+    assert ticks > 20
+
+
+def test_rejects_unknown_executor_kind():
+    with pytest.raises(ValueError):
+        AnalysisExecutor("fiber", 1)
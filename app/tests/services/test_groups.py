@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+from app.services.groups import GroupCodes, GroupedColumns
+
+
+def test_statistics_match_groupby():
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame(
+        {
+            "ward": rng.choice(["ICU", "ER", "Ward 3", None], 2_000),
+            "los": rng.exponential(5, 2_000),
+        }
+    )
+    df.loc[::7, "los"] = np.nan
+
+    partition = GroupCodes(df["ward"]).partition(df["los"].to_numpy())
+
+    expected = df.groupby("ward")["los"].agg(
+        ["count", "mean", "std", "min", "max", "median"]
+    )
+    pd.testing.assert_frame_equal(
+        partition.statistics(), expected, check_dtype=False, check_names=False
+    )
+
+
+def test_partition_splits_values_by_sorted_label():
+    groups = GroupCodes(pd.Series(["b", "a", "b", "c", "a"]))
+
+    parts = groups.partition(np.array([1.0, 2.0, np.nan, 4.0, 5.0])).group_values()
+
+    assert groups.labels == ["a", "b", "c"]
+    assert [part.tolist() for part in parts] == [[2.0, 5.0], [1.0], [4.0]]
+
+
+def _grouped_frame(n_groups):
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame(rng.normal(size=(1_500, 3)).round(1), columns=["a", "b", "c"])
+    df.loc[::9, "b"] = np.nan
+    df["arm"] = rng.choice([f"arm {i}" for i in range(n_groups)] + [None], 1_500)
+    groups = GroupCodes(df["arm"])
+    return df, groups, GroupedColumns(groups, df[["a", "b", "c"]].to_numpy())
+
+
+def _group_data(df, groups, column):
+    return groups.partition(df[column].to_numpy()).group_values()
+
+
+def test_grouped_columns_match_two_group_tests():
+    df, groups, grouped = _grouped_frame(2)
+    t_test = grouped.t_test()
+    mann_whitney = grouped.mann_whitney()
+
+    for i, column in enumerate(["a", "b", "c"]):
+        data = _group_data(df, groups, column)
+        expected = stats.ttest_ind(*data)
+        assert t_test["statistic"][i] == pytest.approx(expected.statistic)
+        assert t_test["p_value"][i] == pytest.approx(expected.pvalue)
+        expected = stats.mannwhitneyu(*data, method="asymptotic")
+        assert mann_whitney["statistic"][i] == pytest.approx(expected.statistic)
+        assert mann_whitney["p_value"][i] == pytest.approx(expected.pvalue)
+
+
+def test_grouped_columns_match_multi_group_tests():
+    df, groups, grouped = _grouped_frame(4)
+    anova = grouped.anova()
+    kruskal = grouped.kruskal()
+    statistics = grouped.statistics()
+
+    for i, column in enumerate(["a", "b", "c"]):
+        data = _group_data(df, groups, column)
+        expected = stats.f_oneway(*data)
+        assert anova["statistic"][i] == pytest.approx(expected.statistic)
+        assert anova["p_value"][i] == pytest.approx(expected.pvalue)
+        expected = stats.kruskal(*data)
+        assert kruskal["statistic"][i] == pytest.approx(expected.statistic)
+        assert kruskal["p_value"][i] == pytest.approx(expected.pvalue)
+
+        partition_stats = groups.partition(df[column].to_numpy()).statistics()
+        for name, values in statistics.items():
+            np.testing.assert_allclose(values[:, i], partition_stats[name])
@@ -0,0 +1,88 @@
+import hashlib
+import io
+import os
+import pandas as pd
+import pytest
+from app.services import ingest
+from app.services.dataset_io import load_dataset
+from app.services.ingest import RowLimitExceeded, ingest_upload, merge_dtypes
+
+
+def csv_upload(df):
+    return io.BytesIO(df.to_csv(index=False).encode())
+
+
+def test_ingest_profiles_and_copies_csv(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "CSV_CHUNK_ROWS", 3)
+    df = pd.DataFrame(
+        {
+            "age": [25, 30, 35, 40, 45, 50, 55],
+            "weight": [70, 75, 80, 85, 90, 95, None],
+            "gender": ["M", "F", "M", "F", "M", "F", None],
+        }
+    )
+    upload = csv_upload(df)
+    file_path = str(tmp_path / "patients.csv")
+
+    result = ingest_upload(upload, file_path, row_limit=100)
+
+    assert open(file_path, "rb").read() == upload.getvalue()
+    assert result.content_hash == hashlib.sha256(upload.getvalue()).hexdigest()
+    assert result.profile.row_count == 7
+    assert result.profile.column_info == {
+        "age": "int64",
+        "weight": "float64",
+        "gender": "object",
+    }
+    assert result.column_stats["weight"]["null_count"] == 1
+    assert result.column_stats["weight"]["max"] == 95
+    assert result.column_stats["gender"]["distinct_estimate"] == 2
+    assert load_dataset(result.parquet_path)["weight"].tolist()[:6] == [
+        70,
+        75,
+        80,
+        85,
+        90,
+        95,
+    ]
+
+
+def test_columns_empty_for_whole_chunks_widen(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "CSV_CHUNK_ROWS", 3)
+    # b and flag are empty from the second chunk on, c for the whole first
+    rows = [
+        f"{i},{i if i < 3 else ''},{i if i >= 3 else ''},{i % 2 == 0 if i < 3 else ''}"
+        for i in range(7)
+    ]
+    upload = io.BytesIO("\n".join(["a,b,c,flag", *rows]).encode())
+
+    result = ingest_upload(upload, str(tmp_path / "labs.csv"), row_limit=100)
+
+    assert result.profile.column_info == {
+        "a": "int64",
+        "b": "float64",
+        "c": "float64",
+        "flag": "object",
+    }
+    loaded = load_dataset(result.parquet_path)
+    assert loaded["b"].isna().sum() == 4
+    assert loaded["flag"].tolist()[:3] == ["True", "False", "True"]
+    assert loaded["c"].tolist()[3:] == [3.0, 4.0, 5.0, 6.0]
+
+
+def test_ingest_stops_at_row_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "CSV_CHUNK_ROWS", 10)
+    upload = csv_upload(pd.DataFrame({"x": range(500_000)}))
+    file_path = str(tmp_path / "big.csv")
+
+    with pytest.raises(RowLimitExceeded):
+        ingest_upload(upload, file_path, row_limit=15)
+
+    assert upload.tell() < len(upload.getvalue())
+    assert os.listdir(tmp_path) == []
+
+
+def test_merge_dtypes_widens_like_a_single_parse():
+    assert merge_dtypes("int64", pd.Series([1.5]).dtype) == "float64"
+    assert merge_dtypes("float64", pd.Series(["a"], dtype=object).dtype) == "object"
+    assert merge_dtypes("bool", pd.Series([1]).dtype) == "object"
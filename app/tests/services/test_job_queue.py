@@ -0,0 +1,352 @@
+import asyncio
+from contextlib import contextmanager
+from datetime import timedelta
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.db.base import Base, Dataset, User
+from app.models.analysis import Analysis, AnalysisStatus, AnalysisType
+from app.services import dataset_io
+from app.services.dataset_io import write_parquet
+from app.services.executor import AnalysisExecutor
+from app.services.job_queue import JobQueue, utcnow
+from app.services.object_storage import StorageError
+from app.worker import AnalysisWorker
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'queue.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def dataset_id(session_factory, tmp_path):
+    df = pd.DataFrame(
+        {"age": [34, 51, 47, 62, 29], "bmi": [22.1, 27.4, 30.2, 25.0, 21.7]}
+    )
+    path = write_parquet(df, str(tmp_path / "cohort.parquet"))
+    with session_factory() as db:
+        user = User(email="a@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        dataset = Dataset(
+            name="cohort",
+            file_path=path,
+            column_info={"age": "int64", "bmi": "float64"},
+            user_id=user.id,
+        )
+        db.add(dataset)
+        db.commit()
+        return dataset.id
+
+
+def _enqueue(session_factory, dataset_id, parameters=None, user_id=1, cache_key=None):
+    with session_factory() as db:
+        analysis = Analysis(
+            type=AnalysisType.CORRELATION,
+            status=AnalysisStatus.PENDING,
+            parameters=parameters or {"columns": ["age", "bmi"]},
+            cache_key=cache_key,
+            dataset_id=dataset_id,
+            user_id=user_id,
+        )
+        db.add(analysis)
+        db.commit()
+        return analysis.id
+
+
+def _load(session_factory, job_id):
+    with session_factory() as db:
+        return db.get(Analysis, job_id)
+
+
+def _add_user(session_factory, email, tier):
+    with session_factory() as db:
+        user = User(email=email, hashed_password="x", subscription_tier=tier)
+        db.add(user)
+        db.commit()
+        return user.id
+
+
+@pytest.fixture
+def unlimited(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_USER_MAX_RUNNING", {})
+    monkeypatch.setattr(settings, "JOB_TIER_MAX_RUNNING", {})
+
+
+def test_each_job_is_claimed_once(session_factory, dataset_id, unlimited):
+    jobs = [_enqueue(session_factory, dataset_id) for _ in range(3)]
+    queue = JobQueue(session_factory)
+
+    first = queue.claim("a", limit=2)
+    second = queue.claim("b", limit=2)
+
+    assert first == jobs[:2]
+    assert second == jobs[2:]
+    assert queue.claim("c") == []
+    analysis = _load(session_factory, jobs[0])
+    assert analysis.status == AnalysisStatus.PROCESSING
+    assert analysis.claimed_by == "a"
+    assert analysis.attempts == 1
+
+
+def test_failures_retry_with_backoff_until_attempts_run_out(
+    session_factory, dataset_id, monkeypatch
+):
+    monkeypatch.setattr(settings, "JOB_MAX_ATTEMPTS", 2)
+    job = _enqueue(session_factory, dataset_id)
+    queue = JobQueue(session_factory)
+
+    queue.claim("a")
+    queue.fail("a", job, "connection reset")
+    analysis = _load(session_factory, job)
+    assert analysis.status == AnalysisStatus.PENDING
+    # Not runnable until the backoff has passed
+    assert queue.claim("a") == []
+
+    with session_factory() as db:
+        db.get(Analysis, job).available_at = utcnow() - timedelta(seconds=1)
+        db.commit()
+    assert queue.claim("a") == [job]
+    queue.fail("a", job, "connection reset")
+    assert _load(session_factory, job).status == AnalysisStatus.FAILED
+
+
+def test_invalid_input_fails_without_retry(session_factory, dataset_id):
+    job = _enqueue(session_factory, dataset_id)
+    queue = JobQueue(session_factory)
+    queue.claim("a")
+    queue.fail("a", job, "Column not found", retryable=False)
+
+    analysis = _load(session_factory, job)
+    assert analysis.status == AnalysisStatus.FAILED
+    assert analysis.error_message == "Column not found"
+
+
+def test_reaper_requeues_jobs_without_heartbeat(session_factory, dataset_id, unlimited):
+    stale, fresh = (_enqueue(session_factory, dataset_id) for _ in range(2))
+    queue = JobQueue(session_factory)
+    queue.claim("dead", limit=1)
+    queue.claim("alive", limit=1)
+    with session_factory() as db:
+        db.get(Analysis, stale).heartbeat_at = utcnow() - timedelta(minutes=10)
+        db.commit()
+
+    assert queue.reap(stale_after=60) == 1
+    assert _load(session_factory, stale).status == AnalysisStatus.PENDING
+    assert _load(session_factory, fresh).status == AnalysisStatus.PROCESSING
+    # The dead worker's late result is discarded
+    assert not queue.complete("dead", stale, {"method": "pearson"})
+
+
+def test_claims_are_shared_between_users(session_factory, dataset_id, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_USER_MAX_RUNNING", {"free": 1, "premium": 2})
+    premium = _add_user(session_factory, "b@example.com", "premium")
+    flood = [_enqueue(session_factory, dataset_id) for _ in range(5)]
+    urgent = [_enqueue(session_factory, dataset_id, user_id=premium) for _ in range(3)]
+    queue = JobQueue(session_factory)
+
+    claimed = queue.claim("a", limit=4)
+
+    assert claimed == [urgent[0], flood[0], urgent[1]]
+    stats = queue.stats()
+    assert stats["tiers"]["free"] == {"pending": 4, "processing": 1}
+    assert stats["tiers"]["premium"] == {"pending": 1, "processing": 2}
+    assert stats["wait_seconds"]["mean"] is not None
+
+
+def test_admission_rejects_full_queues_with_retry_after(
+    session_factory, dataset_id, monkeypatch
+):
+    monkeypatch.setattr(settings, "JOB_USER_MAX_PENDING", {"free": 2})
+    monkeypatch.setattr(settings, "JOB_USER_MAX_RUNNING", {"free": 1})
+    monkeypatch.setattr(settings, "JOB_RETRY_AFTER_SECONDS", 30.0)
+    queue = JobQueue(session_factory)
+
+    _enqueue(session_factory, dataset_id)
+    assert queue.admission(1, "free") is None
+    _enqueue(session_factory, dataset_id)
+    assert queue.admission(1, "free") == 30
+    # Other users are unaffected until the global limit is reached
+    assert queue.admission(2, "free") is None
+    monkeypatch.setattr(settings, "JOB_MAX_PENDING", 2)
+    assert queue.admission(2, "free") is not None
+
+
+def _follow(session_factory, dataset_id, leader):
+    with session_factory() as db:
+        key = db.get(Analysis, leader).cache_key
+    job = _enqueue(session_factory, dataset_id, cache_key=key)
+    with session_factory() as db:
+        db.get(Analysis, job).leader_id = leader
+        db.commit()
+    return job
+
+
+def test_followers_share_their_leaders_outcome(session_factory, dataset_id):
+    queue = JobQueue(session_factory)
+    leader = _enqueue(session_factory, dataset_id, cache_key="k")
+    assert queue.find_in_flight("k") == leader
+    follower = _follow(session_factory, dataset_id, leader)
+    assert queue.stats()["coalesced"] == 1
+
+    # Followers are never claimed themselves
+    assert queue.claim("a", limit=5) == [leader]
+    queue.complete("a", leader, {"method": "pearson"})
+
+    analysis = _load(session_factory, follower)
+    assert analysis.status == AnalysisStatus.COMPLETED
+    assert analysis.results == {"method": "pearson"}
+    assert analysis.leader_id is None
+    assert queue.find_in_flight("k") is None
+
+    leader = _enqueue(session_factory, dataset_id, cache_key="k")
+    follower = _follow(session_factory, dataset_id, leader)
+    queue.claim("a")
+    queue.fail("a", leader, "Column not found", retryable=False)
+    assert _load(session_factory, follower).status == AnalysisStatus.FAILED
+
+
+def test_identical_queued_jobs_run_once(session_factory, dataset_id, unlimited):
+    first, second = (_enqueue(session_factory, dataset_id, cache_key="k") for _ in "ab")
+    other = _enqueue(session_factory, dataset_id, cache_key="other")
+    queue = JobQueue(session_factory)
+
+    assert queue.claim("a", limit=1) == [first]
+    # The second copy attaches to the running one instead of starting
+    assert queue.claim("b", limit=5) == [other]
+    assert _load(session_factory, second).leader_id == first
+
+
+def test_running_duplicates_are_rejected_by_the_database(session_factory, dataset_id):
+    first, second = (_enqueue(session_factory, dataset_id, cache_key="k") for _ in "ab")
+    with session_factory() as db:
+        db.get(Analysis, first).status = AnalysisStatus.PROCESSING
+        db.commit()
+        db.get(Analysis, second).status = AnalysisStatus.PROCESSING
+        with pytest.raises(IntegrityError):
+            db.commit()
+
+
+def test_reaper_detaches_orphaned_followers(session_factory, dataset_id):
+    leader = _enqueue(session_factory, dataset_id, cache_key="k")
+    follower = _follow(session_factory, dataset_id, leader)
+    with session_factory() as db:
+        db.get(Analysis, leader).status = AnalysisStatus.COMPLETED
+        db.commit()
+
+    queue = JobQueue(session_factory)
+    queue.reap()
+    assert _load(session_factory, follower).leader_id is None
+    assert queue.claim("a") == [follower]
+
+
+def test_worker_runs_queued_analyses(
+    session_factory, dataset_id, monkeypatch, unlimited
+):
+    monkeypatch.setattr(settings, "JOB_POLL_INTERVAL_SECONDS", 0.01)
+    done = _enqueue(session_factory, dataset_id)
+    invalid = _enqueue(session_factory, dataset_id, {"columns": ["age", "missing"]})
+    queue = JobQueue(session_factory)
+    executor = AnalysisExecutor("thread", 2)
+    worker = AnalysisWorker(queue, executor, concurrency=2, worker_id="test")
+
+    async def main():
+        stop = asyncio.Event()
+        task = asyncio.create_task(worker.run(stop))
+        while queue.stats()["completed"] + queue.stats()["failed"] < 2:
+            await asyncio.sleep(0.01)
+        stop.set()
+        await task
+
+    try:
+        asyncio.run(asyncio.wait_for(main(), 30))
+    finally:
+        executor.shutdown()
+
+    assert _load(session_factory, done).status == AnalysisStatus.COMPLETED
+    assert _load(session_factory, done).results["method"] == "pearson"
+    assert _load(session_factory, invalid).status == AnalysisStatus.FAILED
+
+
+def test_worker_retries_storage_failures_but_not_invalid_config(
+    session_factory, dataset_id, monkeypatch, unlimited
+):
+    monkeypatch.setattr(settings, "JOB_POLL_INTERVAL_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "JOB_RETRY_BACKOFF_SECONDS", 3600)
+
+    @contextmanager
+    def unreachable(uri):
+        raise StorageError("Connection reset by peer")
+        yield
+
+    monkeypatch.setattr(dataset_io, "open_stored", unreachable)
+    transient = _enqueue(session_factory, dataset_id)
+    with session_factory() as db:
+        # A regression without its dependent variable
+        invalid = Analysis(
+            type=AnalysisType.REGRESSION,
+            status=AnalysisStatus.PENDING,
+            parameters={"independent_variable": "age"},
+            dataset_id=dataset_id,
+            user_id=1,
+        )
+        db.add(invalid)
+        db.commit()
+        invalid = invalid.id
+    queue = JobQueue(session_factory)
+    executor = AnalysisExecutor("thread", 2)
+    worker = AnalysisWorker(queue, executor, concurrency=2, worker_id="test")
+
+    async def main():
+        stop = asyncio.Event()
+        task = asyncio.create_task(worker.run(stop))
+        while any(
+            _load(session_factory, job_id).error_message is None
+            for job_id in (transient, invalid)
+        ):
+            await asyncio.sleep(0.01)
+        stop.set()
+        await task
+
+    try:
+        asyncio.run(asyncio.wait_for(main(), 30))
+    finally:
+        executor.shutdown()
+
+    retried = _load(session_factory, transient)
+    assert retried.status == AnalysisStatus.PENDING and retried.attempts == 1
+    assert "Connection reset" in retried.error_message
+    failed = _load(session_factory, invalid)
+    assert failed.status == AnalysisStatus.FAILED and failed.attempts == 1
+
+
+def test_worker_claims_again_as_soon_as_a_job_finishes(
+    session_factory, dataset_id, monkeypatch, unlimited
+):
+    monkeypatch.setattr(settings, "JOB_POLL_INTERVAL_SECONDS", 60)
+    jobs = [_enqueue(session_factory, dataset_id) for _ in range(3)]
+    queue = JobQueue(session_factory)
+    executor = AnalysisExecutor("thread", 1)
+    worker = AnalysisWorker(queue, executor, concurrency=1, worker_id="test")
+
+    async def main():
+        stop = asyncio.Event()
+        task = asyncio.create_task(worker.run(stop))
+        while queue.stats()["completed"] < len(jobs):
+            await asyncio.sleep(0.01)
+        stop.set()
+        await task
+
+    try:
+        # Far less than the poll interval
+        asyncio.run(asyncio.wait_for(main(), 10))
+    finally:
+        executor.shutdown()
@@ -0,0 +1,137 @@
+import io
+import os
+import boto3
+import numpy as np
+import pandas as pd
+import pytest
+from moto import mock_s3
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db.base import Base, Dataset, User
+from app.services import object_storage as storage_module
+from app.services.chunked import projected_size
+from app.services.dataset_io import load_dataset
+from app.services.dataset_store import DatasetStore
+from app.services.object_storage import BlockCache, ObjectStorage, S3Storage
+
+PART_BYTES = 5 * 1024 * 1024
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_s3():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="datasets")
+        yield client
+
+
+def _calls(client, operation):
+    """Parameters of every call to an S3 operation from now on."""
+    calls = []
+    client.meta.events.register(
+        f"provide-client-params.s3.{operation}",
+        lambda params, **kwargs: calls.append(dict(params)),
+    )
+    return calls
+
+
+def test_large_files_are_uploaded_in_parts(s3_client, tmp_path):
+    storage = S3Storage(s3_client, "datasets", "prefix/", part_size=PART_BYTES)
+    path = tmp_path / "upload.bin"
+    content = os.urandom(2 * PART_BYTES + 1024)
+    path.write_bytes(content)
+    parts = _calls(s3_client, "UploadPart")
+
+    uri = storage.put_file("blobs/ab/abc.bin", str(path))
+
+    assert uri == "s3://datasets/prefix/blobs/ab/abc.bin"
+    assert [call["PartNumber"] for call in parts] == [1, 2, 3]
+    stored = s3_client.get_object(Bucket="datasets", Key="prefix/blobs/ab/abc.bin")
+    assert stored["Body"].read() == content
+    assert s3_client.list_multipart_uploads(Bucket="datasets").get("Uploads") is None
+
+
+def test_column_loads_fetch_only_their_byte_ranges(s3_client, tmp_path, monkeypatch):
+    cache = BlockCache(str(tmp_path / "blocks"), 64 * 1024 * 1024)
+    storage = S3Storage(
+        s3_client, "datasets", part_size=PART_BYTES, block_size=64 * 1024, cache=cache
+    )
+    monkeypatch.setattr(storage_module, "object_storage", storage)
+    rng = np.random.default_rng(5)
+    frame = pd.DataFrame(rng.normal(size=(50_000, 20))).add_prefix("lab_")
+    engine = create_engine(f"sqlite:///{tmp_path / 'store.db'}")
+    Base.metadata.create_all(bind=engine)
+    store = DatasetStore(str(tmp_path / "datasets"), storage)
+
+    with sessionmaker(bind=engine)() as db:
+        db.add(User(email="a@example.com", hashed_password="x"))
+        stored = store.store_upload(
+            db, io.BytesIO(frame.to_csv(index=False).encode()), "labs.csv", 10**6
+        )
+        dataset = Dataset(
+            name="labs.csv",
+            file_path=stored.file_path,
+            row_count=stored.row_count,
+            column_info=stored.column_info,
+            content_hash=stored.content_hash,
+            user_id=1,
+        )
+        db.add(dataset)
+        db.commit()
+        bucket, key = storage_module.parse_object_uri(stored.file_path)
+        size = s3_client.head_object(Bucket=bucket, Key=key)["ContentLength"]
+        reads = _calls(s3_client, "GetObject")
+
+        loaded = load_dataset(stored.file_path, columns=["lab_3"])
+
+        pd.testing.assert_series_equal(loaded["lab_3"], frame["lab_3"])
+        fetched = len(reads) * storage.block_size
+        assert 0 < fetched < size / 5
+        # Blocks are then served from the disk cache
+        assert projected_size(stored.file_path, ["lab_3"]) > 0
+        load_dataset(stored.file_path, columns=["lab_3"])
+        assert len(reads) * storage.block_size == fetched
+        assert cache.stats()["entries"] == len(reads)
+
+        store.release(db, dataset)
+        db.delete(dataset)
+        db.commit()
+    engine.dispose()
+
+    assert s3_client.list_objects_v2(Bucket="datasets")["KeyCount"] == 0
+    assert cache.stats()["entries"] == 0
+    assert os.listdir(tmp_path / "datasets" / "incoming") == []
+
+
+def test_block_cache_evicts_least_recently_used(tmp_path):
+    cache = BlockCache(str(tmp_path), max_bytes=250)
+    for index in range(2):
+        cache.put("s3://b/k", index, 100, bytes([index]) * 100)
+    assert cache.get("s3://b/k", 0, 100) == bytes([0]) * 100
+
+    cache.put("s3://b/k", 2, 100, bytes([2]) * 100)
+
+    assert cache.get("s3://b/k", 1, 100) is None
+    assert cache.get("s3://b/k", 0, 100) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_block_cache_bound_is_shared_between_processes(tmp_path):
+    caches = [BlockCache(str(tmp_path), max_bytes=250) for _ in range(2)]
+    for index in range(4):
+        caches[index % 2].put("s3://b/k", index, 100, bytes([index]) * 100)
+
+    assert caches[0].stats()["bytes"] == caches[1].stats()["bytes"] == 200
+    assert caches[0].get("s3://b/k", 0, 100) is None
+    assert caches[0].get("s3://b/k", 3, 100) == bytes([3]) * 100
+
+
+def test_incomplete_backends_cannot_be_created():
+    class ReadOnlyStorage(ObjectStorage):
+        def uri(self, key):
+            return key
+
+    with pytest.raises(TypeError):
+        ReadOnlyStorage()
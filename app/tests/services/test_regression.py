@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+from app.services.regression import (
+    DesignMatrix,
+    LeastSquares,
+    UnivariateScreen,
+    screening_results,
+)
+
+
+@pytest.fixture
+def cohort():
+    rng = np.random.default_rng(8)
+    n = 500
+    df = pd.DataFrame(
+        {
+            "age": rng.normal(60, 10, n),
+            "bmi": rng.normal(27, 4, n),
+            "smoker": rng.choice(["current", "former", "never"], n),
+        }
+    )
+    df["sbp"] = (
+        90 + 0.6 * df["age"] + 0.8 * df["bmi"] + 5 * (df["smoker"] == "current")
+    ) + rng.normal(0, 8, n)
+    df.loc[::11, "bmi"] = np.nan
+    df.loc[::23, "smoker"] = None
+    return df
+
+
+def test_design_matrix_drops_incomplete_rows_and_codes_dummies(cohort):
+    design = DesignMatrix(cohort, "sbp", ["age", "bmi", "smoker"])
+
+    complete = cohort.dropna()
+    assert design.n == len(complete)
+    assert design.terms == ["age", "bmi", "smoker[former]", "smoker[never]"]
+    assert design.reference_levels == {"smoker": "current"}
+    np.testing.assert_array_equal(
+        design.X[:, 2], (complete["smoker"] == "former").to_numpy()
+    )
+
+
+def test_least_squares_matches_lstsq(cohort):
+    design = DesignMatrix(cohort, "sbp", ["age", "bmi", "smoker"])
+    X = np.column_stack([np.ones(design.n), design.X])
+    expected, *_ = np.linalg.lstsq(X, design.y, rcond=None)
+    residuals = design.y - X @ expected
+    mse = residuals @ residuals / (design.n - X.shape[1])
+    expected_se = np.sqrt(mse * np.diag(np.linalg.inv(X.T @ X)))
+
+    model = LeastSquares.fit(design.X, design.y, design.terms)
+    ss_total = np.sum((design.y - design.y.mean()) ** 2)
+    results = model.results(ss_total, residuals @ residuals, design.terms)
+
+    np.testing.assert_allclose(list(results["coefficients"].values()), expected)
+    np.testing.assert_allclose(list(results["standard_errors"].values()), expected_se)
+
+
+def test_least_squares_rejects_collinear_predictors():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=100)
+    X = np.column_stack([x, 2 * x + 1])
+
+    with pytest.raises(ValueError, match="collinear"):
+        LeastSquares.fit(X, rng.normal(size=100), ["x", "x2"])
+
+
+def test_screen_matches_linregress_per_predictor():
+    rng = np.random.default_rng(12)
+    X = rng.normal(100, 15, size=(400, 6))
+    y = 0.05 * X[:, 2] + rng.normal(size=400)
+    X[rng.random(X.shape) < 0.1] = np.nan
+    y[::17] = np.nan
+    names = [f"marker_{i}" for i in range(6)]
+
+    screen = UnivariateScreen(6)
+    # Two blocks, as a chunked read would feed them
+    screen.update(X[:150], y[:150])
+    screen.update(X[150:], y[150:])
+    fits = screen.results(names)
+
+    assert fits[0]["variable"] == "marker_2"
+    assert [fit["p_value"] for fit in fits] == sorted(fit["p_value"] for fit in fits)
+    for fit in fits:
+        j = names.index(fit["variable"])
+        complete = ~(np.isnan(X[:, j]) | np.isnan(y))
+        expected = stats.linregress(X[complete, j], y[complete])
+        assert fit["sample_size"] == complete.sum()
+        assert fit["slope"] == pytest.approx(expected.slope)
+        assert fit["standard_error"] == pytest.approx(expected.stderr)
+        assert fit["p_value"] == pytest.approx(expected.pvalue)
+        assert fit["r_squared"] == pytest.approx(expected.rvalue**2)
+
+    filtered = screening_results("y", fits, fdr_alpha=0.05)
+    assert filtered["predictors_screened"] == 6
+    assert [fit["variable"] for fit in filtered["results"]] == ["marker_2"]
@@ -0,0 +1,76 @@
+import threading
+import numpy as np
+import pandas as pd
+import pytest
+from app.core.config import settings
+from app.services.groups import GroupCodes
+from app.services.resampling import (
+    comparative_resampling,
+    group_bootstrap_block,
+    resample,
+    shutdown_executor,
+)
+
+
+@pytest.fixture
+def trial():
+    rng = np.random.default_rng(15)
+    groups = pd.Series(rng.choice(["placebo", "drug"], 200))
+    values = rng.lognormal(1.0, 0.8, 200) + (groups == "drug").to_numpy() * 1.5
+    return GroupCodes(groups).partition(values)
+
+
+def test_resample_is_reproducible_across_workers(trial, monkeypatch):
+    data = (trial.values, trial.offsets)
+    monkeypatch.setattr(settings, "RESAMPLING_BLOCK_SIZE", 100)
+
+    monkeypatch.setattr(settings, "RESAMPLING_WORKERS", 0)
+    inline = resample(group_bootstrap_block, data, 450, seed=3, width=200)
+    monkeypatch.setattr(settings, "RESAMPLING_WORKERS", 2)
+    pooled = resample(group_bootstrap_block, data, 450, seed=3, width=200)
+
+    assert inline.shape == (450, 2)
+    np.testing.assert_array_equal(inline, pooled)
+
+
+def test_resample_blocks_run_in_threads_until_shutdown(trial, monkeypatch):
+    threads = set()
+
+    def record_block(rng, size, values):
+        threads.add(threading.current_thread().name)
+        return rng.random((size, 1))
+
+    monkeypatch.setattr(settings, "RESAMPLING_BLOCK_SIZE", 10)
+    monkeypatch.setattr(settings, "RESAMPLING_WORKERS", 2)
+    resample(record_block, (trial.values,), 40, seed=0, width=200)
+    shutdown_executor()
+
+    assert threads and all(name.startswith("resampling") for name in threads)
+    assert not any(
+        thread.name.startswith("resampling") for thread in threading.enumerate()
+    )
+
+
+def test_resample_bounds_block_memory(trial, monkeypatch):
+    sizes = []
+
+    def record_block(rng, size, values):
+        sizes.append(size)
+        return rng.random((size, 1))
+
+    monkeypatch.setattr(settings, "RESAMPLING_BLOCK_ELEMENTS", 1_000)
+    resample(record_block, (trial.values,), 30, seed=0, width=200)
+
+    assert sizes == [5] * 6
+
+
+def test_comparative_resampling_reports_intervals_and_p_values(trial):
+    result = comparative_resampling(trial, {"iterations": 1000, "seed": 1})
+
+    difference = result["statistics"]["mean_difference"]
+    assert result["seed"] == 1
+    # Groups sort as drug, placebo; the drug arm is shifted up by 1.5
+    assert difference["ci_lower"] < difference["estimate"] < difference["ci_upper"]
+    assert difference["ci_lower"] > 0
+    assert difference["permutation_p_value"] < 0.05
+    assert comparative_resampling(trial, {"iterations": 1000, "seed": 1}) == result
@@ -0,0 +1,40 @@
+from app.services.scheduler import FairScheduler, retry_after_seconds
+
+
+def _scheduler():
+    return FairScheduler(
+        weights={"free": 1.0, "premium": 4.0},
+        tier_max_running={"free": 3, "premium": 8},
+        user_max_running={"free": 2, "premium": 4},
+    )
+
+
+def test_flooding_user_does_not_starve_others():
+    # User 1 queued first and many times; user 2 gets a slot in the first round
+    candidates = [(i, 1, "free") for i in range(1, 101)] + [(101, 2, "free")]
+    selected = _scheduler().select(candidates, {}, {}, limit=2)
+    assert selected == [1, 101]
+
+
+def test_premium_wins_ties_and_gets_weighted_share():
+    candidates = [(i, 1, "free") for i in range(1, 5)] + [
+        (i, 2, "premium") for i in range(5, 9)
+    ]
+    selected = _scheduler().select(candidates, {}, {}, limit=5)
+    # Premium goes first, and with four times the weight runs up to its
+    # cap before the free user gets a second slot
+    assert selected == [5, 1, 6, 7, 8]
+
+
+def test_running_caps_are_respected():
+    candidates = [(1, 1, "free"), (2, 2, "free"), (3, 3, "premium")]
+    selected = _scheduler().select(
+        candidates, running_by_user={1: 2}, running_by_tier={"free": 2}, limit=3
+    )
+    # User 1 is at its cap and the free tier has one slot left
+    assert selected == [3, 2]
+
+
+def test_retry_after_scales_with_excess_and_slots():
+    assert retry_after_seconds(4, 2, 10.0) == 20
+    assert retry_after_seconds(1, 4, 0.5) == 1
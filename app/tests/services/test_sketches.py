@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.services.sketches import ColumnSketch, HyperLogLog, KLLSketch
+
+
+@pytest.fixture
+def values():
+    return pd.Series(np.random.default_rng(42).lognormal(3, 0.5, 100_000))
+
+
+def test_small_column_matches_describe():
+    series = pd.Series([25, 30, None, 40, 45], dtype=float)
+    sketch = ColumnSketch(numeric=True, value_range=(25, 45))
+    sketch.update(series)
+
+    result = sketch.describe()
+    expected = series.describe()
+
+    assert result["count"] == 4
+    assert sketch.null_count == 1
+    assert result["mean"] == pytest.approx(expected["mean"])
+    assert result["std"] == pytest.approx(expected["std"])
+    assert result["median"] == pytest.approx(series.median())
+    assert result["0.25"] == pytest.approx(expected["25%"])
+
+
+def test_chunked_sketch_matches_exact_statistics(values):
+    sketch = ColumnSketch(numeric=True, value_range=(values.min(), values.max()))
+    for start in range(0, len(values), 15_000):
+        sketch.update(values.iloc[start : start + 15_000])
+
+    result = sketch.describe()
+
+    assert result["mean"] == pytest.approx(values.mean(), rel=1e-12)
+    assert result["std"] == pytest.approx(values.std(), rel=1e-9)
+    assert result["min"] == values.min()
+    assert result["max"] == values.max()
+    for q in (0.25, 0.5, 0.75):
+        rank = (values < sketch.kll.quantile(q)).mean()
+        assert abs(rank - q) < 0.02
+    assert sum(sketch.to_dict()["histogram"]["counts"]) == len(values)
+
+
+def test_merged_sketches_equal_single_pass_moments(values):
+    left = ColumnSketch(numeric=True)
+    right = ColumnSketch(numeric=True)
+    left.update(values[:30_000])
+    right.update(values[30_000:])
+
+    left.merge(right)
+
+    assert left.count == len(values)
+    assert left.mean == pytest.approx(values.mean(), rel=1e-12)
+    assert left.kll.n == len(values)
+
+
+def test_sketch_round_trips_through_json_dict(values):
+    sketch = ColumnSketch(numeric=True, value_range=(values.min(), values.max()))
+    sketch.update(values)
+
+    restored = ColumnSketch.from_dict(sketch.to_dict())
+
+    assert restored.describe() == sketch.describe()
+
+
+def test_hyperloglog_estimate_is_close():
+    hll = HyperLogLog()
+    hll.update(pd.Series([f"ICD-{i % 20_000}" for i in range(100_000)]))
+
+    assert abs(hll.estimate() - 20_000) / 20_000 < 0.1
+
+
+def test_kll_keeps_sketch_small():
+    kll = KLLSketch()
+    kll.update(np.arange(1_000_000, dtype=float))
+
+    assert sum(len(level) for level in kll.levels) < 1_000
@@ -0,0 +1,217 @@
+"""Standalone analysis worker.
+
+Run with ``python -m app.worker --concurrency 4``. Any number of workers
+can share the database; each claims pending analyses from the queue, so
+analysis capacity scales independently of the API processes.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import uuid
+from typing import Any, Dict, Optional, Set, Tuple
+from app.core.config import settings
+from app.models.analysis import Analysis
+from app.models.dataset import Dataset
+from app.services.analysis import execute_analysis
+from app.services.cache import analysis_cache_key, cache_service
+from app.services.executor import AnalysisExecutor
+from app.services.job_queue import JobQueue
+from app.services.resampling import shutdown_executor as shutdown_resampling
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisWorker:
+    """Claims analyses from the job queue and runs them in an executor.
+
+    At most ``concurrency`` jobs run at once. While they do, a heartbeat
+    keeps their rows fresh, and every worker periodically reaps rows whose
+    worker died so they are retried elsewhere.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        executor: AnalysisExecutor,
+        concurrency: int,
+        worker_id: Optional[str] = None,
+    ):
+        self.queue = queue
+        self.executor = executor
+        self.concurrency = concurrency
+        self.worker_id = worker_id or (
+            f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
+        self.active: Set[int] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        # Set whenever a job finishes, freeing its slot and its user's quota
+        self._job_finished = asyncio.Event()
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Poll for work until ``stop`` is set, then drain running jobs."""
+        logger.info(
+            f"Worker {self.worker_id} started with concurrency {self.concurrency}"
+        )
+        background = [
+            asyncio.create_task(self._heartbeat_loop(stop)),
+            asyncio.create_task(self._reap_loop(stop)),
+        ]
+        try:
+            while not stop.is_set():
+                self._job_finished.clear()
+                free = self.concurrency - len(self.active)
+                claimed = []
+                if free > 0:
+                    claimed = await asyncio.to_thread(
+                        self.queue.claim, self.worker_id, free
+                    )
+                for job_id in claimed:
+                    self.active.add(job_id)
+                    task = asyncio.create_task(self._process(job_id))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                if not claimed:
+                    # Polling only finds work queued or freed by others
+                    await _wait_any(
+                        (stop, self._job_finished), settings.JOB_POLL_INTERVAL_SECONDS
+                    )
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            for task in background:
+                task.cancel()
+            logger.info(f"Worker {self.worker_id} stopped")
+
+    async def _process(self, job_id: int) -> None:
+        try:
+            try:
+                key, args = await asyncio.to_thread(self._job_arguments, job_id)
+                # An identical job may have finished since this one was queued
+                results = (
+                    await asyncio.to_thread(cache_service.get, key) if key else None
+                )
+                if results is None:
+                    results = await self.executor.run(execute_analysis, *args)
+                    if key:
+                        await asyncio.to_thread(cache_service.set, key, results)
+            except (ValueError, KeyError) as e:
+                # Invalid configuration or data: retrying cannot help
+                logger.error(f"Analysis {job_id} failed: {str(e)}")
+                await asyncio.to_thread(
+                    self.queue.fail, self.worker_id, job_id, str(e), False
+                )
+            except Exception as e:
+                logger.error(f"Error in analysis {job_id}: {str(e)}", exc_info=True)
+                await asyncio.to_thread(
+                    self.queue.fail, self.worker_id, job_id, str(e), True
+                )
+            else:
+                if await asyncio.to_thread(
+                    self.queue.complete, self.worker_id, job_id, results
+                ):
+                    logger.info(f"Analysis {job_id} completed successfully")
+                else:
+                    logger.warning(
+                        f"Analysis {job_id} was reclaimed before it finished"
+                    )
+        finally:
+            self.active.discard(job_id)
+            self._job_finished.set()
+
+    def _job_arguments(self, job_id: int) -> Tuple[Optional[str], Tuple]:
+        """The job's cache key and executor arguments: the file reference and
+        metadata, never a frame."""
+        with self.queue.session_factory() as db:
+            analysis = db.get(Analysis, job_id)
+            if analysis is None:
+                raise ValueError(f"Analysis {job_id} not found")
+            dataset = db.get(Dataset, analysis.dataset_id)
+            if dataset is None:
+                raise ValueError(f"Dataset {analysis.dataset_id} not found")
+            cache_key = analysis_cache_key(
+                dataset, analysis.type.value, analysis.parameters
+            )
+            return cache_key, (
+                dataset.id,
+                dataset.file_path,
+                analysis.type.value,
+                analysis.parameters,
+                dataset.column_info,
+                dataset.column_stats,
+            )
+
+    async def _heartbeat_loop(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            await _wait(stop, settings.JOB_HEARTBEAT_INTERVAL_SECONDS)
+            try:
+                await asyncio.to_thread(
+                    self.queue.heartbeat, self.worker_id, list(self.active)
+                )
+            except Exception as e:
+                logger.error(f"Heartbeat failed: {str(e)}")
+
+    async def _reap_loop(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            try:
+                await asyncio.to_thread(self.queue.reap)
+            except Exception as e:
+                logger.error(f"Reaping stale analyses failed: {str(e)}")
+            await _wait(stop, settings.JOB_STALE_AFTER_SECONDS / 2)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "worker_id": self.worker_id,
+            "concurrency": self.concurrency,
+            "active": len(self.active),
+        }
+
+
+async def _wait(stop: asyncio.Event, timeout: float) -> None:
+    try:
+        await asyncio.wait_for(stop.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def _wait_any(events: Tuple[asyncio.Event, ...], timeout: float) -> None:
+    waiters = [asyncio.create_task(event.wait()) for event in events]
+    try:
+        await asyncio.wait(
+            waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+        )
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
+
+
+async def main(concurrency: int) -> None:
+    from app.db.session import SessionLocal
+
+    executor = AnalysisExecutor(settings.ANALYSIS_EXECUTOR, concurrency)
+    worker = AnalysisWorker(JobQueue(SessionLocal), executor, concurrency)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await worker.run(stop)
+    finally:
+        executor.shutdown()
+        shutdown_resampling()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run an analysis worker")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.ANALYSIS_WORKERS,
+        help="Analyses to run at once",
+    )
+    arguments = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(arguments.concurrency))
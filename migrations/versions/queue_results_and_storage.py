@@ -0,0 +1,180 @@
+"""job queue, encoded results and content-addressed storage
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-17
+
+Brings a database created by ``Base.metadata.create_all`` before these
+changes up to date: column statistics and content hashes on datasets, the
+shared ``dataset_blob`` table, the job queue and single-flight columns on
+analyses, and results stored in the binary encoding of
+``app.services.codec`` rather than as JSON. Such a database was never
+versioned, so stamp it first with ``alembic stamp 001``.
+
+"""
+
+import json
+from alembic import op
+import sqlalchemy as sa
+from app.services.codec import decode, encode
+
+# revision identifiers, used by Alembic.
+revision = "002"
+down_revision = "001"
+branch_labels = None
+depends_on = None
+
+RUNNING = sa.text("status = 'PROCESSING'")
+
+
+def upgrade() -> None:
+    # Create dataset_blob table
+    op.create_table(
+        "dataset_blob",
+        sa.Column("content_hash", sa.String(), nullable=False),
+        sa.Column("source_path", sa.String(), nullable=False),
+        sa.Column("file_path", sa.String(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=True,
+        ),
+        sa.PrimaryKeyConstraint("content_hash"),
+    )
+
+    # Dataset profile and content identity
+    op.add_column("dataset", sa.Column("column_stats", sa.JSON(), nullable=True))
+    op.add_column("dataset", sa.Column("content_hash", sa.String(), nullable=True))
+    op.create_index(
+        op.f("ix_dataset_content_hash"), "dataset", ["content_hash"], unique=False
+    )
+
+    # Enum columns store member names
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE analysistype ADD VALUE IF NOT EXISTS 'BATCH'")
+
+    # Job queue and single-flight columns, and a column for encoded results
+    with op.batch_alter_table("analysis") as batch_op:
+        batch_op.add_column(
+            sa.Column("attempts", sa.Integer(), server_default="0", nullable=False)
+        )
+        batch_op.add_column(
+            sa.Column("available_at", sa.DateTime(timezone=True), nullable=True)
+        )
+        batch_op.add_column(sa.Column("claimed_by", sa.String(), nullable=True))
+        batch_op.add_column(
+            sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True)
+        )
+        batch_op.add_column(
+            sa.Column("started_at", sa.DateTime(timezone=True), nullable=True)
+        )
+        batch_op.add_column(
+            sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True)
+        )
+        batch_op.add_column(sa.Column("cache_key", sa.String(), nullable=True))
+        batch_op.add_column(sa.Column("leader_id", sa.Integer(), nullable=True))
+        batch_op.add_column(
+            sa.Column("encoded_results", sa.LargeBinary(), nullable=True)
+        )
+        batch_op.create_foreign_key(
+            "fk_analysis_leader_id_analysis",
+            "analysis",
+            ["leader_id"],
+            ["id"],
+            ondelete="SET NULL",
+        )
+
+    _convert_results("results", "encoded_results", _encode)
+    with op.batch_alter_table("analysis") as batch_op:
+        batch_op.drop_column("results")
+        batch_op.alter_column("encoded_results", new_column_name="results")
+
+    op.create_index(
+        op.f("ix_analysis_available_at"), "analysis", ["available_at"], unique=False
+    )
+    op.create_index(
+        op.f("ix_analysis_cache_key"), "analysis", ["cache_key"], unique=False
+    )
+    op.create_index(
+        op.f("ix_analysis_leader_id"), "analysis", ["leader_id"], unique=False
+    )
+    op.create_index(
+        "ix_analysis_running_cache_key",
+        "analysis",
+        ["cache_key"],
+        unique=True,
+        sqlite_where=RUNNING,
+        postgresql_where=RUNNING,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_analysis_running_cache_key", table_name="analysis")
+    op.drop_index(op.f("ix_analysis_leader_id"), table_name="analysis")
+    op.drop_index(op.f("ix_analysis_cache_key"), table_name="analysis")
+    op.drop_index(op.f("ix_analysis_available_at"), table_name="analysis")
+
+    with op.batch_alter_table("analysis") as batch_op:
+        batch_op.add_column(sa.Column("json_results", sa.JSON(), nullable=True))
+    _convert_results("results", "json_results", _decode)
+
+    # Rows of the batch analysis type are left behind: PostgreSQL cannot
+    # drop an enum value
+    with op.batch_alter_table("analysis") as batch_op:
+        batch_op.drop_constraint("fk_analysis_leader_id_analysis", type_="foreignkey")
+        batch_op.drop_column("results")
+        batch_op.alter_column("json_results", new_column_name="results")
+        for column in (
+            "leader_id",
+            "cache_key",
+            "finished_at",
+            "started_at",
+            "heartbeat_at",
+            "claimed_by",
+            "available_at",
+            "attempts",
+        ):
+            batch_op.drop_column(column)
+
+    op.drop_index(op.f("ix_dataset_content_hash"), table_name="dataset")
+    op.drop_column("dataset", "content_hash")
+    op.drop_column("dataset", "column_stats")
+    op.drop_table("dataset_blob")
+
+
+def _encode(value):
+    # SQLite hands JSON back as text, PostgreSQL as parsed values
+    if isinstance(value, (str, bytes)):
+        value = json.loads(value)
+    return encode(value)
+
+
+def _decode(value):
+    return decode(bytes(value))
+
+
+def _convert_results(source: str, target: str, convert) -> None:
+    """Copy every row's results from one column to the other, converted."""
+    bind = op.get_bind()
+    analysis = sa.table(
+        "analysis",
+        sa.column("id", sa.Integer()),
+        sa.column(source),
+        sa.column(
+            target, sa.LargeBinary() if target == "encoded_results" else sa.JSON()
+        ),
+    )
+    rows = bind.execute(
+        sa.select(analysis.c.id, analysis.c[source]).where(
+            analysis.c[source].is_not(None)
+        )
+    )
+    for row_id, value in rows.fetchall():
+        bind.execute(
+            analysis.update()
+            .where(analysis.c.id == row_id)
+            .values({target: convert(value)})
+        )